@@ -1,11 +1,10 @@
+import atexit
 import logging
 import asyncio
 import os
-import json
-import subprocess
 from datetime import datetime
 from flask_socketio import SocketIO, send, emit, join_room, leave_room
-from flask import Flask, render_template, Response, request, send_from_directory, jsonify
+from flask import Flask, render_template, Response, request, send_from_directory, jsonify, redirect
 from flask_cors import CORS
 from src.login import login
 from src.signup import signup
@@ -13,13 +12,22 @@ from src.subjects import subjects
 from flask_jwt_extended import create_access_token, JWTManager, get_jwt_identity, jwt_required
 from src.create_event import create_event
 from src.database import init_db, close_db_session
-from src.add_possible_tutor import add_possible_tutor
+from src.migrations import run_migrations
+from src.add_possible_tutor import add_possible_tutor, add_possible_tutor_batch
 from src.accept_tutor import accept_tutor
 from src.add_meeting import add_meeting
 from src.list_offers import list_offers
-from src.list_events import list_events, list_tutee_events, list_tutor_events
-from src.recording import meeting_recorder, save_recording_blob, process_uploaded_recording
-import google.generativeai as genai
+from src.list_events import list_events, list_tutee_events, list_tutor_events, list_available_events, event_page_args
+from src.recording import meeting_recorder, save_recording_stream, schedule_transcription
+from src.chunked_upload import init_upload, get_upload, append_chunk, finalize_upload, UploadOffsetMismatch, MAX_CHUNK_SIZE
+from src.conversion_jobs import conversion_queue
+from src.transcription_jobs import transcription_queue
+from src.live_ingest import live_ingest
+from src.live_transcription import live_transcriber
+from src.recording_index import list_recordings, index_recording, get_recording, recording_etag
+from src.packaging import schedule_packaging, package_info, package_file_url, locate_package_file
+from src.response_cache import cached_meeting_response
+import mimetypes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +40,13 @@ app.config['JWT_SECRET_KEY'] = 'password'
 app.config['JWT_TOKEN_LOCATION'] = ['headers']
 app.config['JWT_CSRF_CHECK_FORM'] = False
 
+# Recording playback: browser cache lifetime and optional offload to a front proxy
+# ('x-accel-redirect' for nginx, 'x-sendfile' for Apache/lighttpd)
+RECORDING_CACHE_MAX_AGE = int(os.getenv('RECORDING_CACHE_MAX_AGE', '3600'))
+RECORDING_SENDFILE = os.getenv('RECORDING_SENDFILE', '')
+RECORDING_ACCEL_PREFIX = os.getenv('RECORDING_ACCEL_PREFIX', '/protected-media/')
+app.config['USE_X_SENDFILE'] = RECORDING_SENDFILE == 'x-sendfile'
+
 # Enable CORS
 CORS(app)
 
@@ -44,6 +59,17 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # Initialize database
 with app.app_context():
     init_db()
+    run_migrations()
+
+# Resume recording conversions left over from a previous run
+conversion_queue.start()
+
+# Start the transcription workers; queued jobs are kept for the next start on shutdown
+transcription_queue.start()
+atexit.register(transcription_queue.shutdown)
+
+# Live transcription results go to the meeting room from worker threads
+live_transcriber.set_emitter(lambda event, data, room: socketio.emit(event, data, room=room))
 
 # Cleanup database session after each request
 @app.teardown_appcontext
@@ -81,6 +107,10 @@ def run_async(coro):
 chat_rooms = {}
 # Map session IDs to user info for chat
 chat_sid_to_user = {}  # {sid: {'userid': int, 'eventid': int}}
+# Map session IDs to the live recordings they are streaming
+recording_sid_to_sessions = {}  # {sid: {(meeting_id, participant_id), ...}}
+# Map session IDs to the live transcription streams they are feeding
+transcription_sid_to_streams = {}  # {sid: {(meeting_id, participant_id), ...}}
 
 @app.route('/')
 def index():
@@ -257,6 +287,15 @@ def handle_disconnect():
             # Remove sid mapping
             del chat_sid_to_user[sid]
             leave_room(chat_room_name)
+        
+        # Live recordings this client was streaming stay open for a while so it can resume them
+        for meeting_id, participant_id in recording_sid_to_sessions.pop(sid, set()):
+            logger.info(f"Live recording {meeting_id}/{participant_id} detached after disconnect")
+            live_ingest.detach(meeting_id, participant_id)
+        
+        # Flush any live transcription this client was feeding
+        for meeting_id, participant_id in transcription_sid_to_streams.pop(sid, set()):
+            live_transcriber.stop(meeting_id, participant_id)
             
         logger.info(f"User {sid} disconnected")
         
@@ -295,7 +334,7 @@ def handle_join_chat(data):
                 logger.warning(f"Event {eventid} not found")
                 return
             
-            tutor_id = json.loads(event.userid_tutor)['userid_tutor']
+            tutor_id = event.userid_tutor
             
             # Check if user is the tutor or tutee
             is_authorized = (event.userid_tutee == userid or str(tutor_id) == str(userid))
@@ -506,6 +545,132 @@ def handle_typing(data):
         logger.error(f"Error in handle_typing: {e}", exc_info=True)
 
 
+# ============= Live Recording Socket.IO Event Handlers =============
+
+@socketio.on('recording-start')
+def handle_recording_start(data):
+    """Open a live recording session for a participant"""
+    try:
+        meeting_id = str(data.get('meeting_id') or '')
+        participant_id = str(data.get('participant_id') or '')
+        
+        if not meeting_id or not participant_id:
+            emit('recording-error', {'message': 'Missing meeting_id or participant_id'})
+            return
+        
+        session = live_ingest.start(meeting_id, participant_id, data.get('mime_type', 'video/webm'))
+        recording_sid_to_sessions.setdefault(request.sid, set()).add((meeting_id, participant_id))
+        emit('recording-started', session)
+        
+    except Exception as e:
+        logger.error(f"Error in handle_recording_start: {e}", exc_info=True)
+        emit('recording-error', {'message': 'Failed to start recording'})
+
+
+@socketio.on('recording-chunk')
+def handle_recording_chunk(data):
+    """Append a MediaRecorder timeslice; the return value is the client's ack"""
+    try:
+        meeting_id = str(data.get('meeting_id') or '')
+        participant_id = str(data.get('participant_id') or '')
+        seq = int(data.get('seq'))
+        chunk = data.get('data')
+        
+        if not chunk:
+            return {'seq': seq, 'error': 'Empty chunk'}
+        
+        received = live_ingest.append(meeting_id, participant_id, seq, chunk)
+        return {'seq': seq, 'bytes': received}
+        
+    except ValueError as e:
+        return {'error': str(e)}
+    except Exception as e:
+        logger.error(f"Error in handle_recording_chunk: {e}", exc_info=True)
+        return {'error': 'Failed to store chunk'}
+
+
+@socketio.on('recording-stop')
+def handle_recording_stop(data):
+    """Close a live recording session and queue the full recording for conversion"""
+    try:
+        meeting_id = str(data.get('meeting_id') or '')
+        participant_id = str(data.get('participant_id') or '')
+        
+        result = live_ingest.stop(meeting_id, participant_id)
+        recording_sid_to_sessions.get(request.sid, set()).discard((meeting_id, participant_id))
+        
+        if result is None:
+            emit('recording-error', {'message': 'No live recording in progress'})
+            return
+        emit('recording-stopped', result)
+        
+    except Exception as e:
+        logger.error(f"Error in handle_recording_stop: {e}", exc_info=True)
+        emit('recording-error', {'message': 'Failed to stop recording'})
+
+
+# ============= Live Transcription Socket.IO Event Handlers =============
+
+@socketio.on('transcription-start')
+def handle_transcription_start(data):
+    """Open a live transcription stream; results are emitted to the meeting room"""
+    try:
+        meeting_id = str(data.get('meeting_id') or '')
+        participant_id = str(data.get('participant_id') or '')
+        
+        if not meeting_id or not participant_id:
+            emit('transcription-error', {'message': 'Missing meeting_id or participant_id'})
+            return
+        
+        room = sid_to_room.get(request.sid, meeting_id)
+        stream = live_transcriber.start(
+            meeting_id,
+            participant_id,
+            room,
+            language_code=data.get('language', 'en-US'),
+            sample_rate=int(data.get('sample_rate', 16000))
+        )
+        transcription_sid_to_streams.setdefault(request.sid, set()).add((meeting_id, participant_id))
+        emit('transcription-started', stream)
+        
+    except Exception as e:
+        logger.error(f"Error in handle_transcription_start: {e}", exc_info=True)
+        emit('transcription-error', {'message': 'Failed to start transcription'})
+
+
+@socketio.on('audio-frame')
+def handle_audio_frame(data):
+    """Queue a PCM audio frame for live transcription"""
+    try:
+        frame = data.get('data')
+        if frame:
+            live_transcriber.push(str(data.get('meeting_id') or ''), str(data.get('participant_id') or ''), frame)
+    except ValueError as e:
+        emit('transcription-error', {'message': str(e)})
+    except Exception as e:
+        logger.error(f"Error in handle_audio_frame: {e}", exc_info=True)
+
+
+@socketio.on('transcription-stop')
+def handle_transcription_stop(data):
+    """Close a live transcription stream; its last results are written in the background"""
+    try:
+        meeting_id = str(data.get('meeting_id') or '')
+        participant_id = str(data.get('participant_id') or '')
+        
+        stopped = live_transcriber.stop(meeting_id, participant_id)
+        transcription_sid_to_streams.get(request.sid, set()).discard((meeting_id, participant_id))
+        
+        if not stopped:
+            emit('transcription-error', {'message': 'No live transcription in progress'})
+            return
+        emit('transcription-stopped', {'meeting_id': meeting_id, 'participant_id': participant_id})
+        
+    except Exception as e:
+        logger.error(f"Error in handle_transcription_stop: {e}", exc_info=True)
+        emit('transcription-error', {'message': 'Failed to stop transcription'})
+
+
 
 @app.route('/signup', methods=['POST'])
 def post_signup():
@@ -539,39 +704,25 @@ def get_subjects():
 def recordings_list():
     """Display list of all recordings grouped by meeting"""
     try:
-        recordings_dir = meeting_recorder.get_recordings_dir()
         recordings = []
         meetings = {}  # Group by meeting_id
         
-        if os.path.exists(recordings_dir):
-            for filename in sorted(os.listdir(recordings_dir), reverse=True):
-                if filename.endswith('.mp4') or filename.endswith('.webm'):
-                    filepath = os.path.join(recordings_dir, filename)
-                    stat = os.stat(filepath)
-                    
-                    # Parse filename: meeting_id_participant_id_timestamp.mp4/webm
-                    # Remove extension
-                    file_base = filename.rsplit('.', 1)[0]
-                    parts = file_base.split('_')
-                    meeting_id = parts[0] if len(parts) > 0 else 'Unknown'
-                    participant_id = parts[1] if len(parts) > 1 else 'Unknown'
-                    timestamp = '_'.join(parts[2:]) if len(parts) > 2 else 'Unknown'
-                    
-                    recording_data = {
-                        'filename': filename,
-                        'meeting_id': meeting_id,
-                        'participant_id': participant_id,
-                        'timestamp': timestamp,
-                        'size': f"{stat.st_size / (1024*1024):.2f} MB",
-                        'size_mb': stat.st_size / (1024*1024),
-                        'created': datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
-                    }
-                    recordings.append(recording_data)
-                    
-                    # Group by meeting
-                    if meeting_id not in meetings:
-                        meetings[meeting_id] = []
-                    meetings[meeting_id].append(recording_data)
+        for rec in list_recordings():
+            recording_data = {
+                'filename': rec['filename'],
+                'meeting_id': rec['meeting_id'],
+                'participant_id': rec['participant_id'],
+                'timestamp': rec['timestamp'],
+                'size': f"{rec['size_bytes'] / (1024*1024):.2f} MB",
+                'size_mb': rec['size_bytes'] / (1024*1024),
+                'created': rec['created'].strftime('%Y-%m-%d %H:%M:%S')
+            }
+            recordings.append(recording_data)
+            
+            # Group by meeting
+            if rec['meeting_id'] not in meetings:
+                meetings[rec['meeting_id']] = []
+            meetings[rec['meeting_id']].append(recording_data)
         
         return render_template('recordings.html', recordings=recordings, meetings=meetings)
     except Exception as e:
@@ -583,28 +734,14 @@ def recordings_list():
 def meeting_recordings(meeting_id):
     """Display synced playback for a specific meeting"""
     try:
-        recordings_dir = meeting_recorder.get_recordings_dir()
-        meeting_recordings = []
-        
-        if os.path.exists(recordings_dir):
-            for filename in os.listdir(recordings_dir):
-                if (filename.endswith('.mp4') or filename.endswith('.webm')) and filename.startswith(meeting_id + '_'):
-                    filepath = os.path.join(recordings_dir, filename)
-                    stat = os.stat(filepath)
-                    
-                    # Parse filename
-                    file_base = filename.rsplit('.', 1)[0]
-                    parts = file_base.split('_')
-                    participant_id = parts[1] if len(parts) > 1 else 'Unknown'
-                    timestamp = '_'.join(parts[2:]) if len(parts) > 2 else 'Unknown'
-                    
-                    meeting_recordings.append({
-                        'filename': filename,
-                        'participant_id': participant_id,
-                        'timestamp': timestamp,
-                        'size': f"{stat.st_size / (1024*1024):.2f} MB",
-                        'created': datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S')
-                    })
+        meeting_recordings = [{
+            'filename': rec['filename'],
+            'participant_id': rec['participant_id'],
+            'timestamp': rec['timestamp'],
+            'size': f"{rec['size_bytes'] / (1024*1024):.2f} MB",
+            'created': rec['created'].strftime('%Y-%m-%d %H:%M:%S'),
+            'hls_url': package_info(rec['filename'])['hls_url']
+        } for rec in list_recordings(meeting_id)]
         
         if not meeting_recordings:
             return "No recordings found for this meeting", 404
@@ -619,53 +756,100 @@ def meeting_recordings(meeting_id):
 
 @app.route('/recordings/<filename>')
 def serve_recording(filename):
-    """Serve a recording file"""
+    """
+    Serve a recording file.
+    Supports single byte ranges (206), conditional requests against the
+    index ETag (304) and offloading the transfer to a front proxy.
+    Multi-range requests are answered with 416.
+    """
     try:
-        recordings_dir = meeting_recorder.get_recordings_dir()
-        return send_from_directory(recordings_dir, filename)
+        url = meeting_recorder.recording_url(filename)
+        if url:
+            return redirect(url)
+        filepath = meeting_recorder.locate_recording(filename)
+        if not filepath:
+            return "Recording not found", 404
+
+        recording = get_recording(filename)
+        etag = recording_etag(recording) if recording else True
+
+        if RECORDING_SENDFILE == 'x-accel-redirect':
+            # nginx streams the file (and handles Range); we only answer conditionals
+            response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            if etag is not True:
+                response.set_etag(etag)
+            response.last_modified = os.path.getmtime(filepath)
+            # Recordings are per-meeting, so only the viewer's browser may cache them
+            response.cache_control.private = True
+            response.cache_control.max_age = RECORDING_CACHE_MAX_AGE
+            response.make_conditional(request)
+            if response.status_code != 304:
+                response.headers['X-Accel-Redirect'] = RECORDING_ACCEL_PREFIX + meeting_recorder.recording_key(filepath)
+            return response
+
+        response = send_from_directory(
+            os.path.dirname(filepath),
+            os.path.basename(filepath),
+            etag=etag,
+            max_age=RECORDING_CACHE_MAX_AGE,
+            conditional=True
+        )
+        # send_file marks cached responses public; keep them out of shared caches
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
     except Exception as e:
         logger.error(f"Error serving recording: {e}", exc_info=True)
         return f"Recording not found: {e}", 404
 
 
+@app.route('/recordings/hls/<stem>/<path:asset>')
+def serve_recording_package(stem, asset):
+    """Serve a playlist, segment or thumbnail from a recording's HLS package"""
+    url = package_file_url(stem, asset)
+    if url:
+        return redirect(url)
+    filepath = locate_package_file(stem, asset)
+    if not filepath:
+        return "Package file not found", 404
+    response = send_from_directory(
+        os.path.dirname(filepath),
+        os.path.basename(filepath),
+        max_age=RECORDING_CACHE_MAX_AGE,
+        conditional=True
+    )
+    # Packages are per-meeting like the recordings themselves
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
 @app.route('/api/recordings')
 def api_recordings_list():
     """API endpoint to get all recordings grouped by meeting"""
     try:
-        recordings_dir = meeting_recorder.get_recordings_dir()
         meetings = {}  # Group by meeting_id
         
-        if os.path.exists(recordings_dir):
-            for filename in sorted(os.listdir(recordings_dir), reverse=True):
-                if filename.endswith('.mp4') or filename.endswith('.webm'):
-                    filepath = os.path.join(recordings_dir, filename)
-                    stat = os.stat(filepath)
-                    
-                    # Parse filename: meeting_id_participant_id_timestamp.mp4/webm
-                    # Remove extension
-                    file_base = filename.rsplit('.', 1)[0]
-                    parts = file_base.split('_')
-                    meeting_id = parts[0] if len(parts) > 0 else 'Unknown'
-                    participant_id = parts[1] if len(parts) > 1 else 'Unknown'
-                    timestamp = '_'.join(parts[2:]) if len(parts) > 2 else 'Unknown'
-                    
-                    recording_data = {
-                        'filename': filename,
-                        'meeting_id': meeting_id,
-                        'participant_id': participant_id,
-                        'timestamp': timestamp,
-                        'size': f"{stat.st_size / (1024*1024):.2f} MB",
-                        'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
-                    }
-                    
-                    # Group by meeting
-                    if meeting_id not in meetings:
-                        meetings[meeting_id] = {
-                            'meeting_id': meeting_id,
-                            'recordings': [],
-                            'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
-                        }
-                    meetings[meeting_id]['recordings'].append(recording_data)
+        for rec in list_recordings():
+            meeting_id = rec['meeting_id']
+            recording_data = {
+                'filename': rec['filename'],
+                'meeting_id': meeting_id,
+                'participant_id': rec['participant_id'],
+                'timestamp': rec['timestamp'],
+                'size': f"{rec['size_bytes'] / (1024*1024):.2f} MB",
+                'duration': rec['duration'],
+                'created': rec['created'].isoformat()
+            }
+            
+            # Group by meeting
+            if meeting_id not in meetings:
+                meetings[meeting_id] = {
+                    'meeting_id': meeting_id,
+                    'recordings': [],
+                    'created': rec['created'].isoformat()
+                }
+            meetings[meeting_id]['recordings'].append(recording_data)
         
         # Convert dict to list
         meetings_list = list(meetings.values())
@@ -697,84 +881,42 @@ def upload_recording():
         original_content_type = video_file.content_type or 'unknown'
         logger.info(f"Incoming recording upload: meeting_id={meeting_id} participant_id={participant_id} content_type={original_content_type} filename={video_file.filename}")
 
-        # Read the blob data
-        blob_data = video_file.read()
-
-        if len(blob_data) == 0:
-            return jsonify({'error': 'Empty video file'}), 400
-
         # Always convert to mp4 - webm is unreliable
         is_webm = 'webm' in original_content_type or (video_file.filename and video_file.filename.lower().endswith('.webm'))
         
+        # Stream the upload to disk instead of reading the whole blob into memory
+        filepath = save_recording_stream(meeting_id, participant_id, video_file.stream, 'webm' if is_webm else 'mp4')
+        size_bytes = os.path.getsize(filepath)
+        
+        if size_bytes == 0:
+            os.remove(filepath)
+            return jsonify({'error': 'Empty video file'}), 400
+        
         if is_webm:
-            # Save as temporary webm file
-            temp_path = save_recording_blob(meeting_id, participant_id, blob_data, 'webm')
+            # Hand conversion off to the background queue
+            job_id = conversion_queue.submit(meeting_id, participant_id, filepath)
+            logger.info(f"Saved webm recording at {filepath} size={size_bytes}B, queued conversion job {job_id}")
             
-            # Prepare mp4 output path
-            base_name = os.path.splitext(os.path.basename(temp_path))[0]
-            final_path = os.path.join(os.path.dirname(temp_path), base_name + '.mp4')
-            
-            # Convert webm to mp4 with re-encoding to ensure compatibility
-            convert_cmd = [
-                'ffmpeg', '-y',
-                '-i', temp_path,
-                '-c:v', 'libx264',  # Re-encode video to h264
-                '-preset', 'medium',
-                '-crf', '23',
-                '-c:a', 'aac',      # Re-encode audio to aac
-                '-b:a', '128k',
-                '-movflags', '+faststart',  # Optimize for web playback
-                final_path
-            ]
-            
-            try:
-                logger.info(f"Converting webm to mp4: {' '.join(convert_cmd)}")
-                result = subprocess.run(convert_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=300)
-                
-                if result.returncode != 0:
-                    error_output = result.stderr.decode(errors='ignore')
-                    logger.error(f"ffmpeg conversion failed. stderr={error_output}")
-                    # Delete the corrupted webm file
-                    try:
-                        os.remove(temp_path)
-                    except OSError:
-                        pass
-                    return jsonify({'error': 'Failed to convert video to MP4', 'details': error_output[:500]}), 500
-                else:
-                    filepath = final_path
-                    logger.info(f"Successfully converted to MP4: {filepath}")
-                    # Remove temp webm file
-                    try:
-                        os.remove(temp_path)
-                    except OSError as e:
-                        logger.warning(f"Failed to remove temp file: {e}")
-            except subprocess.TimeoutExpired:
-                logger.error("ffmpeg conversion timed out")
-                try:
-                    os.remove(temp_path)
-                except OSError:
-                    pass
-                return jsonify({'error': 'Video conversion timed out'}), 500
-            except Exception as conv_err:
-                logger.error(f"Exception during conversion: {conv_err}", exc_info=True)
-                try:
-                    os.remove(temp_path)
-                except OSError:
-                    pass
-                return jsonify({'error': 'Failed to convert video', 'details': str(conv_err)}), 500
-        else:
-            # Already mp4, save directly
-            filepath = save_recording_blob(meeting_id, participant_id, blob_data, 'mp4')
-
-        size_bytes = len(blob_data)
+            return jsonify({
+                'success': True,
+                'meeting_id': meeting_id,
+                'participant_id': participant_id,
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': f'/api/recordings/jobs/{job_id}',
+                'size_bytes': size_bytes,
+                'size_mb': f"{size_bytes/(1024*1024):.2f}",
+                'content_type_in': original_content_type,
+                'stored_extension': 'mp4',
+                'message': 'Recording uploaded, MP4 conversion queued'
+            }), 202
+        
         logger.info(f"Saved recording file at {filepath} size={size_bytes}B (~{size_bytes/(1024*1024):.2f} MB)")
+        index_recording(filepath, meeting_id, participant_id)
 
-        # Background transcription using thread + asyncio.run to isolate
-        try:
-            import threading
-            threading.Thread(target=lambda: asyncio.run(process_uploaded_recording(meeting_id, participant_id, filepath)), daemon=True).start()
-        except Exception as sched_err:
-            logger.error(f"Failed to schedule transcription: {sched_err}")
+        # Background transcription, queued before packaging so the MP4 stays local for it
+        schedule_transcription(meeting_id, participant_id, filepath)
+        schedule_packaging(filepath)
 
         return jsonify({
             'success': True,
@@ -785,8 +927,8 @@ def upload_recording():
             'size_bytes': size_bytes,
             'size_mb': f"{size_bytes/(1024*1024):.2f}",
             'content_type_in': original_content_type,
-            'stored_extension': 'mp4',  # Always MP4 now
-            'message': 'Recording uploaded and converted to MP4 successfully'
+            'stored_extension': 'mp4',
+            'message': 'Recording uploaded successfully'
         }), 200
         
     except Exception as e:
@@ -794,6 +936,96 @@ def upload_recording():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/recordings/uploads', methods=['POST'])
+def api_init_chunked_upload():
+    """API endpoint to start a resumable chunked recording upload"""
+    try:
+        data = request.get_json(silent=True) or {}
+        meeting_id = data.get('meeting_id')
+        participant_id = data.get('participant_id')
+        
+        if not meeting_id or not participant_id:
+            return jsonify({'error': 'meeting_id and participant_id are required'}), 400
+        
+        content_type = data.get('content_type') or ''
+        file_extension = 'mp4' if 'mp4' in content_type else 'webm'
+        
+        upload = init_upload(str(meeting_id), str(participant_id), file_extension, data.get('total_size'))
+        return jsonify(upload), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error starting chunked upload: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/recordings/uploads/<upload_id>', methods=['GET'])
+def api_chunked_upload_status(upload_id):
+    """API endpoint to get the resume offset of a chunked upload"""
+    upload = get_upload(upload_id)
+    if not upload:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(upload), 200
+
+
+@app.route('/api/recordings/uploads/<upload_id>', methods=['PUT'])
+def api_append_chunk(upload_id):
+    """API endpoint to append a chunk (raw request body) at ?offset=N"""
+    try:
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            return jsonify({'error': 'offset is required'}), 400
+        
+        if request.content_length and request.content_length > MAX_CHUNK_SIZE:
+            return jsonify({'error': f'Chunk exceeds maximum size of {MAX_CHUNK_SIZE} bytes'}), 413
+        
+        new_offset = append_chunk(upload_id, offset, request.stream)
+        return jsonify({'upload_id': upload_id, 'offset': new_offset}), 200
+    except UploadOffsetMismatch as e:
+        return jsonify({'error': str(e), 'offset': e.expected_offset}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error appending chunk to upload {upload_id}: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/recordings/uploads/<upload_id>/finalize', methods=['POST'])
+def api_finalize_chunked_upload(upload_id):
+    """API endpoint to verify and complete a chunked upload"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get('sha256'):
+            return jsonify({'error': 'sha256 is required'}), 400
+        
+        result = finalize_upload(upload_id, data.get('sha256'))
+        result['success'] = True
+        if result['job_id']:
+            result['status'] = 'queued'
+            result['status_url'] = f"/api/recordings/jobs/{result['job_id']}"
+            return jsonify(result), 202
+        result['filename'] = os.path.basename(result['filepath'])
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error finalizing upload {upload_id}: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/recordings/jobs/<job_id>')
+def api_recording_job(job_id):
+    """API endpoint to check the status of a recording conversion job"""
+    try:
+        job = conversion_queue.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        logger.error(f"Error fetching conversion job {job_id}: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/recordings/status')
 def api_recordings_status():
     """API endpoint to check active recording sessions"""
@@ -819,233 +1051,155 @@ def api_recordings_status():
 def api_meeting_recordings(meeting_id):
     """API endpoint to get recordings for a specific meeting"""
     try:
-        recordings_dir = meeting_recorder.get_recordings_dir()
-        meeting_recordings = []
-        
-        if os.path.exists(recordings_dir):
-            for filename in os.listdir(recordings_dir):
-                if (filename.endswith('.mp4') or filename.endswith('.webm')) and filename.startswith(meeting_id + '_'):
-                    filepath = os.path.join(recordings_dir, filename)
-                    stat = os.stat(filepath)
-                    
-                    # Parse filename
-                    file_base = filename.rsplit('.', 1)[0]
-                    parts = file_base.split('_')
-                    participant_id = parts[1] if len(parts) > 1 else 'Unknown'
-                    timestamp = '_'.join(parts[2:]) if len(parts) > 2 else 'Unknown'
-                    
-                    meeting_recordings.append({
-                        'filename': filename,
-                        'url': f'/recordings/{filename}',
-                        'participant_id': participant_id,
-                        'timestamp': timestamp,
-                        'size': stat.st_size,
-                        'size_mb': f"{stat.st_size / (1024*1024):.2f}",
-                        'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
-                    })
+        meeting_recordings = [{
+            'filename': rec['filename'],
+            'url': f"/recordings/{rec['filename']}",
+            'participant_id': rec['participant_id'],
+            'timestamp': rec['timestamp'],
+            'size': rec['size_bytes'],
+            'size_mb': f"{rec['size_bytes'] / (1024*1024):.2f}",
+            'duration': rec['duration'],
+            'video_codec': rec['video_codec'],
+            'audio_codec': rec['audio_codec'],
+            'created': rec['created'].isoformat()
+        } for rec in list_recordings(meeting_id)]
         
         return {'meeting_id': meeting_id, 'recordings': meeting_recordings}, 200
     except Exception as e:
         logger.error(f"Error fetching meeting recordings: {e}", exc_info=True)
         return {'error': str(e)}, 500
 
+@app.route('/api/recordings/meeting/<meeting_id>/manifest')
+def api_meeting_manifest(meeting_id):
+    """
+    Playback manifest for a meeting: one entry per recording with its HLS
+    master playlist and thumbnail track once packaging has finished, and the
+    progressive MP4 as a fallback.
+    """
+    try:
+        recordings = []
+        for rec in list_recordings(meeting_id):
+            entry = {
+                'filename': rec['filename'],
+                'participant_id': rec['participant_id'],
+                'timestamp': rec['timestamp'],
+                'duration': rec['duration'],
+                'mp4_url': f"/recordings/{rec['filename']}",
+            }
+            entry.update(package_info(rec['filename']))
+            recordings.append(entry)
+
+        return {'meeting_id': meeting_id, 'recordings': recordings}, 200
+    except Exception as e:
+        logger.error(f"Error building playback manifest: {e}", exc_info=True)
+        return {'error': str(e)}, 500
+
 @app.route('/api/transcripts/meeting/summary/<meeting_id>', methods=['GET'])
+@cached_meeting_response('summary')
 def api_summary_transcripts(meeting_id):
     """API endpoint to get summary of transcripts for a specific meeting"""
     try:
-        # Get the stitched transcripts
-        result = api_meeting_transcripts_stitched(meeting_id)
-
-        # Call the remote API instead of local function for testing
-        # remote_url = f"https://api.tutorl.ink/api/transcripts_stitched/meeting/{meeting_id}"
-        # resp = requests.get(remote_url)
-        # if resp.status_code != 200:
-        #     return {'error': f"Remote API error: {resp.text}"}, resp.status_code
-        # result = resp.json()
-        
-        # Handle tuple response (data, status_code)
-        if isinstance(result, tuple):
-            transcript_data, status_code = result
-            if status_code != 200:
-                return transcript_data, status_code
-        else:
-            transcript_data = result
-        
-        # Extract sentences from the stitched transcript
-        sentences = transcript_data.get('sentences', [])
-        if not sentences:
-            return {'error': 'No sentences found in transcript'}, 404
-        
-        # Build the conversation text for Gemini
-        conversation_text = "\n".join([
-            f"Speaker {s['participant_id']}: {s['text']}"
-            for s in sentences
-        ])
-        
-        # Configure Gemini API
-        api_key = os.environ.get('GEMINI_API_KEY')
-        if not api_key:
-            return {'error': 'GEMINI_API_KEY not configured'}, 500
+        from src.summaries import summary_service
         
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        # Get the stitched transcripts
+        transcript_data, status_code = stitched_transcript_response(meeting_id)
+        if status_code != 200:
+            return transcript_data, status_code
         
-        # Create prompt for summarization
-        prompt = f"""Please provide a concise summary of the following conversation between tutoring session participants. 
-Focus on the main topics discussed, key points made, and any important takeaways or action items.
-
-Conversation:
-{conversation_text}
-
-Summary:"""
+        if not transcript_data.get('sentences'):
+            return {'error': 'No sentences found in transcript'}, 404
         
-        # Generate summary
-        response = model.generate_content(prompt)
-        summary = response.text
+        if not summary_service.model.available():
+            return {'error': f"Summary model '{summary_service.model.name}' is not configured"}, 500
         
-        return {
-            'meeting_id': meeting_id,
-            'summary': summary,
-        }, 200
+        # Stored summaries are returned right away; otherwise generation runs in the background
+        summary = summary_service.request(meeting_id, transcript_data)
+        if summary['status'] == 'ready':
+            return {
+                'meeting_id': meeting_id,
+                'summary': summary['summary'],
+                'model': summary['model'],
+                'prompt_version': summary['prompt_version'],
+                'generated_at': summary['generated_at'],
+                'generation_seconds': summary['generation_seconds'],
+                'stats': summary['stats'],
+            }, 200
+        if summary['status'] == 'failed':
+            return {'meeting_id': meeting_id, 'status': 'failed', 'error': summary['error']}, 502
+        return {'meeting_id': meeting_id, 'status': 'pending'}, 202
         
     except Exception as e:
         logger.error(f"Error generating summary for meeting {meeting_id}: {e}", exc_info=True)
         return {'error': str(e)}, 500
 
 @app.route('/api/transcripts_stitched/meeting/<meeting_id>')
+@cached_meeting_response('stitched')
 def api_meeting_transcripts_stitched(meeting_id):
+    return stitched_transcript_response(meeting_id)
+
+
+def stitched_transcript_response(meeting_id):
+    """Stitched transcript as (data, status), shared by the stitched and summary endpoints"""
     try:
-        # Call the existing api_meeting_transcripts function
-        result = api_meeting_transcripts(meeting_id)
-        
-        # Handle both return types: tuple (dict, status_code) or Response object
-        if isinstance(result, tuple):
-            # Base case: returns (dict, status_code)
-            response_data, status_code = result
-            if status_code != 200:
-                return response_data, status_code
-        elif hasattr(result, 'get_json'):
-            # Current case: returns Response object from jsonify()
-            response_data = result.get_json()
-        else:
-            # Fallback: assume it's already a dict
-            response_data = result
-        
-        # Validate we have transcripts
-        transcripts_data = response_data.get('transcripts', [])
-        if not transcripts_data:
-            return {'error': 'No transcripts found for this meeting'}, 404
+        from src.stitching import get_stitched
         
-        # Process words from all participants
-        all_words = []
-        participants_with_words = 0
-        
-        for transcript in transcripts_data:
-            participant_id = transcript.get('participant_id')
-            words = transcript.get('words', [])
-            
-            if not words:
-                logger.warning(f"Participant {participant_id} has no words in transcript")
-                continue
-            
-            participants_with_words += 1
-            
-            # Extract and normalize words from this participant
-            for word in words:
-                all_words.append({
-                    'word': word.get('word', ''),
-                    'participant_id': participant_id,
-                    'start': word.get('start_time', 0)
-                })
+        # Served from the stitched file written when transcripts finish
+        stitched = get_stitched(meeting_id)
+        if stitched is None:
+            return {'error': 'No transcripts found for this meeting'}, 404
         
         # Check if we have any words to process
-        if not all_words:
+        if not stitched['total_words']:
             return {
                 'error': 'No words found in any transcript',
-                'participant_count': len(transcripts_data)
+                'participant_count': stitched['participant_count']
             }, 404
         
-        logger.info(f"Processing {len(all_words)} words from {participants_with_words} participants")
-        
-        # Sort all words by timestamp
-        all_words.sort(key=lambda x: x['start'])
-        
-        # Group words into sentences by speaker
-        sentences = []
-        if all_words:
-            cur_pid = all_words[0]['participant_id']
-            cur_words = []
-            
-            for w in all_words:
-                if w['participant_id'] != cur_pid:
-                    # Speaker changed, finalize current sentence
-                    if cur_words:
-                        text = " ".join([x['word'] for x in cur_words]).strip()
-                        if text:  # Only add non-empty sentences
-                            sentences.append({
-                                'participant_id': cur_pid, 
-                                'text': text, 
-                                'start': cur_words[0]['start'], 
-                                'end': cur_words[-1]['start']
-                            })
-                    cur_pid = w['participant_id']
-                    cur_words = [w]
-                else:
-                    cur_words.append(w)
-            
-            # Don't forget the last sentence
-            if cur_words:
-                text = " ".join([x['word'] for x in cur_words]).strip()
-                if text:  # Only add non-empty sentences
-                    sentences.append({
-                        'participant_id': cur_pid, 
-                        'text': text, 
-                        'start': cur_words[0]['start'], 
-                        'end': cur_words[-1]['start']
-                    })
-
-        return {
-            'sentences': sentences, 
-            'sentence_count': len(sentences),
-            'participant_count': participants_with_words,
-            'total_words': len(all_words)
-        }, 200
+        return stitched, 200
 
     except Exception as e:
         logger.error(f"Error stitching meeting transcripts: {e}", exc_info=True)
         return {'error': str(e)}, 500
 
+def _time_range_args():
+    """Optional ?start=&end= (seconds) for reading part of a transcript"""
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    return start, end
+
+
 @app.route('/api/transcripts/meeting/<meeting_id>')
+@cached_meeting_response('transcripts')
 def api_meeting_transcripts(meeting_id):
     """API endpoint to get transcripts for a specific meeting"""
     try:
         from src.transcription import transcription_service
-        transcripts_dir = transcription_service.get_transcripts_dir()
+        from src.transcript_store import read_transcript
+        start, end = _time_range_args()
         meeting_transcripts = []
         
-        if os.path.exists(transcripts_dir):
-            for filename in os.listdir(transcripts_dir):
-                if filename.endswith('_transcript.json') and filename.startswith(meeting_id + '_'):
-                    filepath = os.path.join(transcripts_dir, filename)
-                    
-                    # Parse filename
-                    parts = filename.replace('_transcript.json', '').split('_')
-                    participant_id = parts[1] if len(parts) > 1 else 'Unknown'
-                    
-                    # Read transcript data
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        transcript_data = json.load(f)
-                    
-                    stat = os.stat(filepath)
-                    meeting_transcripts.append({
-                        'filename': filename,
-                        'participant_id': participant_id,
-                        'transcript': transcript_data.get('transcript', ''),
-                        'words': transcript_data.get('words', []),
-                        'language': transcript_data.get('language', 'en-US'),
-                        'word_count': len(transcript_data.get('transcript', '').split()),
-                        'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
-                    })
+        # Only this meeting's directory is read
+        for filepath in transcription_service.list_meeting_transcripts(meeting_id):
+            filename = os.path.basename(filepath)
+            if not filename.startswith(meeting_id + '_'):
+                continue
+            
+            # meeting_participant_transcript.ext; the meeting ID is known, so participant IDs may contain underscores
+            participant_id = filename.rsplit('_transcript.', 1)[0][len(meeting_id) + 1:] or 'Unknown'
+            
+            # Read transcript data (JSON or columnar, same shape)
+            transcript_data = read_transcript(filepath, start, end)
+            
+            stat = os.stat(filepath)
+            meeting_transcripts.append({
+                'filename': filename,
+                'participant_id': participant_id,
+                'transcript': transcript_data.get('transcript', ''),
+                'words': transcript_data.get('words', []),
+                'language': transcript_data.get('language', 'en-US'),
+                'word_count': len(transcript_data.get('transcript', '').split()),
+                'created': datetime.fromtimestamp(stat.st_ctime).isoformat()
+            })
         
         return {'meeting_id': meeting_id, 'transcripts': meeting_transcripts}, 200
     except Exception as e:
@@ -1055,26 +1209,47 @@ def api_meeting_transcripts(meeting_id):
 
 @app.route('/transcripts/<meeting_id>/<participant_id>')
 def get_transcript(meeting_id, participant_id):
-    """Get transcript for a specific participant"""
+    """Get transcript for a specific participant, optionally only ?start=&end= seconds"""
     try:
         from src.transcription import transcription_service
-        transcripts_dir = transcription_service.get_transcripts_dir()
-        
-        filename = f"{meeting_id}_{participant_id}_transcript.json"
-        filepath = os.path.join(transcripts_dir, filename)
+        start, end = _time_range_args()
+        transcript_data = transcription_service.load_transcript(meeting_id, participant_id, start, end)
         
-        if not os.path.exists(filepath):
+        if transcript_data is None:
             return {'error': 'Transcript not found'}, 404
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            transcript_data = json.load(f)
-        
         return transcript_data, 200
     except Exception as e:
         logger.error(f"Error fetching transcript: {e}", exc_info=True)
         return {'error': str(e)}, 500
 
 
+@app.route('/api/transcription/cache')
+def get_transcription_cache_stats():
+    """Recognition cache hit/miss counters and recognition time saved"""
+    from src.transcription import transcription_service
+    return transcription_service.cache_stats(), 200
+
+
+@app.route('/api/transcription/queue')
+def get_transcription_queue_stats():
+    """Transcription queue depth, running jobs and average wait/run times"""
+    return transcription_queue.stats(), 200
+
+
+@app.route('/api/transcription/jobs/<job_id>')
+def get_transcription_job(job_id):
+    """API endpoint to check the status of a transcription job"""
+    try:
+        job = transcription_queue.get_job(job_id)
+        if not job:
+            return {'error': 'Job not found'}, 404
+        return job, 200
+    except Exception as e:
+        logger.error(f"Error fetching transcription job {job_id}: {e}", exc_info=True)
+        return {'error': str(e)}, 500
+
+
 @app.route('/event/create', methods=['POST'])
 @jwt_required()
 def post_create_event():
@@ -1122,6 +1297,32 @@ def get_event_offer(event_id):
         return {'error': str(e)}, 500
 
 
+# Largest number of offers accepted in one batch request
+OFFER_BATCH_MAX = int(os.getenv('OFFER_BATCH_MAX', '500'))
+
+
+# Add the current user as a possible tutor to many events at once
+@app.route('/events/offers', methods=['POST'])
+@jwt_required()
+def post_event_offers():
+    offers = (request.get_json(silent=True) or {}).get('offers')
+    if not isinstance(offers, list) or not offers:
+        return {'error': 'offers must be a non-empty list of {eventid, start, end}'}, 400
+    if len(offers) > OFFER_BATCH_MAX:
+        return {'error': f'At most {OFFER_BATCH_MAX} offers per request'}, 400
+    try:
+        results = add_possible_tutor_batch(int(get_jwt_identity()), offers)
+        return {
+            'results': results,
+            'created': sum(1 for r in results if r['status'] == 'created'),
+        }, 200
+    except Exception as e:
+        print(f"Error in post_event_offers: {e}")
+        import traceback
+        traceback.print_exc()
+        return {'error': str(e)}, 500
+
+
 # Accept a tutor for an event
 @app.route('/event/<int:event_id>/accept', methods=['POST'])
 @jwt_required()
@@ -1148,14 +1349,35 @@ def list_event_offers(event_id):
     except Exception as e:
         return {'error': str(e)}, 500
 
-# Get all events
+# List events a page at a time (see event_page_args for filters)
 @app.route('/events', methods=['GET'])
 @jwt_required()
 def get_all_events():
     try:
-        events = list_events()
-        return {'events': events}, 200
+        return list_events(**event_page_args(request.args)), 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+# Open events overlapping a time window (?from=&to=, Unix timestamps)
+@app.route('/events/available', methods=['GET'])
+@jwt_required()
+def get_events_available():
+    try:
+        page = event_page_args(request.args)
+        window_start, window_end = page.pop('start_from'), page.pop('start_to')
+        if window_start is None or window_end is None:
+            return {'error': 'from and to are required'}, 400
+        if window_end <= window_start:
+            return {'error': 'to must be after from'}, 400
+        return list_available_events(window_start, window_end, **page), 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
     except Exception as e:
+        print(f"Error in get_events_available: {e}")
+        import traceback
+        traceback.print_exc()
         return {'error': str(e)}, 500
 
 # Get events for a specific tutee
@@ -1164,8 +1386,9 @@ def get_all_events():
 def get_tutee_events():
     try:
         userid_tutee = int(get_jwt_identity())
-        events = list_tutee_events(userid_tutee)
-        return {'events': events}, 200
+        return list_tutee_events(userid_tutee, **event_page_args(request.args)), 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
     except Exception as e:
         print(f"Error in get_tutee_events: {e}")
         import traceback
@@ -1178,8 +1401,9 @@ def get_tutee_events():
 def get_tutor_events():
     try:
         userid_tutor = int(get_jwt_identity())
-        events = list_tutor_events(userid_tutor)
-        return {'events': events}, 200
+        return list_tutor_events(userid_tutor, **event_page_args(request.args)), 200
+    except ValueError as e:
+        return {'error': str(e)}, 400
     except Exception as e:
         print(f"Error in get_tutor_events: {e}")
         import traceback
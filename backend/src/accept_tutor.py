@@ -1,6 +1,17 @@
-from src.models import RequestedEvent
+from src.models import RequestedEvent, TutorOffer
 from src.database import get_db
-import json
+
+
+def accepted_tutor_data(event):
+    """Accepted tutor and agreed times of an event as returned by the API, or None."""
+    if event.userid_tutor is None:
+        return None
+    return {
+        'userid_tutor': event.userid_tutor,
+        'start': event.accepted_start,
+        'end': event.accepted_end
+    }
+
 
 def accept_tutor(eventid, userid_tutor):
     with get_db() as db:
@@ -9,21 +20,24 @@ def accept_tutor(eventid, userid_tutor):
         if not event:
             raise ValueError(f"Event {eventid} not found")
 
-        if event.possible_tutors:
-            possible_tutors_list = json.loads(event.possible_tutors)
-        else:
+        offers = db.query(TutorOffer).filter(TutorOffer.eventid == eventid).all()
+        if not offers:
             raise ValueError(f"No possible tutors for event {eventid}")
 
-        # Find the tutor info
-        tutor_info = next((t for t in possible_tutors_list if t['userid_tutor'] == userid_tutor), None)
+        # Find the tutor's offer
+        offer = next((o for o in offers if o.userid_tutor == userid_tutor), None)
 
-        if not tutor_info:
+        if not offer:
             raise ValueError(f"Tutor {userid_tutor} not found in possible tutors for event {eventid}")
+
+        for other in offers:
+            other.status = 'accepted' if other is offer else 'declined'
+
         # Set the accepted tutor
-        event.userid_tutor = json.dumps(tutor_info)
+        event.userid_tutor = offer.userid_tutor
+        event.accepted_start = offer.start
+        event.accepted_end = offer.end
         event.is_accepted = True
 
         db.flush()
-        return tutor_info
-
-  
+        return accepted_tutor_data(event)
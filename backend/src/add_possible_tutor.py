@@ -1,6 +1,12 @@
-from src.models import RequestedEvent
+from src.models import RequestedEvent, TutorOffer
 from src.database import get_db
-import json
+from src.list_offers import offers_for_events
+from sqlalchemy import and_, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING ... RETURNING
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
 
 
 def add_possible_tutor(eventid, userid_tutor, start, end):
@@ -16,37 +22,123 @@ def add_possible_tutor(eventid, userid_tutor, start, end):
     Returns:
         Updated list of possible tutors
     """
+    if start is None or end is None:
+        raise ValueError("Offer start and end are required")
+    
     with get_db() as db:
         event = db.query(RequestedEvent).filter(RequestedEvent.eventid == eventid).first()
         
         if not event:
             raise ValueError(f"Event {eventid} not found")
         
-        # Parse existing possible tutors or create new list
-        if event.possible_tutors:
-            possible_tutors_list = json.loads(event.possible_tutors)
-        else:
-            possible_tutors_list = []
-        
-        # Add new tutor info
-        tutor_info = {
-            'userid_tutor': userid_tutor,
-            'start': start,
-            'end': end
-        }
+        # A tutor's first offer on an event stands
+        existing = db.query(TutorOffer).filter(
+            TutorOffer.eventid == eventid,
+            TutorOffer.userid_tutor == userid_tutor
+        ).first()
         
-        # Check if tutor already in list
-        if not any(t['userid_tutor'] == userid_tutor for t in possible_tutors_list):
-            possible_tutors_list.append(tutor_info)
+        if not existing:
+            db.add(TutorOffer(
+                eventid=eventid,
+                userid_tutor=userid_tutor,
+                start=int(start),
+                end=int(end),
+                status='offered'
+            ))
+            db.flush()
         
-        # Update event
-        event.possible_tutors = json.dumps(possible_tutors_list)
-        db.flush()
+        return offers_for_events(db, [eventid])[eventid]
 
-        
-        
-        return possible_tutors_list
 
+def _offer_time(value):
+    if isinstance(value, bool):
+        raise ValueError
+    return int(value)
 
 
+def _insert_new_offers(db, new_offers):
+    """Insert offers, skipping any the tutor already has. Returns the event ids of the created offers."""
+    insert_offers = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if insert_offers:
+        return set(db.scalars(
+            insert_offers(TutorOffer).on_conflict_do_nothing(index_elements=['eventid', 'userid_tutor'])
+            .returning(TutorOffer.eventid, sort_by_parameter_order=True),
+            new_offers
+        ))
+
+    # Dialects without ON CONFLICT: one savepoint per offer, so a conflict only skips that offer
+    created = set()
+    for offer in new_offers:
+        try:
+            with db.begin_nested():
+                db.execute(insert(TutorOffer), offer)
+            created.add(offer['eventid'])
+        except IntegrityError:
+            pass
+    return created
+
+
+def add_possible_tutor_batch(userid_tutor, offers):
+    """
+    Add a tutor's offers on many events at once.
+    
+    The events are checked with one query and the new offers written in one
+    transaction. Invalid items are reported and skipped; they do not stop
+    the others.
+    
+    Args:
+        userid_tutor: ID of the tutor
+        offers: List of {'eventid', 'start', 'end'}
         
+    Returns:
+        One result per offer, in order: {'eventid', 'status'} where status is
+        'created', 'exists' (the tutor already offered) or 'invalid' (with 'error')
+    """
+    results = []
+    pending = {}
+    for item in offers:
+        eventid = item.get('eventid') if isinstance(item, dict) else None
+        result = {'eventid': eventid}
+        results.append(result)
+        try:
+            eventid = int(eventid)
+            start, end = _offer_time(item.get('start')), _offer_time(item.get('end'))
+        except (TypeError, ValueError):
+            result.update(status='invalid', error="eventid, start and end must be integers")
+            continue
+        if end <= start:
+            result.update(status='invalid', error="end must be after start")
+        elif eventid in pending:
+            result.update(status='invalid', error=f"Duplicate offer on event {eventid}")
+        else:
+            result['eventid'] = eventid
+            pending[eventid] = (result, start, end)
+
+    if not pending:
+        return results
+
+    with get_db() as db:
+        # Each event with the tutor's existing offer on it, if any
+        rows = db.query(RequestedEvent.eventid, RequestedEvent.is_deleted, TutorOffer.offerid).outerjoin(
+            TutorOffer, and_(TutorOffer.eventid == RequestedEvent.eventid, TutorOffer.userid_tutor == userid_tutor)
+        ).filter(RequestedEvent.eventid.in_(list(pending))).all()
+        found = {eventid: (is_deleted, offerid) for eventid, is_deleted, offerid in rows}
+
+        new_offers = []
+        for eventid, (result, start, end) in pending.items():
+            if eventid not in found or found[eventid][0]:
+                result.update(status='invalid', error=f"Event {eventid} not found")
+            elif found[eventid][1] is not None:
+                # A tutor's first offer on an event stands
+                result['status'] = 'exists'
+            else:
+                new_offers.append({'eventid': eventid, 'userid_tutor': userid_tutor, 'start': start, 'end': end,
+                                   'status': 'offered'})
+
+        if new_offers:
+            # An offer written concurrently since the check is skipped instead of failing the batch
+            created = _insert_new_offers(db, new_offers)
+            for offer in new_offers:
+                pending[offer['eventid']][0]['status'] = 'created' if offer['eventid'] in created else 'exists'
+
+    return results
@@ -0,0 +1,144 @@
+"""
+Split long speech audio into bounded chunks at silences.
+
+Synchronous recognition only accepts about a minute of audio, so long
+recordings are cut into chunks that stay under that limit. Cuts are placed
+in the middle of a pause wherever one falls inside the allowed window, so
+words are not split between chunks; otherwise the chunk is cut at the
+maximum length.
+"""
+
+import logging
+import os
+import re
+import subprocess
+from typing import List, Optional, Tuple
+
+from src.conversion import speech_codec_args
+
+logger = logging.getLogger(__name__)
+
+# Chunk length bounds in seconds (upper bound stays under the sync recognize limit)
+CHUNK_MAX_SECONDS = float(os.getenv('TRANSCRIPTION_CHUNK_MAX_SECONDS', '55'))
+CHUNK_MIN_SECONDS = float(os.getenv('TRANSCRIPTION_CHUNK_MIN_SECONDS', '20'))
+# What counts as silence for ffmpeg's silencedetect
+SILENCE_THRESHOLD = os.getenv('TRANSCRIPTION_SILENCE_THRESHOLD', '-35dB')
+SILENCE_MIN_SECONDS = float(os.getenv('TRANSCRIPTION_SILENCE_MIN_SECONDS', '0.4'))
+
+SILENCE_START_RE = re.compile(r'silence_start: (-?[\d.]+)')
+SILENCE_END_RE = re.compile(r'silence_end: (-?[\d.]+)')
+
+
+def detect_silences(audio_path: str) -> List[Tuple[float, float]]:
+    """
+    Find pauses in an audio file with ffmpeg's silencedetect filter.
+
+    Args:
+        audio_path: Path to the audio file
+
+    Returns:
+        List of (start, end) times in seconds
+    """
+    command = [
+        'ffmpeg', '-hide_banner', '-nostats', '-i', audio_path,
+        '-af', f'silencedetect=noise={SILENCE_THRESHOLD}:d={SILENCE_MIN_SECONDS}',
+        '-f', 'null', '-'
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=600)
+    if result.returncode != 0:
+        logger.warning(f"Silence detection failed for {audio_path}, chunks will be cut at fixed length")
+        return []
+
+    silences = []
+    start = None
+    for line in result.stderr.decode(errors='ignore').splitlines():
+        match = SILENCE_START_RE.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = SILENCE_END_RE.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]],
+                max_seconds: float = CHUNK_MAX_SECONDS,
+                min_seconds: float = CHUNK_MIN_SECONDS) -> List[Tuple[float, float]]:
+    """
+    Choose chunk boundaries for an audio file.
+
+    Each chunk ends in the middle of the latest pause between ``min_seconds``
+    and ``max_seconds`` after its start, or at ``max_seconds`` if there is none.
+
+    Args:
+        duration: Audio length in seconds
+        silences: (start, end) pauses from detect_silences
+        max_seconds: Longest allowed chunk
+        min_seconds: Shortest chunk worth cutting at a pause
+
+    Returns:
+        List of (start, end) times covering the whole file
+    """
+    cut_points = sorted((start + end) / 2 for start, end in silences)
+    chunks = []
+    start = 0.0
+    while duration - start > max_seconds:
+        candidates = [t for t in cut_points if start + min_seconds <= t <= start + max_seconds]
+        end = candidates[-1] if candidates else start + max_seconds
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, duration))
+    return chunks
+
+
+def split_audio(audio_path: str, chunks: List[Tuple[float, float]], output_dir: str) -> List[Tuple[str, float]]:
+    """
+    Write each planned chunk as its own speech-ready FLAC file in one ffmpeg run.
+
+    Args:
+        audio_path: Path to the source audio
+        chunks: (start, end) times from plan_chunks
+        output_dir: Directory for the chunk files
+
+    Returns:
+        List of (chunk path, offset in seconds), in order, for the chunks ffmpeg wrote
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cut_times = ','.join(f'{start:.3f}' for start, _ in chunks[1:])
+    pattern = os.path.join(output_dir, 'chunk_%04d.flac')
+
+    # The segment muxer takes the place of the flac container
+    command = ['ffmpeg', '-y', '-i', audio_path] + speech_codec_args() + ['-f', 'segment', '-reset_timestamps', '1']
+    if cut_times:
+        command += ['-segment_times', cut_times]
+    command += [pattern]
+
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=600)
+    if result.returncode != 0:
+        raise RuntimeError(f"Splitting audio failed: {result.stderr.decode(errors='ignore')[-500:]}")
+
+    # Cut times past the real end of the audio (e.g. an overestimated duration) produce no file
+    written = [(pattern % i, start) for i, (start, _) in enumerate(chunks) if os.path.exists(pattern % i)]
+    if not written:
+        raise RuntimeError(f"Splitting audio wrote no chunks for {audio_path}")
+    if len(written) < len(chunks):
+        logger.warning(f"Splitting {audio_path} wrote {len(written)} of {len(chunks)} planned chunks")
+    return written
+
+
+def chunk_audio(audio_path: str, duration: float, output_dir: str) -> Optional[List[Tuple[str, float]]]:
+    """
+    Split an audio file at silences into chunks short enough for synchronous recognition.
+
+    Returns:
+        List of (chunk path, offset in seconds), or None if splitting failed
+    """
+    try:
+        chunks = plan_chunks(duration, detect_silences(audio_path))
+        logger.info(f"Splitting {audio_path} ({duration:.1f}s) into {len(chunks)} chunks")
+        return split_audio(audio_path, chunks, output_dir)
+    except Exception as e:
+        logger.error(f"Error chunking audio {audio_path}: {e}", exc_info=True)
+        return None
@@ -0,0 +1,153 @@
+"""
+Interval index of open event requests, for matching tutors to requests.
+
+Finding open requests whose availability overlaps a tutor's free time is an
+interval overlap query (``start < to AND end > from``), which a B-tree on
+either column can only answer by scanning every request on one side of the
+window. On SQLite the open requests are mirrored into an R*Tree virtual
+table, ``event_availability``, which answers the overlap in logarithmic time
+plus the number of matches:
+
+    eventid    requested_event id
+    start_min  availability start, in whole minutes since the Unix epoch (rounded down)
+    end_min    availability end, in whole minutes since the Unix epoch (rounded up)
+    +category  auxiliary column, filtered while reading matches
+
+``rtree_i32`` coordinates are 32-bit, which in seconds would overflow in
+2038; in minutes they last for thousands of years. The rounding only ever
+widens an interval, so the index returns a superset of the overlapping
+requests and callers re-check the exact times on the matched rows.
+
+Triggers on ``requested_event`` keep it in sync, so every code path that
+writes events (the ORM, scripts, raw SQL) updates it. Accepted and deleted
+requests are removed. Databases without R*Tree support use a range query on
+the start time index instead.
+"""
+
+import logging
+import math
+from datetime import datetime, timezone
+from typing import Tuple
+
+from sqlalchemy import text
+
+from src.database import engine
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_TABLE = 'event_availability'
+
+# Index columns of the current layout; older databases indexed Unix seconds as start_ts/end_ts
+_COLUMNS = ('eventid', 'start_min', 'end_min', 'category')
+
+
+def _minutes(column: str, round_up: bool = False) -> str:
+    """SQL converting a datetime column to whole minutes since the Unix epoch."""
+    seconds = f"CAST(strftime('%s', {column}) AS INTEGER)"
+    return f"({seconds} + 59) / 60" if round_up else f"{seconds} / 60"
+
+
+# Copies a new or updated row into the index if the request is open
+_INSERT_NEW = f"""
+    INSERT INTO {AVAILABILITY_TABLE} (eventid, start_min, end_min, category)
+    SELECT NEW.eventid, {_minutes('NEW.available_start_time')},
+           {_minutes('NEW.available_end_time', round_up=True)}, NEW.category
+    WHERE NOT COALESCE(NEW.is_accepted, 0) AND NOT COALESCE(NEW.is_deleted, 0)"""
+
+_TRIGGER_NAMES = ('event_availability_insert', 'event_availability_update', 'event_availability_delete')
+
+_TRIGGERS = [
+    f"""
+        CREATE TRIGGER IF NOT EXISTS event_availability_insert AFTER INSERT ON requested_event
+        BEGIN {_INSERT_NEW}; END""",
+    f"""
+        CREATE TRIGGER IF NOT EXISTS event_availability_update
+        AFTER UPDATE OF available_start_time, available_end_time, category, is_accepted, is_deleted
+        ON requested_event
+        BEGIN
+            DELETE FROM {AVAILABILITY_TABLE} WHERE eventid = OLD.eventid;
+            {_INSERT_NEW};
+        END""",
+    f"""
+        CREATE TRIGGER IF NOT EXISTS event_availability_delete AFTER DELETE ON requested_event
+        BEGIN DELETE FROM {AVAILABILITY_TABLE} WHERE eventid = OLD.eventid; END""",
+]
+
+_available = None
+
+
+def availability_index_available() -> bool:
+    """Whether the database supports the R*Tree availability index."""
+    global _available
+    if _available is None:
+        _available = False
+        if engine.dialect.name == 'sqlite':
+            with engine.connect() as conn:
+                try:
+                    conn.execute(text("CREATE VIRTUAL TABLE temp.rtree_probe USING rtree_i32(id, a, b, +c)"))
+                    conn.execute(text("DROP TABLE temp.rtree_probe"))
+                    _available = True
+                except Exception as e:
+                    logger.warning(f"SQLite R*Tree is unavailable ({e}); availability queries use the start time index")
+    return _available
+
+
+def create_availability_index():
+    """
+    Create the availability R*Tree and its triggers, filling it from existing open requests.
+
+    An index in an older layout is dropped along with its triggers and rebuilt.
+    """
+    if not availability_index_available():
+        return
+
+    with engine.begin() as conn:
+        columns = tuple(row[1] for row in conn.execute(text(f"PRAGMA table_info({AVAILABILITY_TABLE})")))
+        if columns and columns != _COLUMNS:
+            logger.info(f"Rebuilding availability index with columns {columns}")
+            for name in _TRIGGER_NAMES:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            conn.execute(text(f"DROP TABLE {AVAILABILITY_TABLE}"))
+        if columns != _COLUMNS:
+            conn.execute(text(f"CREATE VIRTUAL TABLE {AVAILABILITY_TABLE} "
+                              "USING rtree_i32(eventid, start_min, end_min, +category)"))
+            count = conn.execute(text(
+                f"INSERT INTO {AVAILABILITY_TABLE} (eventid, start_min, end_min, category) "
+                f"SELECT eventid, {_minutes('available_start_time')}, "
+                f"{_minutes('available_end_time', round_up=True)}, category "
+                "FROM requested_event WHERE NOT COALESCE(is_accepted, 0) AND NOT COALESCE(is_deleted, 0)"
+            )).rowcount
+            logger.info(f"Indexed availability of {count} open events")
+        for sql in _TRIGGERS:
+            conn.execute(text(sql))
+
+
+def overlapping_event_ids_sql(category=None) -> str:
+    """
+    SQL selecting the ids of open events whose availability may overlap ``[:start, :end)``.
+
+    Bind ``start`` and ``end`` from ``window_minutes()`` (and ``category`` if
+    given). The result can include events that end or start within a minute of
+    the window, so callers must still compare the exact times.
+    Only valid when ``availability_index_available()``.
+    """
+    sql = f"SELECT eventid FROM {AVAILABILITY_TABLE} WHERE start_min < :end AND end_min > :start"
+    if category:
+        sql += " AND category = :category"
+    return sql
+
+
+def window_minutes(start: datetime, end: datetime) -> Tuple[int, int]:
+    """
+    Bind values for ``overlapping_event_ids_sql`` covering ``[start, end)``.
+
+    Args:
+        start: Window start (naive UTC datetime)
+        end: Window end (naive UTC datetime)
+
+    Returns:
+        ``(start, end)`` in whole minutes since the Unix epoch, widened outwards
+    """
+    start_seconds = int(start.replace(tzinfo=timezone.utc).timestamp())
+    end_seconds = math.ceil(end.replace(tzinfo=timezone.utc).timestamp())
+    return start_seconds // 60, -(-end_seconds // 60)
@@ -0,0 +1,266 @@
+"""
+Resumable chunked uploads for meeting recordings.
+
+Protocol:
+    1. init     - create an upload session and an empty temp file
+    2. append   - write a chunk at a given byte offset (at most the bytes received so far)
+    3. status   - ask for the current offset to resume after a dropped connection
+    4. finalize - verify the SHA-256 of the whole file and move it into the recordings directory
+
+Chunks are streamed from the request straight to the temp file, so memory per
+upload is bounded by the read buffer rather than the recording size.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import uuid
+import weakref
+from typing import BinaryIO, Dict, Optional
+
+from src.database import get_db
+from src.models import UploadSession
+
+logger = logging.getLogger(__name__)
+
+# Directory holding in-progress uploads
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+
+# Largest chunk accepted in one append request
+MAX_CHUNK_SIZE = int(os.getenv('UPLOAD_MAX_CHUNK_SIZE', str(8 * 1024 * 1024)))
+# Read buffer used while streaming a chunk to disk
+READ_BUFFER_SIZE = 256 * 1024
+
+ALLOWED_EXTENSIONS = ('webm', 'mp4')
+
+# Lock per upload in use, so retried or parallel requests for one upload run one at a time
+_upload_locks = weakref.WeakValueDictionary()
+_upload_locks_guard = threading.Lock()
+
+
+class UploadOffsetMismatch(ValueError):
+    """Raised when a chunk does not start where the previous one ended."""
+
+    def __init__(self, expected_offset: int):
+        super().__init__(f"Chunk offset does not match, expected {expected_offset}")
+        self.expected_offset = expected_offset
+
+
+def _upload_lock(uploadid: str) -> threading.Lock:
+    with _upload_locks_guard:
+        lock = _upload_locks.get(uploadid)
+        if lock is None:
+            lock = _upload_locks[uploadid] = threading.Lock()
+        return lock
+
+
+def _current_offset(temp_path: str) -> int:
+    # The temp file itself is the source of truth, so a partially written
+    # chunk from a dropped connection is kept and the client resumes after it
+    return os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
+
+
+def _session_to_dict(upload: UploadSession) -> Dict:
+    return {
+        'upload_id': upload.uploadid,
+        'meeting_id': upload.meeting_id,
+        'participant_id': upload.participant_id,
+        'status': upload.status,
+        'offset': _current_offset(upload.temp_path) if upload.status == 'open' else upload.total_size,
+        'total_size': upload.total_size,
+        'max_chunk_size': MAX_CHUNK_SIZE,
+    }
+
+
+def init_upload(meeting_id: str, participant_id: str, file_extension: str = 'webm',
+                total_size: Optional[int] = None) -> Dict:
+    """
+    Start a new chunked upload.
+
+    Args:
+        meeting_id: The meeting ID
+        participant_id: The participant ID
+        file_extension: Container of the recording (webm or mp4)
+        total_size: Expected size in bytes, if known
+
+    Returns:
+        Upload session details including the upload ID
+    """
+    if file_extension not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Unsupported file extension: {file_extension}")
+
+    uploadid = uuid.uuid4().hex
+    temp_path = os.path.join(UPLOADS_DIR, f"{uploadid}.{file_extension}.part")
+    open(temp_path, 'wb').close()
+
+    with get_db() as db:
+        upload = UploadSession(
+            uploadid=uploadid,
+            meeting_id=meeting_id,
+            participant_id=participant_id,
+            file_extension=file_extension,
+            temp_path=temp_path,
+            total_size=total_size,
+            status='open'
+        )
+        db.add(upload)
+        db.flush()
+        logger.info(f"Started chunked upload {uploadid} for meeting {meeting_id}, participant {participant_id}")
+        return _session_to_dict(upload)
+
+
+def get_upload(uploadid: str) -> Optional[Dict]:
+    """Get the state of an upload session, or None if it does not exist."""
+    with get_db() as db:
+        upload = db.query(UploadSession).filter(UploadSession.uploadid == uploadid).first()
+        return _session_to_dict(upload) if upload else None
+
+
+def append_chunk(uploadid: str, offset: int, stream: BinaryIO) -> int:
+    """
+    Append a chunk to an open upload.
+
+    A chunk may start before the current offset, e.g. when a client resends a
+    chunk whose response was lost; the file is cut back to ``offset`` first.
+    A chunk that is too large is discarded.
+
+    Args:
+        uploadid: The upload ID
+        offset: Byte offset the chunk starts at
+        stream: Readable stream with the chunk bytes
+
+    Returns:
+        The new offset (total bytes received)
+    """
+    with _upload_lock(uploadid):
+        return _append_chunk(uploadid, offset, stream)
+
+
+def _append_chunk(uploadid: str, offset: int, stream: BinaryIO) -> int:
+    with get_db() as db:
+        upload = db.query(UploadSession).filter(UploadSession.uploadid == uploadid).first()
+        if not upload:
+            raise ValueError(f"Upload {uploadid} not found")
+        if upload.status != 'open':
+            raise ValueError(f"Upload {uploadid} is already {upload.status}")
+        temp_path = upload.temp_path
+        total_size = upload.total_size
+
+    current = _current_offset(temp_path)
+    if not 0 <= offset <= current:
+        raise UploadOffsetMismatch(current)
+
+    written = 0
+    with open(temp_path, 'r+b') as f:
+        f.seek(offset)
+        f.truncate()
+        while True:
+            buf = stream.read(READ_BUFFER_SIZE)
+            if not buf:
+                break
+            # Check the limits before writing so an oversized chunk leaves nothing behind
+            if written + len(buf) > MAX_CHUNK_SIZE:
+                f.truncate(offset)
+                raise ValueError(f"Chunk exceeds maximum size of {MAX_CHUNK_SIZE} bytes")
+            if total_size is not None and offset + written + len(buf) > total_size:
+                f.truncate(offset)
+                raise ValueError(f"Upload exceeds declared size of {total_size} bytes")
+            f.write(buf)
+            written += len(buf)
+
+    return offset + written
+
+
+def finalize_upload(uploadid: str, sha256: str) -> Dict:
+    """
+    Verify an upload's checksum and move it into the recordings directory.
+
+    Finalizing an already finalized upload returns the stored result, so a
+    client whose finalize response was lost can safely retry. A retry after
+    the file was moved but before the upload was marked finalized picks up
+    from the moved file, and reuses the conversion job if one was queued.
+
+    Args:
+        uploadid: The upload ID
+        sha256: Hex SHA-256 digest of the complete file
+
+    Returns:
+        Dict with the saved file path and, for webm, the conversion job ID
+    """
+    with _upload_lock(uploadid):
+        return _finalize_upload(uploadid, sha256)
+
+
+def _finalize_upload(uploadid: str, sha256: str) -> Dict:
+    from src.recording import save_recording_file, schedule_transcription
+    from src.recording_index import index_recording
+    from src.conversion_jobs import conversion_queue
+    from src.packaging import schedule_packaging
+
+    with get_db() as db:
+        upload = db.query(UploadSession).filter(UploadSession.uploadid == uploadid).first()
+        if not upload:
+            raise ValueError(f"Upload {uploadid} not found")
+
+        result = {
+            'upload_id': uploadid,
+            'meeting_id': upload.meeting_id,
+            'participant_id': upload.participant_id,
+            'filepath': upload.final_path,
+            'job_id': upload.jobid,
+            'size_bytes': upload.total_size,
+        }
+        if upload.status == 'finalized':
+            return result
+
+        temp_path = upload.temp_path
+        file_extension = upload.file_extension
+        total_size = upload.total_size
+        filepath = upload.final_path
+
+    if filepath and os.path.exists(filepath):
+        # An earlier attempt verified and moved the file but did not finish
+        size_bytes = os.path.getsize(filepath)
+    else:
+        size_bytes = _current_offset(temp_path)
+        if size_bytes == 0:
+            raise ValueError('Empty upload')
+        if total_size is not None and size_bytes != total_size:
+            raise ValueError(f"Upload incomplete: received {size_bytes} of {total_size} bytes")
+
+        digest = hashlib.sha256()
+        with open(temp_path, 'rb') as f:
+            for buf in iter(lambda: f.read(READ_BUFFER_SIZE), b''):
+                digest.update(buf)
+        if digest.hexdigest() != (sha256 or '').lower():
+            raise ValueError('Checksum mismatch')
+
+        filepath = save_recording_file(result['meeting_id'], result['participant_id'], temp_path, file_extension)
+        with get_db() as db:
+            upload = db.query(UploadSession).filter(UploadSession.uploadid == uploadid).first()
+            upload.final_path = filepath
+
+    jobid = result['job_id']
+    if file_extension == 'webm':
+        if jobid is None:
+            jobid = conversion_queue.submit(result['meeting_id'], result['participant_id'], filepath)
+            # Recorded right away so a retry returns this job instead of queuing another
+            with get_db() as db:
+                upload = db.query(UploadSession).filter(UploadSession.uploadid == uploadid).first()
+                upload.jobid = jobid
+    else:
+        index_recording(filepath, result['meeting_id'], result['participant_id'])
+        schedule_transcription(result['meeting_id'], result['participant_id'], filepath)
+        schedule_packaging(filepath)
+
+    with get_db() as db:
+        upload = db.query(UploadSession).filter(UploadSession.uploadid == uploadid).first()
+        upload.status = 'finalized'
+        upload.final_path = filepath
+        upload.total_size = size_bytes
+
+    logger.info(f"Finalized chunked upload {uploadid}: {filepath} ({size_bytes} bytes)")
+    result.update({'filepath': filepath, 'job_id': jobid, 'size_bytes': size_bytes})
+    return result
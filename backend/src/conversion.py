@@ -0,0 +1,207 @@
+"""
+FFmpeg helpers for converting uploaded recordings into web-playable MP4.
+
+Conversion picks the cheapest valid path for each input:
+    remux     - streams are already MP4/browser compatible, copy them into a new container
+    audio     - video can be copied, only the audio track is re-encoded to AAC
+    transcode - full H.264/AAC re-encode (fallback)
+
+The same ffmpeg run can also write the speech-ready audio track (16 kHz mono
+FLAC) as a second output, so a recording is decoded once for both playback
+and transcription.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds a single ffmpeg conversion may run before it is killed
+CONVERSION_TIMEOUT = int(os.getenv('CONVERSION_TIMEOUT', '1800'))
+# 'auto' picks the cheapest path, 'transcode' always re-encodes
+CONVERSION_STRATEGY = os.getenv('CONVERSION_STRATEGY', 'auto')
+# Encoder policy for the full re-encode path
+CONVERSION_PRESET = os.getenv('CONVERSION_PRESET', 'medium')
+CONVERSION_CRF = os.getenv('CONVERSION_CRF', '23')
+CONVERSION_AUDIO_BITRATE = os.getenv('CONVERSION_AUDIO_BITRATE', '128k')
+
+# Codecs that can be copied into an MP4 that plays in every browser
+MP4_VIDEO_CODECS = {'h264'}
+MP4_AUDIO_CODECS = {'aac', 'mp3'}
+
+
+def probe_media(input_path: str) -> Optional[Dict]:
+    """
+    Read the codecs of a media file with ffprobe.
+
+    Args:
+        input_path: Path to the media file
+
+    Returns:
+        Dict with 'video_codec', 'audio_codec' (None when the stream is missing),
+        'height' and 'duration', or None if probing failed
+    """
+    command = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'stream=codec_type,codec_name,height:format=duration',
+        '-of', 'json',
+        input_path
+    ]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+        if result.returncode != 0:
+            logger.warning(f"ffprobe failed for {input_path}: {result.stderr.decode(errors='ignore')}")
+            return None
+
+        info = json.loads(result.stdout or b'{}')
+        streams = info.get('streams', [])
+        video_stream = next((s for s in streams if s.get('codec_type') == 'video'), {})
+        video = video_stream.get('codec_name')
+        audio = next((s['codec_name'] for s in streams if s.get('codec_type') == 'audio'), None)
+        duration = info.get('format', {}).get('duration')
+
+        return {
+            'video_codec': video,
+            'audio_codec': audio,
+            'height': video_stream.get('height'),
+            # MediaRecorder webm often has no duration in its header
+            'duration': float(duration) if duration not in (None, 'N/A') else None,
+        }
+    except Exception as e:
+        logger.warning(f"Error probing {input_path}: {e}")
+        return None
+
+
+def choose_strategy(probe: Optional[Dict]) -> str:
+    """Pick the cheapest conversion path for the probed streams."""
+    if CONVERSION_STRATEGY == 'transcode' or not probe:
+        return 'transcode'
+
+    video_ok = probe['video_codec'] in MP4_VIDEO_CODECS
+    audio_ok = probe['audio_codec'] is None or probe['audio_codec'] in MP4_AUDIO_CODECS
+
+    if video_ok and audio_ok:
+        return 'remux'
+    if video_ok:
+        return 'audio'
+    return 'transcode'
+
+
+def _codec_args(strategy: str):
+    if strategy == 'remux':
+        return ['-c', 'copy']
+    if strategy == 'audio':
+        return ['-c:v', 'copy', '-c:a', 'aac', '-b:a', CONVERSION_AUDIO_BITRATE]
+    return [
+        '-c:v', 'libx264',  # Re-encode video to h264
+        '-preset', CONVERSION_PRESET,
+        '-crf', CONVERSION_CRF,
+        '-c:a', 'aac',      # Re-encode audio to aac
+        '-b:a', CONVERSION_AUDIO_BITRATE,
+    ]
+
+
+def speech_codec_args() -> list:
+    """ffmpeg codec, channel and rate options for speech audio, without the output format."""
+    return [
+        '-vn',  # No video
+        '-c:a', 'flac',  # Lossless, and much smaller than LINEAR16
+        '-ac', '1',  # Mono
+        '-ar', '16000',  # 16kHz sample rate
+    ]
+
+
+def speech_audio_args() -> list:
+    """ffmpeg output options for the audio sent to speech recognition."""
+    return speech_codec_args() + ['-f', 'flac']
+
+
+def _run_ffmpeg(input_path: str, part_path: str, strategy: str,
+                audio_part_path: Optional[str] = None) -> Optional[str]:
+    """Run one conversion attempt. Returns an error message, or None on success."""
+    convert_cmd = ['ffmpeg', '-y', '-i', input_path, '-map', '0:v?', '-map', '0:a?'] + _codec_args(strategy) + [
+        '-movflags', '+faststart',  # Optimize for web playback
+        '-f', 'mp4',
+        part_path
+    ]
+    if audio_part_path:
+        # Second output from the same decode: speech-ready audio track
+        convert_cmd += ['-map', '0:a:0'] + speech_audio_args() + [audio_part_path]
+
+    try:
+        logger.info(f"Converting to mp4 ({strategy}): {' '.join(convert_cmd)}")
+        result = subprocess.run(convert_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=CONVERSION_TIMEOUT)
+
+        if result.returncode != 0:
+            error_output = result.stderr.decode(errors='ignore')
+            logger.error(f"ffmpeg conversion failed. stderr={error_output}")
+            return error_output[-500:]
+        return None
+    except subprocess.TimeoutExpired:
+        logger.error(f"ffmpeg conversion timed out for {input_path}")
+        return 'Video conversion timed out'
+
+
+def convert_to_mp4(input_path: str, output_path: str, audio_path: Optional[str] = None) -> Dict:
+    """
+    Convert a recording to MP4 using the cheapest valid path.
+
+    Files are written to temporary ``.part`` paths and renamed into place
+    once ffmpeg succeeds, so a crash mid-convert never leaves a truncated MP4
+    next to the finished recordings. A failed remux falls back to a full
+    re-encode.
+
+    Args:
+        input_path: Path to the source recording (usually webm)
+        output_path: Final MP4 path
+        audio_path: If given, also write the 16 kHz mono FLAC track for transcription
+
+    Returns:
+        Dict with 'success', 'error', 'strategy' (path used), 'seconds'
+        (wall-clock conversion time), 'audio_path' (None if not written) and 'probe'
+    """
+    part_path = output_path + '.part'
+    started = time.monotonic()
+    probe = probe_media(input_path)
+    strategy = choose_strategy(probe)
+
+    # Skip the audio output when the input is known to have no audio track
+    if probe and probe['audio_codec'] is None:
+        audio_path = None
+    audio_part_path = audio_path + '.part' if audio_path else None
+
+    try:
+        error = _run_ffmpeg(input_path, part_path, strategy, audio_part_path)
+        if error and strategy != 'transcode':
+            logger.warning(f"{strategy} failed for {input_path}, falling back to full transcode")
+            strategy = 'transcode'
+            error = _run_ffmpeg(input_path, part_path, strategy, audio_part_path)
+
+        if not error:
+            os.replace(part_path, output_path)
+            if audio_part_path:
+                os.replace(audio_part_path, audio_path)
+            logger.info(f"Successfully converted to MP4 via {strategy} in {time.monotonic() - started:.1f}s: {output_path}")
+    except Exception as e:
+        logger.error(f"Exception during conversion: {e}", exc_info=True)
+        error = str(e)
+    finally:
+        for path in (part_path, audio_part_path):
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    return {
+        'success': error is None,
+        'error': error,
+        'strategy': strategy,
+        'seconds': round(time.monotonic() - started, 3),
+        'audio_path': audio_path if error is None else None,
+        'probe': probe,
+    }
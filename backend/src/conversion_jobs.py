@@ -0,0 +1,278 @@
+"""
+Durable background queue for webm -> mp4 recording conversion.
+Jobs are persisted in the ``conversion_job`` table so they survive restarts,
+and a bounded pool of workers runs at most ``CONVERSION_WORKERS`` ffmpeg
+processes at a time.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from src.database import get_db
+from src.models import ConversionJob
+from src.conversion import convert_to_mp4
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of concurrent ffmpeg conversions
+CONVERSION_WORKERS = int(os.getenv('CONVERSION_WORKERS', '2'))
+# Attempts before a job is marked failed
+CONVERSION_MAX_ATTEMPTS = int(os.getenv('CONVERSION_MAX_ATTEMPTS', '3'))
+# Seconds before the first retry of a failed conversion; doubles with every attempt
+CONVERSION_RETRY_DELAY = float(os.getenv('CONVERSION_RETRY_DELAY', '10'))
+
+
+def _job_to_dict(job: ConversionJob) -> Dict:
+    return {
+        'job_id': job.jobid,
+        'status': job.status,
+        'meeting_id': job.meeting_id,
+        'participant_id': job.participant_id,
+        'output_path': job.output_path if job.status == 'done' else None,
+        'filename': os.path.basename(job.output_path) if job.status == 'done' else None,
+        'attempts': job.attempts,
+        'strategy': job.strategy,
+        'conversion_seconds': job.conversion_seconds,
+        'error': job.error,
+        'created': job.created_at.isoformat() if job.created_at else None,
+        'updated': job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+class ConversionJobQueue:
+    """
+    Runs conversion jobs on a bounded worker pool.
+    Each worker drives one ffmpeg subprocess, so the pool size caps the
+    number of encoders running on the host.
+    """
+
+    def __init__(self, max_workers: int = CONVERSION_WORKERS, max_attempts: int = CONVERSION_MAX_ATTEMPTS,
+                 retry_delay: float = CONVERSION_RETRY_DELAY):
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ffmpeg-worker')
+            return self._executor
+
+    def start(self):
+        """Start the worker pool and resume any jobs left over from a previous run."""
+        self._get_executor()
+        self._recover()
+
+    def _recover(self):
+        """Requeue jobs that were queued or interrupted mid-convert."""
+        with get_db() as db:
+            pending = db.query(ConversionJob).filter(ConversionJob.status.in_(['queued', 'running'])).all()
+            resume_ids = []
+            for job in pending:
+                if job.status == 'running' and job.attempts >= self.max_attempts:
+                    job.status = 'failed'
+                    job.error = job.error or 'Conversion interrupted too many times'
+                    continue
+                job.status = 'queued'
+                resume_ids.append(job.jobid)
+
+        if resume_ids:
+            logger.info(f"Resuming {len(resume_ids)} conversion job(s) from previous run")
+        for jobid in resume_ids:
+            self._get_executor().submit(self._run, jobid)
+
+    def submit(self, meeting_id: str, participant_id: str, input_path: str, transcribe: bool = True) -> str:
+        """
+        Queue a recording for conversion.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            input_path: Path to the saved source recording
+            transcribe: Whether to transcribe the MP4 once converted
+
+        Returns:
+            The new job ID
+        """
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(os.path.dirname(input_path), base_name + '.mp4')
+        jobid = uuid.uuid4().hex
+
+        with get_db() as db:
+            db.add(ConversionJob(
+                jobid=jobid,
+                meeting_id=meeting_id,
+                participant_id=participant_id,
+                input_path=input_path,
+                output_path=output_path,
+                status='queued',
+                attempts=0,
+                transcribe=transcribe
+            ))
+
+        logger.info(f"Queued conversion job {jobid} for {input_path}")
+        self._get_executor().submit(self._run, jobid)
+        return jobid
+
+    def get_job(self, jobid: str) -> Optional[Dict]:
+        """Get the current state of a job, or None if it does not exist."""
+        with get_db() as db:
+            job = db.query(ConversionJob).filter(ConversionJob.jobid == jobid).first()
+            return _job_to_dict(job) if job else None
+
+    def _claim(self, jobid: str) -> Optional[ConversionJob]:
+        """Atomically move a queued job to running so it is only converted once."""
+        with get_db() as db:
+            claimed = db.query(ConversionJob).filter(
+                ConversionJob.jobid == jobid,
+                ConversionJob.status == 'queued'
+            ).update({
+                'status': 'running',
+                'attempts': ConversionJob.attempts + 1
+            }, synchronize_session=False)
+            if not claimed:
+                return None
+            job = db.query(ConversionJob).filter(ConversionJob.jobid == jobid).first()
+            db.expunge(job)
+            return job
+
+    def request_transcription(self, jobid: str) -> bool:
+        """
+        Transcribe a job's recording even if it was queued without transcription.
+
+        Args:
+            jobid: The conversion job ID
+
+        Returns:
+            True if the recording will be transcribed, False if the job does not exist or failed
+        """
+        with get_db() as db:
+            # One statement, so a job finishing concurrently either sees the flag or is already done
+            pending = db.query(ConversionJob).filter(
+                ConversionJob.jobid == jobid,
+                ConversionJob.status.in_(['queued', 'running'])
+            ).update({'transcribe': True}, synchronize_session=False)
+            if pending:
+                return True
+            job = db.query(ConversionJob).filter(ConversionJob.jobid == jobid, ConversionJob.status == 'done').first()
+            if not job:
+                return False
+            meeting_id, participant_id, output_path = job.meeting_id, job.participant_id, job.output_path
+
+        from src.recording import schedule_transcription
+        return schedule_transcription(meeting_id, participant_id, output_path) is not None
+
+    def _finish(self, jobid: str, status: str, error: Optional[str] = None, result: Optional[Dict] = None) -> bool:
+        """Update a job's status. Returns whether the job should be transcribed."""
+        with get_db() as db:
+            job = db.query(ConversionJob).filter(ConversionJob.jobid == jobid).first()
+            if not job:
+                return False
+            job.status = status
+            job.error = error
+            if result:
+                job.strategy = result['strategy']
+                job.conversion_seconds = result['seconds']
+            return bool(job.transcribe)
+
+    def _retry_later(self, jobid: str, attempts: int):
+        """Run a queued job again after an exponential backoff."""
+        delay = self.retry_delay * 2 ** max(attempts - 1, 0)
+
+        def resubmit():
+            with self._lock:
+                executor = self._executor
+            # After shutdown the job stays queued and is resumed on the next start
+            if executor is not None:
+                executor.submit(self._run, jobid)
+
+        timer = threading.Timer(delay, resubmit)
+        timer.daemon = True
+        timer.start()
+        return delay
+
+    def _complete(self, job: ConversionJob, result: Optional[Dict], audio_path: Optional[str] = None):
+        """Index, package and transcribe a converted recording, then mark its job done."""
+        try:
+            os.remove(job.input_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove temp file: {e}")
+
+        from src.recording_index import index_recording, remove_recording
+        index_recording(job.output_path, job.meeting_id, job.participant_id)
+        remove_recording(os.path.basename(job.input_path))
+
+        # Read the flag again: transcription may have been requested while converting.
+        # Transcription is queued first so packaging cannot drop the local MP4 before it.
+        if self._finish(job.jobid, 'done', result=result):
+            from src.recording import schedule_transcription
+            schedule_transcription(job.meeting_id, job.participant_id, job.output_path, audio_path)
+
+        from src.packaging import schedule_packaging
+        schedule_packaging(job.output_path)
+
+    def _run(self, jobid: str):
+        """Worker entry point: convert one job, retrying on failure."""
+        try:
+            job = self._claim(jobid)
+            if not job:
+                return
+
+            if not os.path.exists(job.input_path):
+                if os.path.exists(job.output_path):
+                    # Converted before an interruption; only the steps after conversion are left
+                    logger.info(f"Conversion job {jobid} already converted, finishing: {job.output_path}")
+                    audio_path = None
+                    if job.transcribe:
+                        from src.transcription import transcription_service
+                        audio_path = transcription_service.audio_path_for(job.output_path)
+                    self._complete(job, None, audio_path if audio_path and os.path.exists(audio_path) else None)
+                else:
+                    self._finish(jobid, 'failed', f"Source recording missing: {job.input_path}")
+                return
+
+            logger.info(f"Conversion job {jobid} attempt {job.attempts}/{self.max_attempts}")
+            # Write the transcription audio in the same ffmpeg pass
+            audio_path = None
+            if job.transcribe:
+                from src.transcription import transcription_service
+                audio_path = transcription_service.audio_path_for(job.output_path)
+
+            result = convert_to_mp4(job.input_path, job.output_path, audio_path)
+
+            if not result['success']:
+                error = result['error']
+                if job.attempts < self.max_attempts:
+                    self._finish(jobid, 'queued', error, result)
+                    delay = self._retry_later(jobid, job.attempts)
+                    logger.warning(f"Conversion job {jobid} failed, retrying in {delay:.0f}s: {error}")
+                else:
+                    # Keep the source file so the recording can still be recovered
+                    logger.error(f"Conversion job {jobid} failed permanently: {error}")
+                    self._finish(jobid, 'failed', error, result)
+                return
+
+            self._complete(job, result, result['audio_path'])
+            logger.info(f"Conversion job {jobid} done via {result['strategy']} in {result['seconds']}s: {job.output_path}")
+        except Exception as e:
+            logger.error(f"Error running conversion job {jobid}: {e}", exc_info=True)
+            self._finish(jobid, 'failed', str(e))
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work. Unfinished jobs stay queued in the database."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+# Global conversion queue instance
+conversion_queue = ConversionJobQueue()
@@ -0,0 +1,320 @@
+"""
+Benchmark of the event listing endpoints on a seeded database.
+
+Seeds the database at ``DATABASE_URL`` with tutees, tutors, events and
+offers, then times requests to the endpoints through the Flask test client.
+Point ``DATABASE_URL`` at a scratch database; seeding is skipped when it
+already holds events. From ``backend/``:
+
+    DATABASE_URL=sqlite:////tmp/events.db python -m src.event_benchmark --events 100000
+
+``--offers N`` also compares offering through ``/event/<id>/offer`` one at a
+time against the batch endpoint ``/events/offers``.
+
+``--legacy`` seeds an empty database in the layout of older versions (offers
+in the ``possible_tutors`` JSON blob, the accepted tutor as JSON text in
+``userid_tutor``) and times the old tutor listing, a scan of every event
+decoding its blob, before the app's startup migrations convert the data and
+the endpoints are timed on the same events.
+"""
+
+import argparse
+import json
+import logging
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from src.database import get_db, init_db
+from src.migrations import _add_columns, _column_names, _load_blob
+from src.models import RequestedEvent, TutorOffer, User
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'Computer Science', 'Economics']
+
+# Rows per executemany while seeding
+SEED_BATCH = 5000
+
+
+# Event columns of the layout before tutor_offer, as the old code wrote them
+_LEGACY_INSERT = text(
+    "INSERT INTO requested_event (eventid, userid_tutee, available_start_time, available_end_time, category, "
+    "title, description, userid_tutor, possible_tutors, is_accepted, is_deleted) VALUES (:eventid, "
+    ":userid_tutee, :available_start_time, :available_end_time, :category, :title, :description, "
+    ":userid_tutor, :possible_tutors, :is_accepted, :is_deleted)"
+)
+
+
+def _legacy_rows(event_rows, offer_rows):
+    """Fold offers into per-event blobs and the accepted tutor into JSON text, as older versions stored them."""
+    blobs = {}
+    for offer in offer_rows:
+        blobs.setdefault(offer['eventid'], []).append(
+            {'userid_tutor': offer['userid_tutor'], 'start': offer['start'], 'end': offer['end']})
+
+    rows = []
+    for event in event_rows:
+        accepted = None
+        if event['userid_tutor'] is not None:
+            accepted = json.dumps({'userid_tutor': event['userid_tutor'], 'start': event['accepted_start'],
+                                   'end': event['accepted_end']})
+        offers = blobs.get(event['eventid'])
+        rows.append(dict(
+            {key: event[key] for key in ('eventid', 'userid_tutee', 'available_start_time', 'available_end_time',
+                                         'category', 'title', 'description', 'is_accepted', 'is_deleted')},
+            userid_tutor=accepted,
+            # A JSON column holding the JSON-encoded string, like json.dumps into Column(JSON) did
+            possible_tutors=json.dumps(json.dumps(offers)) if offers else None,
+        ))
+    return rows
+
+
+def seed_events(events: int, users: int = 2000, offers_per_event: int = 3,
+                accepted_ratio: float = 0.3, seed: int = 0, legacy: bool = False):
+    """
+    Insert users and ``events`` requested events with random offers.
+
+    Every user can be both tutee and tutor. Events span a year from now; a
+    share of them have accepted one of their offers. With ``legacy`` the
+    events are written in the layout of older versions (see ``_legacy_rows``).
+    """
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    if legacy:
+        _add_columns('requested_event', {'possible_tutors': 'JSON'})
+
+    with get_db() as db:
+        db.execute(insert(User), [{'email': f'user{i}@example.com', 'password': 'x', 'name': f'User {i}'}
+                                  for i in range(users)])
+        userids = [u for (u,) in db.query(User.userid).all()]
+
+    for first in range(0, events, SEED_BATCH):
+        event_rows, offer_rows = [], []
+        with get_db() as db:
+            next_id = (db.query(RequestedEvent.eventid).order_by(RequestedEvent.eventid.desc()).limit(1).scalar()
+                       or 0) + 1
+            for eventid in range(next_id, next_id + min(SEED_BATCH, events - first)):
+                available_start = start + timedelta(minutes=rng.randrange(365 * 24 * 4) * 15)
+                available_end = available_start + timedelta(hours=rng.choice([1, 2, 3, 4, 8]))
+                tutee = rng.choice(userids)
+                tutors = rng.sample(userids, rng.randint(0, offers_per_event * 2))
+                offer_start = int(available_start.timestamp())
+                accepted = tutors[0] if tutors and rng.random() < accepted_ratio else None
+
+                event_rows.append({
+                    'eventid': eventid,
+                    'userid_tutee': tutee,
+                    'available_start_time': available_start,
+                    'available_end_time': available_end,
+                    'category': rng.choice(CATEGORIES),
+                    'title': f'Event {eventid}',
+                    'description': 'Seeded for benchmarks',
+                    'userid_tutor': accepted,
+                    'accepted_start': offer_start if accepted else None,
+                    'accepted_end': offer_start + 3600 if accepted else None,
+                    'is_accepted': accepted is not None,
+                    'is_deleted': rng.random() < 0.05,
+                })
+                for tutor in tutors:
+                    offer_rows.append({
+                        'eventid': eventid,
+                        'userid_tutor': tutor,
+                        'start': offer_start,
+                        'end': offer_start + 3600,
+                        'status': 'offered' if accepted is None else ('accepted' if tutor == accepted
+                                                                      else 'declined'),
+                        'created_at': datetime.utcnow(),
+                    })
+            if legacy:
+                db.execute(_LEGACY_INSERT, _legacy_rows(event_rows, offer_rows))
+            else:
+                db.execute(insert(RequestedEvent), event_rows)
+                if offer_rows:
+                    db.execute(insert(TutorOffer), offer_rows)
+        logger.info(f"Seeded {first + len(event_rows)} events")
+
+
+def legacy_list_tutor_events(userid_tutor):
+    """
+    The tutor listing of older versions: read every event and keep those whose
+    ``possible_tutors`` blob holds an offer from the tutor.
+
+    Rows are read with plain SQL rather than ORM objects, so this is a lower
+    bound on what the old endpoint cost.
+    """
+    with get_db() as db:
+        rows = db.execute(text(
+            "SELECT eventid, userid_tutee, title, category, description, possible_tutors, userid_tutor, "
+            "is_accepted, available_start_time, available_end_time FROM requested_event"
+        )).fetchall()
+
+    event_list = []
+    for row in rows:
+        possible_tutors = _load_blob(row.possible_tutors) or []
+        if any(tutor['userid_tutor'] == userid_tutor for tutor in possible_tutors):
+            event_list.append({
+                'eventid': row.eventid,
+                'userid_tutee': row.userid_tutee,
+                'title': row.title,
+                'category': row.category,
+                'description': row.description,
+                'possible_tutors': possible_tutors,
+                'userid_tutor': _load_blob(row.userid_tutor),
+                'is_accepted': row.is_accepted,
+                'available_start_time': row.available_start_time,
+                'available_end_time': row.available_end_time,
+            })
+    return event_list
+
+
+def _timing_summary(timings, sizes):
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 2),
+        'max_ms': round(timings[-1], 2),
+        'mean_bytes': round(statistics.mean(sizes)),
+    }
+
+
+def time_legacy(userids, repeat: int = 3):
+    """
+    Time the legacy tutor listing, including encoding its response, as each user.
+
+    Returns:
+        {'requests', 'median_ms', 'p95_ms', 'max_ms', 'mean_bytes'}
+    """
+    timings, sizes = [], []
+    for _ in range(repeat):
+        for userid in userids:
+            began = time.perf_counter()
+            body = json.dumps({'events': legacy_list_tutor_events(userid)}, default=str)
+            timings.append((time.perf_counter() - began) * 1000)
+            sizes.append(len(body))
+    return _timing_summary(timings, sizes)
+
+
+def time_endpoint(client, path: str, headers_for, userids, repeat: int = 3):
+    """
+    Time GET requests to ``path`` as each user.
+
+    Returns:
+        {'requests', 'median_ms', 'p95_ms', 'max_ms', 'mean_bytes'}
+    """
+    timings, sizes = [], []
+    for _ in range(repeat):
+        for userid in userids:
+            began = time.perf_counter()
+            response = client.get(path, headers=headers_for(userid))
+            timings.append((time.perf_counter() - began) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} as user {userid} returned {response.status_code}")
+            sizes.append(len(response.data))
+    return _timing_summary(timings, sizes)
+
+
+def time_offers(client, headers, eventids, batch_size: int = 100):
+    """
+    Time offering on ``eventids`` one request per offer, then the same number
+    of offers (on the next events) through the batch endpoint.
+
+    Returns:
+        Offers per second and total seconds of each path
+    """
+    half = len(eventids) // 2
+    single, batched = eventids[:half], eventids[half:2 * half]
+
+    began = time.perf_counter()
+    for eventid in single:
+        response = client.post(f'/event/{eventid}/offer', headers=headers, json={'start': 0, 'end': 3600})
+        if response.status_code != 200:
+            raise RuntimeError(f"Offer on event {eventid} returned {response.status_code}")
+    single_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    for i in range(0, len(batched), batch_size):
+        offers = [{'eventid': eventid, 'start': 0, 'end': 3600} for eventid in batched[i:i + batch_size]]
+        response = client.post('/events/offers', headers=headers, json={'offers': offers})
+        if response.status_code != 200 or response.json['created'] != len(offers):
+            raise RuntimeError(f"Batch offer returned {response.status_code}: {response.json}")
+    batch_seconds = time.perf_counter() - began
+
+    return {
+        'offers': half,
+        'single_seconds': round(single_seconds, 2),
+        'single_offers_per_second': round(half / single_seconds),
+        'batch_size': batch_size,
+        'batch_seconds': round(batch_seconds, 2),
+        'batch_offers_per_second': round(half / batch_seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000, help='Events to seed')
+    parser.add_argument('--users', type=int, default=2000, help='Users to seed')
+    parser.add_argument('--sample', type=int, default=20, help='Users to request as')
+    parser.add_argument('--endpoint', action='append', help='Endpoint to time (repeatable)')
+    parser.add_argument('--offers', type=int, default=0,
+                        help='Also time this many offers, half single and half batched (writes offers)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Offers per batch request')
+    parser.add_argument('--legacy', action='store_true',
+                        help='Seed in the old layout and time the old tutor listing before migrating')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    with get_db() as db:
+        seeded = db.query(RequestedEvent).count()
+    if not seeded:
+        began = time.perf_counter()
+        seed_events(args.events, users=args.users, legacy=args.legacy)
+        logger.info(f"Seeded in {time.perf_counter() - began:.1f}s")
+
+    results = {}
+    if args.legacy:
+        with get_db() as db:
+            legacy = ('possible_tutors' in _column_names('requested_event') and db.execute(text(
+                "SELECT 1 FROM requested_event WHERE possible_tutors IS NOT NULL LIMIT 1")).first())
+            userids = [u for (u,) in db.query(User.userid).order_by(User.userid).limit(args.sample).all()]
+        if not legacy:
+            raise SystemExit("--legacy needs an empty database or one seeded with --legacy and not yet migrated")
+        results['legacy /events/tutor'] = time_legacy(userids)
+
+    # Import late: the app initializes and migrates the database it points at on import
+    from flask_jwt_extended import create_access_token
+    from app import app
+
+    with app.app_context():
+        tokens = {}
+
+        def headers_for(userid):
+            if userid not in tokens:
+                tokens[userid] = create_access_token(identity=str(userid))
+            return {'Authorization': f'Bearer {tokens[userid]}'}
+
+        with get_db() as db:
+            userids = [u for (u,) in db.query(User.userid).order_by(User.userid).limit(args.sample).all()]
+        client = app.test_client()
+        results.update({path: time_endpoint(client, path, headers_for, userids)
+                        for path in args.endpoint or ['/events/tutor']})
+
+        if args.offers:
+            # The last user offers on events they have not offered on yet
+            with get_db() as db:
+                tutor = db.query(User.userid).order_by(User.userid.desc()).limit(1).scalar()
+                offered = db.query(TutorOffer.eventid).filter(TutorOffer.userid_tutor == tutor)
+                eventids = [e for (e,) in db.query(RequestedEvent.eventid).filter(
+                    RequestedEvent.eventid.notin_(offered), RequestedEvent.is_deleted == False
+                ).order_by(RequestedEvent.eventid).limit(args.offers).all()]
+            results['offers'] = time_offers(client, headers_for(tutor), eventids, args.batch_size)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,220 @@
-from src.models import RequestedEvent
+from src.models import RequestedEvent, TutorOffer
 from src.database import get_db
+from src.list_offers import offers_for_events
+from src.accept_tutor import accepted_tutor_data
+from src.queries import available_events_query
+from sqlalchemy import or_
+from sqlalchemy.orm import load_only
+from datetime import datetime, timezone
+import base64
 import json
+import os
 
-def list_events():
+# Events per page when the request gives no limit, and the largest page allowed
+EVENTS_PAGE_SIZE = int(os.getenv('EVENTS_PAGE_SIZE', '100'))
+EVENTS_MAX_PAGE_SIZE = int(os.getenv('EVENTS_MAX_PAGE_SIZE', '500'))
+
+# Fields of an event in listings, and the columns each one reads
+EVENT_FIELDS = {
+    'eventid': ['eventid'],
+    'userid_tutee': ['userid_tutee'],
+    'title': ['title'],
+    'category': ['category'],
+    'description': ['description'],
+    'possible_tutors': [],
+    'userid_tutor': ['userid_tutor', 'accepted_start', 'accepted_end'],
+    'is_accepted': ['is_accepted'],
+    'available_start_time': ['available_start_time'],
+    'available_end_time': ['available_end_time'],
+}
+
+
+def encode_cursor(event):
+    """Opaque cursor pointing after an event in (start time, eventid) order."""
+    raw = json.dumps([event.available_start_time.isoformat(), event.eventid])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        start, eventid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(start), int(eventid)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _timestamp_arg(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        # Stored times are naive UTC
+        return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f"{name} must be a Unix timestamp")
+
+
+def event_page_args(args):
+    """
+    Read listing options from request query arguments.
+
+    Query arguments:
+        category: Only events in this category
+        accepted: 'true' or 'false' to only list accepted or open events
+        from, to: Only events whose availability starts in [from, to) (Unix timestamps)
+        eventid: Only this event
+        fields: Comma-separated fields to include (default all)
+        limit: Page size (default EVENTS_PAGE_SIZE, at most EVENTS_MAX_PAGE_SIZE)
+        cursor: next_cursor of the previous page
+
+    Returns:
+        Keyword arguments for the list functions
+
+    Raises:
+        ValueError: If an argument is invalid
+    """
+    accepted = args.get('accepted')
+    if accepted not in (None, ''):
+        if accepted.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError("accepted must be true or false")
+        accepted = accepted.lower() in ('true', '1')
+    else:
+        accepted = None
+
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in EVENT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    limit = args.get('limit')
+    try:
+        limit = int(limit) if limit not in (None, '') else EVENTS_PAGE_SIZE
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= EVENTS_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {EVENTS_MAX_PAGE_SIZE}")
+
+    eventid = args.get('eventid')
+    try:
+        eventid = int(eventid) if eventid not in (None, '') else None
+    except ValueError:
+        raise ValueError("eventid must be an integer")
+
+    return {
+        'category': args.get('category') or None,
+        'accepted': accepted,
+        'start_from': _timestamp_arg(args, 'from'),
+        'start_to': _timestamp_arg(args, 'to'),
+        'eventid': eventid,
+        'fields': fields,
+        'limit': limit,
+        'cursor': args.get('cursor') or None,
+    }
+
+
+def _event_list(db, events, fields=None):
+    """Serialize events, loading all of their offers in one query."""
+    fields = fields or list(EVENT_FIELDS)
+    offers = offers_for_events(db, [event.eventid for event in events]) if 'possible_tutors' in fields else {}
+    event_list = []
+
+    for event in events:
+        event_data = {}
+        for field in fields:
+            if field == 'possible_tutors':
+                event_data[field] = offers[event.eventid]
+            elif field == 'userid_tutor':
+                event_data[field] = accepted_tutor_data(event)
+            else:
+                event_data[field] = getattr(event, field)
+        event_list.append(event_data)
+
+    return event_list
+
+
+def _event_page(db, query, category=None, accepted=None, start_from=None, start_to=None, eventid=None,
+                fields=None, limit=EVENTS_PAGE_SIZE, cursor=None):
     """
-    List all requested events in the database.
-    
+    Apply filters and a keyset page in (available_start_time, eventid) order to an event query.
+
     Returns:
-        A list of all requested events with their details.
+        {'events': [...], 'next_cursor': cursor of the next page or None}
+    """
+    query = query.filter(RequestedEvent.is_deleted == False)
+    if category:
+        query = query.filter(RequestedEvent.category == category)
+    if accepted is not None:
+        query = query.filter(RequestedEvent.is_accepted == accepted)
+    if start_from:
+        query = query.filter(RequestedEvent.available_start_time >= start_from)
+    if start_to:
+        query = query.filter(RequestedEvent.available_start_time < start_to)
+    if eventid is not None:
+        query = query.filter(RequestedEvent.eventid == eventid)
+    if cursor:
+        after_start, after_id = decode_cursor(cursor)
+        # The >= bound lets the database seek the start time index to the cursor
+        query = query.filter(
+            RequestedEvent.available_start_time >= after_start,
+            or_(RequestedEvent.available_start_time > after_start, RequestedEvent.eventid > after_id)
+        )
+
+    # Only read the columns of the requested fields (plus the sort key)
+    columns = {'eventid', 'available_start_time'}
+    for field in fields or EVENT_FIELDS:
+        columns.update(EVENT_FIELDS[field])
+    query = query.options(load_only(*[getattr(RequestedEvent, column) for column in columns]))
+
+    # One extra row tells whether there is a next page
+    events = query.order_by(
+        RequestedEvent.available_start_time, RequestedEvent.eventid
+    ).limit(limit + 1).all()
+    next_cursor = encode_cursor(events[limit - 1]) if len(events) > limit else None
+    events = events[:limit]
+
+    return {'events': _event_list(db, events, fields), 'next_cursor': next_cursor}
+
+
+def list_events(**page):
+    """
+    List requested events that are not deleted, one page at a time.
+
+    Args:
+        **page: Filters and page options from event_page_args
+
+    Returns:
+        {'events': [...], 'next_cursor': cursor of the next page or None}
     """
     with get_db() as db:
-        events = db.query(RequestedEvent).all()
-        event_list = []
-        
-        for event in events:
-            event_data = {
-                'eventid': event.eventid,
-                'userid_tutee': event.userid_tutee,
-                'title': event.title,
-                'category': event.category,
-                'description': event.description,
-                'possible_tutors': json.loads(event.possible_tutors) if event.possible_tutors else [],
-                'userid_tutor': json.loads(event.userid_tutor) if event.userid_tutor else None,
-                'is_accepted': event.is_accepted,
-                'available_start_time': event.available_start_time,
-                'available_end_time': event.available_end_time
-            }
-            event_list.append(event_data)
-        
-        return event_list
-
-def list_tutee_events(userid_tutee):
+        return _event_page(db, db.query(RequestedEvent), **page)
+
+def list_tutee_events(userid_tutee, **page):
     """
     Lists the events requested by a specific tutee.
     """
     with get_db() as db:
-        events = db.query(RequestedEvent).filter(RequestedEvent.userid_tutee == userid_tutee).all()
-        event_list = []
-        
-        for event in events:
-            event_data = {
-                'eventid': event.eventid,
-                'userid_tutee': event.userid_tutee,
-                'title': event.title,
-                'category': event.category,
-                'description': event.description,
-                'possible_tutors': json.loads(event.possible_tutors) if event.possible_tutors else [],
-                'userid_tutor': json.loads(event.userid_tutor) if event.userid_tutor else None,
-                'is_accepted': event.is_accepted,
-                'available_start_time': event.available_start_time,
-                'available_end_time': event.available_end_time
-            }
-            event_list.append(event_data)
-        
-        return event_list
-
-def list_tutor_events(userid_tutor):
+        query = db.query(RequestedEvent).filter(RequestedEvent.userid_tutee == userid_tutee)
+        return _event_page(db, query, **page)
+
+def list_tutor_events(userid_tutor, **page):
+    """
+    Lists the events where a specific tutor has made offers or was accepted.
+    """
+    with get_db() as db:
+        # Both conditions are index lookups (tutor_offer and requested_event tutor indexes)
+        offered = db.query(TutorOffer.eventid).filter(TutorOffer.userid_tutor == userid_tutor)
+        query = db.query(RequestedEvent).filter(or_(
+            RequestedEvent.eventid.in_(offered),
+            RequestedEvent.userid_tutor == userid_tutor
+        ))
+        return _event_page(db, query, **page)
+
+def list_available_events(window_start, window_end, **page):
     """
-    Lists the events where a specific tutor has made offers.
+    Lists open events whose availability overlaps a tutor's free time [window_start, window_end).
     """
     with get_db() as db:
-        events = db.query(RequestedEvent).all()
-        tutor_event_list = []
-        
-        for event in events:
-            if event.possible_tutors:
-                possible_tutors_list = json.loads(event.possible_tutors)
-                if any(t['userid_tutor'] == userid_tutor for t in possible_tutors_list):
-                    event_data = {
-                        'eventid': event.eventid,
-                        'userid_tutee': event.userid_tutee,
-                        'title': event.title,
-                        'category': event.category,
-                        'description': event.description,
-                        'possible_tutors': possible_tutors_list,
-                        'userid_tutor': json.loads(event.userid_tutor) if event.userid_tutor else None,
-                        'is_accepted': event.is_accepted,
-                        'available_start_time': event.available_start_time,
-                        'available_end_time': event.available_end_time
-                    }
-                    tutor_event_list.append(event_data)
-        
-        return tutor_event_list
\ No newline at end of file
+        query = available_events_query(db, window_start, window_end, page.get('category'))
+        return _event_page(db, query, **page)
@@ -1,6 +1,41 @@
-from src.models import RequestedEvent
+from src.models import RequestedEvent, TutorOffer
 from src.database import get_db
-import json
+
+# Event ids per IN (...) query, below SQLite's bound parameter limit
+OFFER_QUERY_BATCH = 500
+
+
+def offer_data(offer):
+    """Dictionary of a tutor offer as returned by the API."""
+    return {
+        'userid_tutor': offer.userid_tutor,
+        'start': offer.start,
+        'end': offer.end,
+        'status': offer.status
+    }
+
+
+def offers_for_events(db, eventids):
+    """
+    Load the offers of many events with one indexed query per batch of events.
+    
+    Args:
+        db: Open database session
+        eventids: IDs of the requested events
+        
+    Returns:
+        Dictionary of event ID to its offers in the order they were made
+    """
+    eventids = list(eventids)
+    offers = {eventid: [] for eventid in eventids}
+    for i in range(0, len(eventids), OFFER_QUERY_BATCH):
+        rows = db.query(TutorOffer).filter(
+            TutorOffer.eventid.in_(eventids[i:i + OFFER_QUERY_BATCH])
+        ).order_by(TutorOffer.offerid).all()
+        for offer in rows:
+            offers[offer.eventid].append(offer_data(offer))
+    return offers
+
 
 def list_offers(eventid):
     """
@@ -15,9 +50,4 @@ def list_offers(eventid):
         if not event:
             raise ValueError(f"Event {eventid} not found")
         
-        if event.possible_tutors:
-            possible_tutors_list = json.loads(event.possible_tutors)
-        else:
-            possible_tutors_list = []
-        
-        return possible_tutors_list
\ No newline at end of file
+        return offers_for_events(db, [eventid])[eventid]
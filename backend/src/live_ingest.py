@@ -0,0 +1,447 @@
+"""
+Live recording ingest for meetings.
+
+Clients push MediaRecorder timeslices over Socket.IO while the meeting is
+running. Each participant's stream is appended to a full recording file and,
+for webm, also cut into short self-contained segments (the webm init header
+followed by whole clusters). Cluster boundaries are found by walking the EBML
+element headers, so frame data that happens to contain a Cluster ID is never
+cut. Closed segments are transcribed right away, so by the time the meeting
+ends only the last segment is left to process. If a segment cannot be
+transcribed, the whole recording is transcribed instead.
+
+A client that drops its connection has ``LIVE_RESUME_GRACE_SECONDS`` to
+reconnect and resume the session before it is closed.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.recording import meeting_recorder, save_recording_file, schedule_transcription
+
+logger = logging.getLogger(__name__)
+
+# Directory holding in-progress live recordings
+LIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'live')
+os.makedirs(LIVE_DIR, exist_ok=True)
+
+# Segment length in seconds; kept under the ~60 s synchronous recognize limit
+SEGMENT_SECONDS = int(os.getenv('LIVE_SEGMENT_SECONDS', '50'))
+# Concurrent segment transcriptions
+SEGMENT_WORKERS = int(os.getenv('LIVE_SEGMENT_WORKERS', '2'))
+# Seconds a session stays open after its client disconnects, so the client can resume it
+RESUME_GRACE_SECONDS = float(os.getenv('LIVE_RESUME_GRACE_SECONDS', '30'))
+
+# EBML IDs of the webm/matroska elements whose children are scanned for clusters
+WEBM_SEGMENT_ID = 0x18538067
+WEBM_CLUSTER_ID = 0x1F43B675
+
+
+def _read_vint(buf: bytes, pos: int) -> Optional[Tuple[int, int]]:
+    """Read an EBML variable-length integer. Returns (raw value with marker, length), or None if incomplete."""
+    if pos >= len(buf):
+        return None
+    if buf[pos] == 0:
+        raise ValueError(f"Invalid EBML length byte at {pos}")
+    length = 9 - buf[pos].bit_length()
+    if pos + length > len(buf):
+        return None
+    return int.from_bytes(buf[pos:pos + length], 'big'), length
+
+
+class WebmClusterScanner:
+    """
+    Finds where Cluster elements start in a webm stream fed chunk by chunk.
+
+    Only element headers are parsed: the Segment and each Cluster are
+    entered (MediaRecorder writes both with unknown size), every other
+    element is skipped by its size. A Cluster ID inside a SimpleBlock's
+    frame data is therefore never taken for a boundary. If the stream
+    cannot be parsed, no further boundaries are reported.
+    """
+
+    def __init__(self):
+        self.received = 0
+        # Stream offset of the next element header, and the bytes from there on
+        self.next = 0
+        self.tail = b''
+        self.failed = False
+
+    def feed(self, data: bytes) -> List[int]:
+        """
+        Scan the next chunk of the stream.
+
+        Returns:
+            Offsets within ``data`` where a Cluster element starts; negative
+            if its header began in an earlier chunk
+        """
+        start = self.received
+        self.received += len(data)
+        if self.failed:
+            return []
+
+        buf_start = start - len(self.tail)
+        buf = self.tail + data
+        boundaries = []
+        try:
+            while self.next < self.received:
+                pos = self.next - buf_start
+                element = _read_vint(buf, pos)
+                size = element and _read_vint(buf, pos + element[1])
+                if not size:
+                    break
+                element_id, id_length = element
+                size_value, size_length = size
+                header_length = id_length + size_length
+                if element_id == WEBM_CLUSTER_ID:
+                    boundaries.append(self.next - start)
+                    self.next += header_length
+                elif element_id == WEBM_SEGMENT_ID:
+                    self.next += header_length
+                elif size_value == (1 << 7 * size_length) - 1:
+                    raise ValueError(f"Element {element_id:#x} of unknown size")
+                else:
+                    self.next += header_length + (size_value & ((1 << 7 * size_length) - 1))
+        except ValueError as e:
+            logger.warning(f"Cannot parse webm stream, segments will no longer be cut: {e}")
+            self.failed = True
+            self.tail = b''
+            return boundaries
+
+        self.tail = buf[self.next - buf_start:] if self.next < self.received else b''
+        return boundaries
+
+
+class LiveRecordingIngest:
+    """
+    Tracks live recording sessions keyed by (meeting_id, participant_id).
+    """
+
+    def __init__(self):
+        self.sessions: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=SEGMENT_WORKERS, thread_name_prefix='live-segment')
+
+    def start(self, meeting_id: str, participant_id: str, mime_type: str = 'video/webm') -> Dict:
+        """
+        Open a live recording session, or return the existing one.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            mime_type: MediaRecorder MIME type of the incoming chunks
+
+        Returns:
+            Session summary with the last sequence number received
+        """
+        key = (meeting_id, participant_id)
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is not None and session['expiry'] is not None:
+                # The client reconnected in time
+                session['expiry'].cancel()
+                session['expiry'] = None
+                logger.info(f"Resumed live recording for meeting {meeting_id}, participant {participant_id}")
+            if session is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                session_dir = os.path.join(LIVE_DIR, f"{meeting_id}_{participant_id}_{timestamp}")
+                os.makedirs(session_dir, exist_ok=True)
+                extension = 'mp4' if 'mp4' in (mime_type or '') else 'webm'
+
+                session = {
+                    'id': uuid.uuid4().hex,
+                    'meeting_id': meeting_id,
+                    'participant_id': participant_id,
+                    'extension': extension,
+                    'dir': session_dir,
+                    'full_path': os.path.join(session_dir, f"full.{extension}"),
+                    'header': None,
+                    # Bytes received before the first cluster, while the header is incomplete
+                    'header_bytes': b'',
+                    'scanner': WebmClusterScanner(),
+                    'segment_index': -1,
+                    'segment_path': None,
+                    'segment_started': None,
+                    'segment_offset': 0.0,
+                    'started_at': time.monotonic(),
+                    'opened_at': time.monotonic(),
+                    # Segments left to the live transcriber instead of being transcribed
+                    'live_segments': 0,
+                    # Transcriptions of closed segments, each resolving to whether it succeeded
+                    'segment_jobs': [],
+                    # Timer closing the session after a disconnect
+                    'expiry': None,
+                    'last_seq': -1,
+                    'bytes': 0,
+                    'lock': threading.Lock(),
+                }
+                self.sessions[key] = session
+                meeting_recorder.start_recording(meeting_id, participant_id)
+                logger.info(f"Started live recording for meeting {meeting_id}, participant {participant_id}")
+
+        return {
+            'meeting_id': meeting_id,
+            'participant_id': participant_id,
+            'last_seq': session['last_seq'],
+            'bytes': session['bytes'],
+        }
+
+    def recording_session(self, meeting_id: str, participant_id: str) -> Optional[Tuple[str, float]]:
+        """ID and time.monotonic() start of the participant's open live recording, or None."""
+        session = self.sessions.get((meeting_id, participant_id))
+        return (session['id'], session['started_at']) if session is not None else None
+
+    def _open_segment(self, session: Dict):
+        session['segment_index'] += 1
+        session['segment_path'] = os.path.join(session['dir'], f"segment_{session['segment_index']:04d}.webm")
+        session['segment_started'] = time.monotonic()
+        session['segment_offset'] = session['segment_started'] - session['started_at']
+        with open(session['segment_path'], 'wb') as f:
+            f.write(session['header'])
+
+    def _close_segment(self, session: Dict):
+        from src.live_transcription import live_transcriber
+
+        segment_path = session['segment_path']
+        if not segment_path:
+            return
+        session['segment_path'] = None
+        if live_transcriber.is_live(session['meeting_id'], session['participant_id']):
+            # The transcript is already being written from the live audio stream; if that
+            # stream does not complete, stop() transcribes the whole recording instead
+            session['live_segments'] += 1
+            os.remove(segment_path)
+            return
+        session['segment_jobs'].append(self._executor.submit(
+            self._transcribe_segment,
+            segment_path,
+            session['meeting_id'],
+            session['participant_id'],
+            session['segment_offset'],
+            session['id']
+        ))
+
+    def _transcribe_segment(self, segment_path: str, meeting_id: str, participant_id: str, offset_seconds: float,
+                            session_id: str) -> bool:
+        """Transcribe a closed segment. Returns whether its words were added to the transcript."""
+        from src.transcription import transcription_service
+        try:
+            return bool(transcription_service.process_segment(segment_path, meeting_id, participant_id,
+                                                              offset_seconds, session_id))
+        except Exception as e:
+            logger.error(f"Error finishing segment transcript {segment_path}: {e}", exc_info=True)
+            return False
+        finally:
+            try:
+                os.remove(segment_path)
+            except OSError:
+                pass
+
+    def append(self, meeting_id: str, participant_id: str, seq: int, data: bytes) -> int:
+        """
+        Append a MediaRecorder timeslice to a live session.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            seq: Client sequence number of the chunk, starting at 0
+            data: Chunk bytes
+
+        Returns:
+            Total bytes received for the session
+        """
+        with self._lock:
+            session = self.sessions.get((meeting_id, participant_id))
+        if session is None:
+            raise ValueError(f"No live recording for meeting {meeting_id}, participant {participant_id}")
+
+        with session['lock']:
+            # Duplicates from client retries are acknowledged but not written twice
+            if seq <= session['last_seq']:
+                return session['bytes']
+            if seq != session['last_seq'] + 1:
+                logger.warning(f"Live recording {meeting_id}/{participant_id} missed chunks {session['last_seq'] + 1}..{seq - 1}")
+            session['last_seq'] = seq
+
+            with open(session['full_path'], 'ab') as f:
+                f.write(data)
+            session['bytes'] += len(data)
+
+            if session['extension'] != 'webm':
+                return session['bytes']
+
+            clusters = session['scanner'].feed(data)
+            if session['header'] is None:
+                # Everything before the first cluster is the init header
+                received = session['header_bytes'] + data
+                if not clusters:
+                    # Without a cluster the stream is not segmented; the recording is transcribed whole
+                    session['header_bytes'] = b'' if session['scanner'].failed else received
+                    return session['bytes']
+                header_length = len(session['header_bytes']) + clusters[0]
+                session['header'] = received[:header_length]
+                session['header_bytes'] = b''
+                session['started_at'] = time.monotonic()
+                self._open_segment(session)
+                with open(session['segment_path'], 'ab') as f:
+                    f.write(received[header_length:])
+                return session['bytes']
+
+            if time.monotonic() - session['segment_started'] >= SEGMENT_SECONDS:
+                # Roll over at the next cluster boundary so both segments stay decodable; a cluster
+                # whose header began in the previous chunk is already part of the old segment
+                clusters = [offset for offset in clusters if offset >= 0]
+                if clusters:
+                    cluster_at = clusters[0]
+                    with open(session['segment_path'], 'ab') as f:
+                        f.write(data[:cluster_at])
+                    self._close_segment(session)
+                    self._open_segment(session)
+                    data = data[cluster_at:]
+
+            with open(session['segment_path'], 'ab') as f:
+                f.write(data)
+
+        return session['bytes']
+
+    def detach(self, meeting_id: str, participant_id: str):
+        """
+        Close a session after RESUME_GRACE_SECONDS unless its client resumes it with start().
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+        """
+        key = (meeting_id, participant_id)
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is None:
+                return
+            if session['expiry'] is not None:
+                session['expiry'].cancel()
+            session['expiry'] = threading.Timer(RESUME_GRACE_SECONDS, self._expire, args=(key, session))
+            session['expiry'].daemon = True
+            session['expiry'].start()
+
+    def _expire(self, key: Tuple[str, str], session: Dict):
+        with self._lock:
+            # Resumed, stopped or replaced in the meantime
+            if self.sessions.get(key) is not session or session['expiry'] is None:
+                return
+        logger.info(f"Closing live recording {key[0]}/{key[1]} after its client did not reconnect")
+        self.stop(*key)
+
+    def _finish_segments(self, session: Dict, jobid: Optional[str]):
+        """
+        Wait for a stopped session's segments, then remove its directory.
+
+        With a ``jobid`` the transcript relies on the segments: it is finished
+        once all of them are in, or the recording is transcribed if any failed.
+        """
+        from src.conversion_jobs import conversion_queue
+        from src.stitching import transcript_finished
+
+        try:
+            wait(session['segment_jobs'])
+            if jobid is None:
+                return
+            failed = sum(1 for job in session['segment_jobs'] if not job.result())
+            if failed:
+                logger.warning(f"{failed} segment(s) of {session['meeting_id']}/{session['participant_id']} "
+                               f"were not transcribed; transcribing the recording")
+                conversion_queue.request_transcription(jobid)
+            else:
+                # The participant's transcript is complete
+                transcript_finished(session['meeting_id'])
+        except Exception as e:
+            logger.error(f"Error finishing segments of {session['meeting_id']}/{session['participant_id']}: {e}",
+                         exc_info=True)
+        finally:
+            shutil.rmtree(session['dir'], ignore_errors=True)
+
+    def stop(self, meeting_id: str, participant_id: str) -> Optional[Dict]:
+        """
+        Close a live session and hand the full recording to the conversion queue.
+
+        A live transcription stream of the participant is stopped with it. The
+        recording is transcribed unless segments or a live stream that ran to
+        completion already cover the transcript.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+
+        Returns:
+            Dict with the saved recording path and conversion job ID, or None if no session was open
+        """
+        from src.conversion_jobs import conversion_queue
+        from src.recording_index import index_recording
+        from src.packaging import schedule_packaging
+        from src.live_transcription import live_transcriber
+
+        with self._lock:
+            session = self.sessions.pop((meeting_id, participant_id), None)
+            if session is not None and session['expiry'] is not None:
+                session['expiry'].cancel()
+                session['expiry'] = None
+        meeting_recorder.stop_recording(meeting_id, participant_id)
+        if session is None:
+            return None
+
+        with session['lock']:
+            # Segments already cover the transcript for webm; only the tail is left
+            segmented = session['header'] is not None
+            if segmented:
+                self._close_segment(session)
+
+            if session['bytes'] == 0:
+                logger.info(f"Live recording {meeting_id}/{participant_id} stopped with no data")
+                shutil.rmtree(session['dir'], ignore_errors=True)
+                return {'meeting_id': meeting_id, 'participant_id': participant_id, 'filepath': None, 'job_id': None}
+
+            filepath = save_recording_file(meeting_id, participant_id, session['full_path'], session['extension'])
+
+        # Live transcription writes the transcript while the meeting runs, but only
+        # counts once its stream has stopped without losing any audio
+        live_complete = live_transcriber.finish(meeting_id, participant_id, session['opened_at'])
+        transcribed = live_complete or (segmented and not session['live_segments'])
+        if not transcribed and session['live_segments']:
+            logger.warning(f"Live transcription of {meeting_id}/{participant_id} did not complete; "
+                           f"transcribing the recording")
+
+        jobid = None
+        if session['extension'] == 'webm':
+            jobid = conversion_queue.submit(meeting_id, participant_id, filepath, transcribe=not transcribed)
+        else:
+            index_recording(filepath, meeting_id, participant_id)
+            if not transcribed:
+                schedule_transcription(meeting_id, participant_id, filepath)
+            schedule_packaging(filepath)
+
+        if session['segment_jobs']:
+            # Segments may still be transcribing from the session directory
+            relies_on_segments = transcribed and not live_complete
+            threading.Thread(target=self._finish_segments, args=(session, jobid if relies_on_segments else None),
+                             daemon=True, name=f'live-segments-{participant_id}').start()
+        else:
+            shutil.rmtree(session['dir'], ignore_errors=True)
+
+        logger.info(f"Stopped live recording for meeting {meeting_id}, participant {participant_id}: {filepath}")
+        return {
+            'meeting_id': meeting_id,
+            'participant_id': participant_id,
+            'filepath': filepath,
+            'job_id': jobid,
+            'size_bytes': session['bytes'],
+        }
+
+
+# Global live ingest instance
+live_ingest = LiveRecordingIngest()
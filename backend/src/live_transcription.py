@@ -0,0 +1,298 @@
+"""
+Real-time transcription of live meeting audio.
+
+Clients stream 16-bit mono PCM frames over Socket.IO while the meeting is
+running. Each participant's frames are fed to the speech engine's streaming
+recognizer on a worker thread. Partial and final results are emitted to the
+meeting room as they arrive, and final results are appended to the
+participant's transcript file, so the transcript is complete when the
+meeting ends.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for the recognizer to flush its last results on stop
+STOP_TIMEOUT = 15
+# Audio frames buffered per stream; further frames are dropped until the recognizer catches up
+LIVE_QUEUE_FRAMES = int(os.getenv('LIVE_TRANSCRIPTION_QUEUE_FRAMES', '300'))
+
+
+class LiveTranscriber:
+    """
+    Tracks live transcription streams keyed by (meeting_id, participant_id).
+    """
+
+    def __init__(self):
+        self.streams: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+        self._emit: Optional[Callable[[str, Dict, str], None]] = None
+        # Each participant's last stopped stream, until finish() reads its outcome
+        self._stopped: Dict[Tuple[str, str], Dict] = {}
+
+    def set_emitter(self, emit: Callable[[str, Dict, str], None]):
+        """Set the callback used to send results: emit(event, data, room)."""
+        self._emit = emit
+
+    def is_live(self, meeting_id: str, participant_id: str) -> bool:
+        """Whether this participant's transcript is currently being written by a healthy live stream."""
+        stream = self.streams.get((meeting_id, participant_id))
+        return stream is not None and stream['healthy']
+
+    def finish(self, meeting_id: str, participant_id: str, since: float) -> bool:
+        """
+        Stop the participant's live stream, if any, and report whether it covered the recording.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            since: time.monotonic() when the recording started
+
+        Returns:
+            True if a live stream ran without failing and stopped after ``since``
+        """
+        self.stop(meeting_id, participant_id)
+        with self._lock:
+            stream = self._stopped.pop((meeting_id, participant_id), None)
+        if stream is None:
+            return False
+        stream['closed'].wait()
+        return stream['completed'] and stream['stopped_at'] >= since
+
+    def start(self, meeting_id: str, participant_id: str, room: str,
+              language_code: str = "en-US", sample_rate: int = 16000) -> Dict:
+        """
+        Open a live transcription stream, or return the existing one.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            room: Socket.IO room that receives the results
+            language_code: Language code for recognition
+            sample_rate: Sample rate of the PCM frames
+
+        Returns:
+            Stream summary
+        """
+        key = (meeting_id, participant_id)
+        with self._lock:
+            stream = self.streams.get(key)
+            if stream is None:
+                stream = {
+                    'meeting_id': meeting_id,
+                    'participant_id': participant_id,
+                    'room': room,
+                    'language_code': language_code,
+                    'sample_rate': sample_rate,
+                    'queue': queue.Queue(maxsize=LIVE_QUEUE_FRAMES),
+                    'healthy': True,
+                    # time.monotonic() of the first frame, where word times start
+                    'first_frame_at': None,
+                    # Seconds from the start of the live recording to the first frame
+                    'recording_offset': None,
+                    # Session the transcript words belong to: the live recording's, or the stream's own
+                    'session_id': uuid.uuid4().hex,
+                    'dropped': 0,
+                }
+                stream['thread'] = threading.Thread(
+                    target=self._run, args=(stream,), daemon=True, name=f'live-transcribe-{participant_id}'
+                )
+                self.streams[key] = stream
+                self._stopped.pop(key, None)
+                stream['thread'].start()
+                logger.info(f"Started live transcription for meeting {meeting_id}, participant {participant_id}")
+
+        return {
+            'meeting_id': meeting_id,
+            'participant_id': participant_id,
+            'language': stream['language_code'],
+            'sample_rate': stream['sample_rate'],
+        }
+
+    def push(self, meeting_id: str, participant_id: str, data: bytes):
+        """
+        Queue a PCM audio frame for recognition.
+
+        If the recognizer falls LIVE_QUEUE_FRAMES behind, the frame is dropped
+        and the stream no longer counts as a complete transcript.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            data: 16-bit little-endian mono PCM
+
+        Raises:
+            ValueError: If no stream is open, or on the first dropped frame
+        """
+        stream = self.streams.get((meeting_id, participant_id))
+        if stream is None:
+            raise ValueError(f"No live transcription for meeting {meeting_id}, participant {participant_id}")
+        if stream['first_frame_at'] is None:
+            stream['first_frame_at'] = time.monotonic()
+        try:
+            stream['queue'].put_nowait(bytes(data))
+        except queue.Full:
+            stream['healthy'] = False
+            stream['dropped'] += 1
+            if stream['dropped'] == 1:
+                logger.warning(f"Live transcription for {meeting_id}/{participant_id} is falling behind; "
+                               f"dropping audio")
+                raise ValueError('Live transcription is falling behind; audio is being dropped')
+
+    def stop(self, meeting_id: str, participant_id: str) -> bool:
+        """
+        Close a live transcription stream. Its last results are flushed on a
+        background thread, so callers (Socket.IO handlers) do not wait for them.
+
+        Returns:
+            True if a stream was open
+        """
+        key = (meeting_id, participant_id)
+        with self._lock:
+            stream = self.streams.pop(key, None)
+            if stream is None:
+                return False
+            stream['stopped_at'] = time.monotonic()
+            stream['completed'] = False
+            stream['closed'] = threading.Event()
+            self._stopped[key] = stream
+
+        threading.Thread(target=self._close, args=(stream,), daemon=True,
+                         name=f'live-transcribe-stop-{participant_id}').start()
+        return True
+
+    def _close(self, stream: Dict):
+        """Wait for a stopped stream's last results, then restitch the meeting."""
+        meeting_id, participant_id = stream['meeting_id'], stream['participant_id']
+        try:
+            try:
+                stream['queue'].put(None, timeout=STOP_TIMEOUT)
+            except queue.Full:
+                pass
+            stream['thread'].join(timeout=STOP_TIMEOUT)
+            stream['completed'] = stream['healthy'] and not stream['thread'].is_alive()
+        finally:
+            stream['closed'].set()
+        if not stream['completed']:
+            logger.warning(f"Live transcription for {meeting_id}/{participant_id} did not complete")
+        logger.info(f"Stopped live transcription for meeting {meeting_id}, participant {participant_id}")
+
+        # The transcript is complete
+        from src.stitching import transcript_finished
+        try:
+            transcript_finished(meeting_id)
+        except Exception as e:
+            logger.error(f"Failed to stitch meeting {meeting_id}: {e}", exc_info=True)
+
+    def _send(self, event: str, data: Dict, room: str):
+        if self._emit:
+            try:
+                self._emit(event, data, room)
+            except Exception as e:
+                logger.warning(f"Failed to emit {event}: {e}")
+
+    def _run(self, stream: Dict):
+        from src.transcription import transcription_service
+
+        engine = transcription_service.engine
+        bytes_per_second = 2 * stream['sample_rate']
+        limit = engine.max_stream_seconds
+        offset = 0.0
+        finished = False
+
+        if not engine.available():
+            self._fail(stream, f"Speech engine '{engine.name}' is not available")
+            return
+
+        # Engines with a stream length limit get a fresh stream when it is reached;
+        # results from later streams are shifted by the audio already sent
+        while not finished:
+            sent = 0
+
+            def frames():
+                nonlocal finished, sent
+                while True:
+                    frame = stream['queue'].get()
+                    if frame is None:
+                        finished = True
+                        return
+                    sent += len(frame)
+                    yield frame
+                    if limit and sent / bytes_per_second >= limit:
+                        return
+
+            try:
+                for result in engine.stream(frames(), stream['language_code'], stream['sample_rate']):
+                    self._handle_result(transcription_service, stream, result, offset)
+            except Exception as e:
+                # Results of the failed stream are lost, so the transcript is incomplete
+                stream['healthy'] = False
+                logger.error(f"Live transcription error for {stream['meeting_id']}/{stream['participant_id']}: {e}",
+                             exc_info=True)
+            if not sent and not finished:
+                # The engine stopped without reading any audio; retrying would spin
+                self._fail(stream, 'Live transcription failed')
+                return
+            offset += sent / bytes_per_second
+
+    def _fail(self, stream: Dict, message: str):
+        """Report a stream that cannot be transcribed and discard its frames until it stops."""
+        stream['healthy'] = False
+        logger.error(f"{message} for {stream['meeting_id']}/{stream['participant_id']}")
+        self._send('transcription-error', {
+            'meeting_id': stream['meeting_id'],
+            'participant_id': stream['participant_id'],
+            'message': message,
+        }, stream['room'])
+        while stream['queue'].get() is not None:
+            pass
+
+    def _recording_offset(self, stream: Dict) -> float:
+        """
+        Seconds from the start of the participant's live recording to the stream's
+        first frame, so live word times line up with the recording and its segment
+        transcripts. Zero while no recording is open.
+        """
+        from src.live_ingest import live_ingest
+
+        recording = live_ingest.recording_session(stream['meeting_id'], stream['participant_id'])
+        if recording is not None and stream['first_frame_at'] is not None:
+            # Kept for results flushed after the recording has stopped
+            stream['session_id'] = recording[0]
+            stream['recording_offset'] = stream['first_frame_at'] - recording[1]
+        return stream['recording_offset'] or 0.0
+
+    def _handle_result(self, transcription_service, stream: Dict, result: Dict, offset: float):
+        offset += self._recording_offset(stream)
+        # Words spoken before the recording started are not part of it
+        words = [word for word in result.get('words', []) if word['end_time'] + offset > 0]
+        payload = {
+            'meeting_id': stream['meeting_id'],
+            'participant_id': stream['participant_id'],
+            'transcript': result['transcript'],
+            'is_final': result['is_final'],
+        }
+        if words:
+            payload['start_time'] = words[0]['start_time'] + offset
+            payload['end_time'] = words[-1]['end_time'] + offset
+        self._send('transcript-final' if result['is_final'] else 'transcript-partial', payload, stream['room'])
+
+        if result['is_final'] and words:
+            transcription_service.append_transcript(
+                stream['meeting_id'],
+                stream['participant_id'],
+                {'words': words, 'language': stream['language_code']},
+                offset,
+                stream['session_id']
+            )
+
+
+# Global live transcriber instance
+live_transcriber = LiveTranscriber()
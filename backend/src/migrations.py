@@ -0,0 +1,182 @@
+"""
+Schema and data migrations for tables created by older versions.
+
+``init_db`` only creates missing tables, so columns and indexes added to
+existing tables are created here and data stored in an older layout is
+moved into the new columns and tables. Every migration is idempotent and runs
+at startup after ``init_db``; to run them by hand from ``backend/``:
+
+    python -m src.migrations
+"""
+
+import json
+import logging
+
+from sqlalchemy import inspect, text
+
+from src.availability import create_availability_index
+from src.database import engine, get_db
+from src.models import Base, TutorOffer
+
+logger = logging.getLogger(__name__)
+
+
+def _column_names(table: str):
+    return {column['name'] for column in inspect(engine).get_columns(table)}
+
+
+def _add_columns(table: str, columns: dict):
+    """Add missing columns (name -> SQL type) to an existing table."""
+    missing = [name for name in columns if name not in _column_names(table)]
+    with engine.begin() as conn:
+        for name in missing:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {columns[name]}'))
+    if missing:
+        logger.info(f"Added columns {', '.join(missing)} to {table}")
+
+
+def create_missing_indexes():
+    """Create indexes declared on the models that tables created by an older version lack."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _load_blob(value):
+    """Decode a JSON column value, which the old code stored as a JSON-encoded string."""
+    while isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def migrate_possible_tutors() -> int:
+    """
+    Move offers from the ``requested_event.possible_tutors`` JSON blob into ``tutor_offer``.
+
+    The offer matching the event's accepted tutor becomes ``accepted`` and the
+    other offers on an accepted event ``declined``. Migrated blobs are cleared.
+
+    Returns:
+        Number of offers created
+    """
+    if 'possible_tutors' not in _column_names('requested_event'):
+        return 0
+
+    created = 0
+    with get_db() as db:
+        rows = db.execute(text(
+            "SELECT eventid, possible_tutors, userid_tutor, is_accepted FROM requested_event "
+            "WHERE possible_tutors IS NOT NULL"
+        )).fetchall()
+
+        for eventid, possible_tutors, accepted, is_accepted in rows:
+            accepted = _load_blob(accepted)
+            accepted_id = accepted.get('userid_tutor') if isinstance(accepted, dict) else accepted
+            existing = {offer.userid_tutor for offer in
+                        db.query(TutorOffer).filter(TutorOffer.eventid == eventid).all()}
+
+            for tutor_info in _load_blob(possible_tutors) or []:
+                userid_tutor = tutor_info.get('userid_tutor')
+                if userid_tutor is None or userid_tutor in existing:
+                    continue
+                if tutor_info.get('start') is None or tutor_info.get('end') is None:
+                    logger.warning(f"Skipping offer without times from tutor {userid_tutor} on event {eventid}")
+                    continue
+
+                if accepted_id is not None and str(userid_tutor) == str(accepted_id):
+                    status = 'accepted'
+                else:
+                    status = 'declined' if is_accepted else 'offered'
+                db.add(TutorOffer(
+                    eventid=eventid,
+                    userid_tutor=userid_tutor,
+                    start=int(tutor_info['start']),
+                    end=int(tutor_info['end']),
+                    status=status
+                ))
+                existing.add(userid_tutor)
+                created += 1
+
+            db.execute(text("UPDATE requested_event SET possible_tutors = NULL WHERE eventid = :eventid"),
+                       {'eventid': eventid})
+
+    if rows:
+        logger.info(f"Migrated {created} offers from {len(rows)} events to tutor_offer")
+    return created
+
+
+def migrate_accepted_tutors() -> int:
+    """
+    Replace the JSON accepted-tutor blob in ``requested_event.userid_tutor`` with typed columns.
+
+    The old code stored ``{'userid_tutor', 'start', 'end'}`` as text in the
+    integer column; it becomes the tutor id plus ``accepted_start`` and
+    ``accepted_end``.
+
+    Returns:
+        Number of events converted
+    """
+    _add_columns('requested_event', {'accepted_start': 'INTEGER', 'accepted_end': 'INTEGER'})
+
+    converted = 0
+    with get_db() as db:
+        rows = db.execute(text(
+            "SELECT eventid, userid_tutor FROM requested_event WHERE typeof(userid_tutor) = 'text'"
+        )).fetchall()
+
+        for eventid, blob in rows:
+            accepted = _load_blob(blob)
+            if isinstance(accepted, dict):
+                values = {'tutor': accepted.get('userid_tutor'), 'start': accepted.get('start'),
+                          'end': accepted.get('end')}
+            else:
+                # A bare id stored as text
+                values = {'tutor': accepted, 'start': None, 'end': None}
+            try:
+                values = {key: int(value) if value is not None else None for key, value in values.items()}
+            except (TypeError, ValueError):
+                logger.warning(f"Clearing unreadable accepted tutor {blob!r} of event {eventid}")
+                values = {'tutor': None, 'start': None, 'end': None}
+
+            db.execute(text(
+                "UPDATE requested_event SET userid_tutor = :tutor, accepted_start = :start, "
+                "accepted_end = :end WHERE eventid = :eventid"
+            ), dict(values, eventid=eventid))
+            converted += 1
+
+    if converted:
+        logger.info(f"Converted accepted tutors of {converted} events to typed columns")
+    return converted
+
+
+def add_conversion_job_columns():
+    """Add columns of later versions to older ``conversion_job`` tables."""
+    # Jobs queued before live ingest always transcribed their recording
+    _add_columns('conversion_job', {'transcribe': 'BOOLEAN NOT NULL DEFAULT 1', 'strategy': 'VARCHAR(20)',
+                                    'conversion_seconds': 'FLOAT'})
+
+
+def add_summary_columns():
+    """Add the per-stage stats of map-reduce summaries to older ``meeting_summary`` tables."""
+    _add_columns('meeting_summary', {'stats': 'JSON'})
+
+
+def run_migrations():
+    """Apply every migration, in order."""
+    # Offers read the accepted tutor blob, so they go first
+    migrate_possible_tutors()
+    migrate_accepted_tutors()
+    add_conversion_job_columns()
+    add_summary_columns()
+    create_missing_indexes()
+    create_availability_index()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from src.database import init_db
+    init_db()
+    run_migrations()
@@ -0,0 +1,79 @@
+"""
+Offline stand-in for the Google Cloud Speech client.
+
+Set ``STT_ENGINE=mock`` to use it instead of the real client. It returns
+responses with the same shape as ``speech.SpeechClient`` (results with
+alternatives, word time offsets and confidence), emitting one word per
+``MOCK_SPEECH_WORD_SECONDS`` of audio, so the transcription pipeline can be
+exercised without credentials or network access. ``MOCK_SPEECH_LATENCY``
+adds a per-request delay to imitate the real service.
+"""
+
+import os
+import struct
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+MOCK_SPEECH_LATENCY = float(os.getenv('MOCK_SPEECH_LATENCY', '0'))
+MOCK_SPEECH_WORD_SECONDS = float(os.getenv('MOCK_SPEECH_WORD_SECONDS', '1.0'))
+
+
+def flac_duration(content: bytes) -> Optional[float]:
+    """Read the duration from a FLAC STREAMINFO block, or None if it is not FLAC."""
+    if len(content) < 26 or content[:4] != b'fLaC':
+        return None
+    # STREAMINFO starts after the 4 byte marker and 4 byte block header;
+    # sample rate (20 bits) and total samples (36 bits) are packed at byte 10
+    packed = struct.unpack('>Q', content[18:26])[0]
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate:
+        return None
+    return total_samples / sample_rate
+
+
+class MockSpeechClient:
+    """
+    Implements ``recognize`` and ``long_running_recognize`` with deterministic output.
+    """
+
+    def __init__(self, latency: float = MOCK_SPEECH_LATENCY, word_seconds: float = MOCK_SPEECH_WORD_SECONDS):
+        self.latency = latency
+        self.word_seconds = word_seconds
+        self.requests = 0
+
+    def _response(self, audio):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        content = getattr(audio, 'content', b'') or b''
+        duration = flac_duration(content)
+        if duration is None:
+            # Not FLAC: assume 16 kHz mono 16-bit samples
+            duration = len(content) / 32000
+
+        words = []
+        for i in range(int(duration / self.word_seconds)):
+            start = i * self.word_seconds
+            words.append(SimpleNamespace(
+                word=f"word{i}",
+                start_time=timedelta(seconds=start),
+                end_time=timedelta(seconds=start + self.word_seconds / 2),
+            ))
+
+        alternative = SimpleNamespace(
+            transcript=' '.join(w.word for w in words),
+            confidence=0.9,
+            words=words,
+        )
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])] if words else [])
+
+    def recognize(self, config=None, audio=None):
+        return self._response(audio)
+
+    def long_running_recognize(self, config=None, audio=None):
+        response = self._response(audio)
+        return SimpleNamespace(result=lambda timeout=None: response)
@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import JSON, Column, Integer, Float, String, DateTime, Boolean, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -33,6 +33,14 @@ class Subject(Base):
 
 class RequestedEvent(Base):
     __tablename__ = 'requested_event'
+    __table_args__ = (
+        # A tutor's accepted sessions in time order
+        Index('ix_requested_event_tutor_start', 'userid_tutor', 'accepted_start'),
+        # Keyset pages of event listings, all events or by category or tutee
+        Index('ix_requested_event_start', 'available_start_time', 'eventid'),
+        Index('ix_requested_event_category_start', 'category', 'available_start_time', 'eventid'),
+        Index('ix_requested_event_tutee_start', 'userid_tutee', 'available_start_time', 'eventid'),
+    )
     
     eventid = Column(Integer, primary_key=True, autoincrement=True)
     userid_tutee = Column(Integer, ForeignKey('user.userid'), nullable=False, index=True)
@@ -41,8 +49,9 @@ class RequestedEvent(Base):
     category = Column(String(255), nullable=False)
     title = Column(String(500), nullable=False)
     description = Column(Text)
-    userid_tutor = Column(Integer, ForeignKey('user.userid'), nullable=True, index=True)
-    possible_tutors = Column(JSON,nullable = True)  # JSON string of possible tutor IDs
+    userid_tutor = Column(Integer, ForeignKey('user.userid'), nullable=True, index=True)  # Accepted tutor
+    accepted_start = Column(Integer, nullable=True)  # Agreed session start (Unix timestamp)
+    accepted_end = Column(Integer, nullable=True)  # Agreed session end (Unix timestamp)
     is_accepted = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False)
     
@@ -50,11 +59,32 @@ class RequestedEvent(Base):
     tutee = relationship('User', back_populates='requested_events', foreign_keys=[userid_tutee])
     tutor = relationship('User', back_populates='tutor_events', foreign_keys=[userid_tutor])
     meetings = relationship('Meeting', back_populates='event')
+    offers = relationship('TutorOffer', back_populates='event')
     
     def __repr__(self):
         return f"<RequestedEvent(eventid={self.eventid}, title='{self.title}', category='{self.category}')>"
 
 
+class TutorOffer(Base):
+    __tablename__ = 'tutor_offer'
+    # A tutor makes at most one offer per event
+    __table_args__ = (UniqueConstraint('eventid', 'userid_tutor'),)
+    
+    offerid = Column(Integer, primary_key=True, autoincrement=True)
+    eventid = Column(Integer, ForeignKey('requested_event.eventid'), nullable=False, index=True)
+    userid_tutor = Column(Integer, ForeignKey('user.userid'), nullable=False, index=True)
+    start = Column(Integer, nullable=False)  # Proposed session start (Unix timestamp)
+    end = Column(Integer, nullable=False)  # Proposed session end (Unix timestamp)
+    status = Column(String(20), nullable=False, default='offered')  # offered, accepted, declined
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Relationship
+    event = relationship('RequestedEvent', back_populates='offers')
+    
+    def __repr__(self):
+        return f"<TutorOffer(eventid={self.eventid}, userid_tutor={self.userid_tutor}, status='{self.status}')>"
+
+
 class Meeting(Base):
     __tablename__ = 'meeting'
     
@@ -67,3 +97,122 @@ class Meeting(Base):
     
     def __repr__(self):
         return f"<Meeting(id={self.id}, eventid={self.eventid}, start_time={self.start_time})>"
+
+
+class Recording(Base):
+    __tablename__ = 'recording'
+    
+    recordingid = Column(Integer, primary_key=True, autoincrement=True)
+    filename = Column(String(512), nullable=False, unique=True)
+    meeting_id = Column(String(255), nullable=False, index=True)
+    participant_id = Column(String(255), nullable=False)
+    timestamp = Column(String(32), nullable=True)  # Recording timestamp from the filename
+    size_bytes = Column(Integer, nullable=False, default=0)
+    duration = Column(Float, nullable=True)
+    video_codec = Column(String(32), nullable=True)
+    audio_codec = Column(String(32), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Recording(filename='{self.filename}', meeting_id='{self.meeting_id}')>"
+
+
+class ConversionJob(Base):
+    __tablename__ = 'conversion_job'
+    
+    jobid = Column(String(36), primary_key=True)
+    meeting_id = Column(String(255), nullable=False, index=True)
+    participant_id = Column(String(255), nullable=False)
+    input_path = Column(String(1024), nullable=False)
+    output_path = Column(String(1024), nullable=False)
+    status = Column(String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    transcribe = Column(Boolean, nullable=False, default=True)  # False when live ingest already transcribed it
+    strategy = Column(String(20), nullable=True)  # remux, audio or transcode
+    conversion_seconds = Column(Float, nullable=True)
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ConversionJob(jobid='{self.jobid}', status='{self.status}', attempts={self.attempts})>"
+
+
+class TranscriptionJob(Base):
+    __tablename__ = 'transcription_job'
+    
+    jobid = Column(String(36), primary_key=True)
+    meeting_id = Column(String(255), nullable=False, index=True)
+    participant_id = Column(String(255), nullable=False)
+    video_path = Column(String(1024), nullable=False)
+    audio_path = Column(String(1024), nullable=True)  # Set when conversion already extracted the audio
+    priority = Column(Float, nullable=False, default=0)  # Audio duration in seconds; shorter runs first
+    status = Column(String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    transcript_path = Column(String(1024), nullable=True)
+    error = Column(Text)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<TranscriptionJob(jobid='{self.jobid}', status='{self.status}', priority={self.priority})>"
+
+
+class MeetingSummary(Base):
+    __tablename__ = 'meeting_summary'
+    # One summary per transcript content, prompt and model
+    __table_args__ = (UniqueConstraint('meeting_id', 'transcript_hash', 'prompt_version', 'model'),)
+    
+    summaryid = Column(Integer, primary_key=True, autoincrement=True)
+    meeting_id = Column(String(255), nullable=False, index=True)
+    transcript_hash = Column(String(64), nullable=False)  # SHA-256 of the stitched conversation text
+    prompt_version = Column(Integer, nullable=False)
+    model = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default='pending')  # pending, ready, failed
+    summary = Column(Text)
+    error = Column(Text)
+    generation_seconds = Column(Float, nullable=True)
+    stats = Column(JSON, nullable=True)  # Per-stage calls, tokens and latency
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<MeetingSummary(meeting_id='{self.meeting_id}', model='{self.model}', status='{self.status}')>"
+
+
+class SummaryWindow(Base):
+    __tablename__ = 'summary_window'
+    # Window summaries are reused while the window's text is unchanged
+    __table_args__ = (UniqueConstraint('window_hash', 'prompt_version', 'model'),)
+    
+    windowid = Column(Integer, primary_key=True, autoincrement=True)
+    meeting_id = Column(String(255), nullable=False, index=True)
+    window_hash = Column(String(64), nullable=False)  # SHA-256 of the window's conversation text
+    prompt_version = Column(Integer, nullable=False)
+    model = Column(String(64), nullable=False)
+    summary = Column(Text, nullable=False)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SummaryWindow(meeting_id='{self.meeting_id}', window_hash='{self.window_hash[:12]}')>"
+
+
+class UploadSession(Base):
+    __tablename__ = 'upload_session'
+    
+    uploadid = Column(String(36), primary_key=True)
+    meeting_id = Column(String(255), nullable=False, index=True)
+    participant_id = Column(String(255), nullable=False)
+    file_extension = Column(String(10), nullable=False)
+    temp_path = Column(String(1024), nullable=False)
+    total_size = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, default='open')  # open, finalized
+    final_path = Column(String(1024), nullable=True)
+    jobid = Column(String(36), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<UploadSession(uploadid='{self.uploadid}', status='{self.status}')>"
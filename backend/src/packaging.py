@@ -0,0 +1,317 @@
+"""
+Adaptive streaming packages for finished recordings.
+
+After an MP4 is saved it is packaged into HLS: a master playlist pointing at
+a few bitrate renditions cut into short segments, plus a thumbnail sprite
+with a WebVTT index for seek previews. Players fetch the first segments
+instead of the whole file, so start-up time does not depend on the length
+of the recording.
+
+Packages are written next to the other artifacts:
+
+    hls/<meeting_id>/<participant_id>/<recording stem>/master.m3u8
+
+To package indexed recordings that have no package yet, run from ``backend/``:
+
+    python -m src.packaging
+"""
+
+import logging
+import math
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.conversion import probe_media, CONVERSION_PRESET, CONVERSION_AUDIO_BITRATE, CONVERSION_TIMEOUT
+from src.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Renditions as height:video bitrate, highest first
+HLS_RENDITIONS = os.getenv('HLS_RENDITIONS', '720:2500k,360:800k')
+HLS_SEGMENT_SECONDS = int(os.getenv('HLS_SEGMENT_SECONDS', '6'))
+# Concurrent packaging runs (each one is a full ffmpeg encode)
+PACKAGING_WORKERS = int(os.getenv('PACKAGING_WORKERS', '1'))
+
+MASTER_PLAYLIST = 'master.m3u8'
+THUMBNAIL_SPRITE = 'thumbnails.jpg'
+THUMBNAIL_VTT = 'thumbnails.vtt'
+# Text files listing other package files by relative URL
+INDEX_SUFFIXES = ('.m3u8', '.vtt')
+THUMBNAIL_WIDTH = 160
+THUMBNAIL_HEIGHT = 90
+THUMBNAIL_COLUMNS = 10
+# At most this many thumbnails per recording, at least this many seconds apart
+THUMBNAIL_MAX = 100
+THUMBNAIL_MIN_INTERVAL = 5
+
+
+def parse_renditions(spec: str = HLS_RENDITIONS) -> List[Tuple[int, str]]:
+    """Parse 'height:bitrate,...' into (height, bitrate) pairs, highest first."""
+    renditions = []
+    for item in spec.split(','):
+        height, _, bitrate = item.strip().partition(':')
+        if height:
+            renditions.append((int(height), bitrate or '1000k'))
+    return sorted(renditions, reverse=True)
+
+
+def _select_renditions(source_height: Optional[int]) -> List[Tuple[int, str]]:
+    """Drop renditions taller than the source, keeping at least the smallest one."""
+    renditions = parse_renditions()
+    if not source_height:
+        return renditions
+    fitting = [r for r in renditions if r[0] <= source_height]
+    return fitting or renditions[-1:]
+
+
+def _hls_command(input_path: str, output_dir: str, renditions: List[Tuple[int, str]], has_audio: bool) -> List[str]:
+    count = len(renditions)
+    splits = ''.join(f'[v{i}]' for i in range(count))
+    scales = ';'.join(f'[v{i}]scale=-2:{height}[v{i}out]' for i, (height, _) in enumerate(renditions))
+
+    command = ['ffmpeg', '-y', '-i', input_path, '-filter_complex', f'[0:v]split={count}{splits};{scales}']
+    for i, (_, bitrate) in enumerate(renditions):
+        command += ['-map', f'[v{i}out]', f'-c:v:{i}', 'libx264', f'-b:v:{i}', bitrate]
+        if has_audio:
+            command += ['-map', 'a:0', f'-c:a:{i}', 'aac', f'-b:a:{i}', CONVERSION_AUDIO_BITRATE]
+
+    stream_map = ' '.join(f'v:{i},a:{i}' if has_audio else f'v:{i}' for i in range(count))
+    command += [
+        '-preset', CONVERSION_PRESET,
+        # Keyframe on every segment boundary so all renditions switch cleanly
+        '-force_key_frames', f'expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})',
+        '-sc_threshold', '0',
+        '-f', 'hls',
+        '-hls_time', str(HLS_SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', os.path.join(output_dir, 'v%v', 'segment_%04d.ts'),
+        '-master_pl_name', MASTER_PLAYLIST,
+        '-var_stream_map', stream_map,
+        os.path.join(output_dir, 'v%v', 'index.m3u8'),
+    ]
+    return command
+
+
+def _format_vtt_time(seconds: float) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+def _write_thumbnails(input_path: str, output_dir: str, duration: float):
+    """Render the thumbnail sprite and its WebVTT index."""
+    interval = max(THUMBNAIL_MIN_INTERVAL, math.ceil(duration / THUMBNAIL_MAX))
+    count = max(1, min(THUMBNAIL_MAX, math.ceil(duration / interval)))
+    rows = math.ceil(count / THUMBNAIL_COLUMNS)
+
+    video_filter = (
+        f"fps=1/{interval},"
+        f"scale={THUMBNAIL_WIDTH}:{THUMBNAIL_HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={THUMBNAIL_WIDTH}:{THUMBNAIL_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
+        f"tile={THUMBNAIL_COLUMNS}x{rows}"
+    )
+    command = ['ffmpeg', '-y', '-i', input_path, '-vf', video_filter, '-frames:v', '1', '-q:v', '5',
+               os.path.join(output_dir, THUMBNAIL_SPRITE)]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=CONVERSION_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"Thumbnail sprite failed: {result.stderr.decode(errors='ignore')[-500:]}")
+
+    cues = ['WEBVTT', '']
+    for i in range(count):
+        start = i * interval
+        end = min((i + 1) * interval, duration)
+        x = (i % THUMBNAIL_COLUMNS) * THUMBNAIL_WIDTH
+        y = (i // THUMBNAIL_COLUMNS) * THUMBNAIL_HEIGHT
+        cues += [
+            f"{_format_vtt_time(start)} --> {_format_vtt_time(end)}",
+            f"{THUMBNAIL_SPRITE}#xywh={x},{y},{THUMBNAIL_WIDTH},{THUMBNAIL_HEIGHT}",
+            '',
+        ]
+    with open(os.path.join(output_dir, THUMBNAIL_VTT), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(cues))
+
+
+def package_recording(filepath: str, publish_source: bool = True) -> Optional[str]:
+    """
+    Package an MP4 recording into HLS renditions and a thumbnail sprite.
+
+    The package is built in a temporary directory and renamed into place,
+    so a half-written package is never served. Once the recording is
+    packaged (or has no video to package) the MP4 is published as well; if
+    packaging fails it stays local only. Either way the caller's
+    storage.retain() on the MP4 is released, so with object storage the
+    local copy goes once transcription is done with it too.
+
+    Args:
+        filepath: Path to the MP4 recording
+        publish_source: Publish the MP4 to storage once packaging is done
+
+    Returns:
+        Path to the master playlist, or None if packaging failed
+    """
+    filename = os.path.basename(filepath)
+    output_dir = storage.package_dir(filename)
+    part_dir = output_dir + '.part'
+
+    try:
+        if not storage.ensure_local(filepath):
+            logger.error(f"Recording not found for packaging: {filepath}")
+            return None
+
+        probe = probe_media(filepath)
+        if not probe or not probe['video_codec']:
+            logger.info(f"Skipping packaging for {filename}: no video stream")
+            if probe and publish_source:
+                _publish_source(filepath)
+            return None
+
+        renditions = _select_renditions(probe.get('height'))
+        shutil.rmtree(part_dir, ignore_errors=True)
+        for i in range(len(renditions)):
+            os.makedirs(os.path.join(part_dir, f'v{i}'), exist_ok=True)
+
+        command = _hls_command(filepath, part_dir, renditions, probe['audio_codec'] is not None)
+        logger.info(f"Packaging {filename} into HLS: {' '.join(command)}")
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=CONVERSION_TIMEOUT)
+        if result.returncode != 0:
+            logger.error(f"HLS packaging failed for {filename}: {result.stderr.decode(errors='ignore')[-500:]}")
+            return None
+
+        if probe['duration']:
+            _write_thumbnails(filepath, part_dir, probe['duration'])
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(part_dir, output_dir)
+
+        for dirpath, _, filenames in os.walk(output_dir):
+            for name in filenames:
+                storage.publish(os.path.join(dirpath, name), keep_local=True)
+        if publish_source:
+            _publish_source(filepath)
+
+        logger.info(f"Packaged {filename} into {len(renditions)} HLS renditions")
+        return os.path.join(output_dir, MASTER_PLAYLIST)
+
+    except Exception as e:
+        logger.error(f"Error packaging {filepath}: {e}", exc_info=True)
+        return None
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+        storage.release(filepath)
+
+
+def _publish_source(filepath: str):
+    # Transcription may still be reading the MP4; release() removes the local copy
+    try:
+        storage.publish(filepath, keep_local=True)
+    except Exception as e:
+        logger.error(f"Error publishing recording {filepath}: {e}", exc_info=True)
+
+
+def package_info(filename: str) -> Dict:
+    """
+    Describe the streaming package of a recording for the manifest endpoint.
+
+    Args:
+        filename: Recording file name
+
+    Returns:
+        Dict with 'status' ('ready' or 'pending') and the HLS and thumbnail URLs
+    """
+    stem = os.path.splitext(filename)[0]
+    package_dir = storage.package_dir(filename, create=False)
+    master = storage.ensure_local(os.path.join(package_dir, MASTER_PLAYLIST))
+    if not master:
+        return {'status': 'pending', 'hls_url': None, 'thumbnails_url': None}
+
+    has_thumbnails = storage.ensure_local(os.path.join(package_dir, THUMBNAIL_VTT)) is not None
+    return {
+        'status': 'ready',
+        'hls_url': f"/recordings/hls/{stem}/{MASTER_PLAYLIST}",
+        'thumbnails_url': f"/recordings/hls/{stem}/{THUMBNAIL_VTT}" if has_thumbnails else None,
+    }
+
+
+def locate_package_file(stem: str, asset: str) -> Optional[str]:
+    """
+    Find a file inside a recording's package.
+
+    Args:
+        stem: Recording file name without extension
+        asset: Path inside the package, e.g. 'v0/segment_0001.ts'
+
+    Returns:
+        Absolute path, or None if it does not exist or escapes the package
+    """
+    path = _package_file_path(stem, asset)
+    return storage.ensure_local(path) if path else None
+
+
+def package_file_url(stem: str, asset: str) -> Optional[str]:
+    """
+    Get a direct (presigned) URL for a segment or thumbnail sprite.
+
+    Playlists and the thumbnail index are always served by the app: players
+    resolve the relative URLs inside them against the URL they were fetched
+    from, and a presigned URL does not sign its neighbours.
+
+    Returns:
+        The URL, or None to serve the file with locate_package_file()
+    """
+    path = _package_file_path(stem, asset)
+    if not path or path.endswith(INDEX_SUFFIXES):
+        return None
+    return storage.url_for_path(path)
+
+
+def _package_file_path(stem: str, asset: str) -> Optional[str]:
+    """Path of a file inside a package, or None if it escapes the package."""
+    package_dir = storage.package_dir(stem, create=False)
+    path = os.path.normpath(os.path.join(package_dir, asset))
+    if not path.startswith(package_dir + os.sep):
+        return None
+    return path
+
+
+_executor = ThreadPoolExecutor(max_workers=PACKAGING_WORKERS, thread_name_prefix='packaging')
+
+
+def schedule_packaging(filepath: str):
+    """Package a finished MP4 in the background."""
+    storage.retain(filepath)
+    _executor.submit(package_recording, filepath)
+
+
+def package_missing() -> int:
+    """
+    Package every indexed MP4 that has no package yet.
+
+    Returns:
+        Number of recordings packaged
+    """
+    from src.recording_index import list_recordings
+    from src.recording import meeting_recorder
+
+    packaged = 0
+    for recording in list_recordings():
+        filename = recording['filename']
+        if not filename.endswith('.mp4') or package_info(filename)['status'] == 'ready':
+            continue
+        filepath = meeting_recorder.locate_recording(filename)
+        if not filepath:
+            continue
+        storage.retain(filepath)
+        if package_recording(filepath, publish_source=False):
+            packaged += 1
+    return packaged
+
+
+if __name__ == "__main__":
+    from src.database import init_db
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    print({'packaged': package_missing()})
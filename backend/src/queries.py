@@ -1,7 +1,8 @@
 from src.models import RequestedEvent, User, Meeting
 from src.database import get_db
-from datetime import datetime
-from sqlalchemy import and_, or_
+from src.availability import availability_index_available, overlapping_event_ids_sql, window_minutes
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, column, text
 
 
 def get_event_by_id(eventid):
@@ -57,6 +58,50 @@ def get_available_events(category=None):
         return events
 
 
+def available_events_query(db, start, end, category=None):
+    """
+    Query of open events whose availability overlaps [start, end).
+    
+    Uses the availability R*Tree when the database has one, so the cost grows
+    with the number of matches rather than the number of open events.
+    
+    Args:
+        db: Open database session
+        start: Window start (naive UTC datetime)
+        end: Window end (naive UTC datetime)
+        category: Only events in this category
+    """
+    query = db.query(RequestedEvent)
+    if availability_index_available():
+        start_min, end_min = window_minutes(start, end)
+        overlapping = text(overlapping_event_ids_sql(category)).bindparams(
+            start=start_min,
+            end=end_min,
+            **({'category': category} if category else {})
+        ).columns(column('eventid'))
+        query = query.filter(RequestedEvent.eventid.in_(overlapping))
+    
+    # The index works in whole minutes, so the exact times are still compared on its matches
+    query = query.filter(
+        RequestedEvent.available_start_time < end,
+        RequestedEvent.available_end_time > start,
+        RequestedEvent.is_accepted == False,
+        RequestedEvent.is_deleted == False
+    )
+    if category:
+        query = query.filter(RequestedEvent.category == category)
+    return query
+
+
+def get_events_available_between(start, end, category=None):
+    """Get the ids of open events whose availability overlaps [start, end), by start time"""
+    with get_db() as db:
+        query = available_events_query(db, start, end, category).with_entities(RequestedEvent.eventid)
+        return [eventid for (eventid,) in query.order_by(
+            RequestedEvent.available_start_time, RequestedEvent.eventid
+        ).all()]
+
+
 def accept_event(eventid, userid_tutor):
     """Accept an event as a tutor"""
     with get_db() as db:
@@ -129,3 +174,8 @@ if __name__ == "__main__":
     # Get events by category
     math_events = get_available_events(category="Mathematics")
     print(f"Mathematics events: {len(math_events)}")
+    
+    # Get events open during the next week
+    now = datetime.utcnow()
+    week = get_events_available_between(now, now + timedelta(days=7))
+    print(f"Open next week: {len(week)}")
@@ -1,76 +1,97 @@
 """
 Client-side media recording for meeting sessions.
 Records video/audio on the client using MediaRecorder API and uploads as blobs.
-Automatically transcribes recordings when complete.
+Finished recordings are queued for transcription.
 """
 
-import asyncio
 import logging
 import os
+import shutil
 from datetime import datetime
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
-# Directory to store recordings
-RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'recordings')
-os.makedirs(RECORDINGS_DIR, exist_ok=True)
+from src.storage import storage, RECORDINGS
 
+# Directory to store recordings (files are sharded by meeting/participant below it)
+RECORDINGS_DIR = storage.kind_dir(RECORDINGS)
 
-def save_recording_blob(meeting_id: str, participant_id: str, blob_data: bytes, file_extension: str = 'mp4') -> str:
+# Buffer size used when streaming uploads to disk
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+
+def _recording_path(meeting_id: str, participant_id: str, file_extension: str) -> str:
+    """Build the on-disk path for a new recording: meeting_participant_timestamp.ext"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{meeting_id}_{participant_id}_{timestamp}.{file_extension}"
+    return storage.recording_path(meeting_id, participant_id, filename)
+
+
+def save_recording_stream(meeting_id: str, participant_id: str, stream: BinaryIO, file_extension: str = 'mp4') -> str:
     """
-    Save uploaded recording blob to disk.
+    Save an uploaded recording by streaming it to disk in fixed-size pieces,
+    so memory use does not grow with the recording length.
     
     Args:
         meeting_id: The meeting ID
         participant_id: The participant ID
-        blob_data: The video blob bytes
+        stream: Readable file-like object with the video bytes
         file_extension: File extension (webm, mp4, etc.)
         
     Returns:
         Path to saved file
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{meeting_id}_{participant_id}_{timestamp}.{file_extension}"
-    filepath = os.path.join(RECORDINGS_DIR, filename)
+    filepath = _recording_path(meeting_id, participant_id, file_extension)
     
     with open(filepath, 'wb') as f:
-        f.write(blob_data)
+        shutil.copyfileobj(stream, f, STREAM_BUFFER_SIZE)
     
-    logger.info(f"Saved recording to {filepath}, size: {len(blob_data) / (1024*1024):.2f} MB")
+    logger.info(f"Saved recording to {filepath}, size: {os.path.getsize(filepath) / (1024*1024):.2f} MB")
     return filepath
 
 
-async def process_uploaded_recording(meeting_id: str, participant_id: str, filepath: str):
+def save_recording_file(meeting_id: str, participant_id: str, source_path: str, file_extension: str = 'mp4') -> str:
     """
-    Process an uploaded recording (transcribe, etc).
+    Move an already-written file (e.g. a finished chunked upload) into the recordings directory.
     
     Args:
         meeting_id: The meeting ID
-        participant_id: The participant ID  
-        filepath: Path to the saved recording file
+        participant_id: The participant ID
+        source_path: Path of the file to move
+        file_extension: File extension (webm, mp4, etc.)
+        
+    Returns:
+        Path to saved file
+    """
+    filepath = _recording_path(meeting_id, participant_id, file_extension)
+    shutil.move(source_path, filepath)
+    
+    logger.info(f"Saved recording to {filepath}, size: {os.path.getsize(filepath) / (1024*1024):.2f} MB")
+    return filepath
+
+
+def schedule_transcription(meeting_id: str, participant_id: str, filepath: str,
+                           audio_path: Optional[str] = None) -> Optional[str]:
+    """
+    Queue background transcription for a finished MP4 recording.
+    
+    Args:
+        meeting_id: The meeting ID
+        participant_id: The participant ID
+        filepath: Path to the MP4 recording
+        audio_path: Speech audio already extracted during conversion, if any
+        
+    Returns:
+        Transcription job ID, or None if the job could not be queued
     """
     try:
         # Import here to avoid circular dependencies
-        from src.transcription import transcription_service
-        
-        logger.info(f"Starting background transcription for {filepath}")
-        
-        # Run transcription in a worker thread (asyncio.to_thread) to avoid blocking
-        transcript_path = await asyncio.to_thread(
-            transcription_service.process_recording,
-            filepath,
-            meeting_id,
-            participant_id
-        )
-        
-        if transcript_path:
-            logger.info(f"Transcription completed: {transcript_path}")
-        else:
-            logger.warning(f"Transcription failed for {filepath}")
-            
+        from src.transcription_jobs import transcription_queue
+        return transcription_queue.submit(meeting_id, participant_id, filepath, audio_path)
     except Exception as e:
-        logger.error(f"Error in background transcription: {e}", exc_info=True)
+        logger.error(f"Failed to schedule transcription: {e}")
+        return None
 
 
 class MeetingRecorder:
@@ -110,6 +131,26 @@ class MeetingRecorder:
     def get_recordings_dir(self) -> str:
         """Get the directory where recordings are stored."""
         return RECORDINGS_DIR
+    
+    def _recording_ids(self, filename: str) -> Dict:
+        # The index holds the real IDs, which the file name cannot always be split back into
+        from src.recording_index import get_recording
+        recording = get_recording(os.path.basename(filename))
+        if not recording:
+            return {}
+        return {'meeting_id': recording['meeting_id'], 'participant_id': recording['participant_id']}
+
+    def locate_recording(self, filename: str) -> Optional[str]:
+        """Get the path of a recording by file name, or None if it does not exist."""
+        return storage.locate(RECORDINGS, filename, **self._recording_ids(filename))
+    
+    def recording_key(self, filepath: str) -> str:
+        """Get a recording's path relative to the storage root (used for proxy offload)."""
+        return storage.key_for(filepath)
+    
+    def recording_url(self, filename: str) -> Optional[str]:
+        """Get a direct (presigned) playback URL, or None when recordings are served locally."""
+        return storage.url_for(RECORDINGS, filename, **self._recording_ids(filename))
 
 
 # Global recorder instance
@@ -0,0 +1,174 @@
+"""
+Persistent index of finished recordings.
+
+Recordings are added to the ``recording`` table when they are saved or
+converted, so listing endpoints answer from an indexed query instead of
+scanning the recordings directory. Run this module to rebuild the index
+from disk:
+
+    python -m src.recording_index
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.database import get_db
+from src.models import Recording, ConversionJob
+from src.conversion import probe_media
+from src.storage import storage, parse_recording_filename, RECORDINGS
+
+logger = logging.getLogger(__name__)
+
+RECORDING_EXTENSIONS = ('.mp4', '.webm')
+
+
+def recording_to_dict(recording: Recording) -> Dict:
+    return {
+        'filename': recording.filename,
+        'meeting_id': recording.meeting_id,
+        'participant_id': recording.participant_id,
+        'timestamp': recording.timestamp,
+        'size_bytes': recording.size_bytes,
+        'duration': recording.duration,
+        'video_codec': recording.video_codec,
+        'audio_codec': recording.audio_codec,
+        'created': recording.created_at,
+    }
+
+
+def _build_row(filepath: str, meeting_id: Optional[str] = None, participant_id: Optional[str] = None) -> Dict:
+    filename = os.path.basename(filepath)
+    parsed = parse_recording_filename(filename)
+    stat = os.stat(filepath)
+    probe = probe_media(filepath) or {}
+    return {
+        'filename': filename,
+        'meeting_id': meeting_id or parsed['meeting_id'],
+        'participant_id': participant_id or parsed['participant_id'],
+        'timestamp': parsed['timestamp'],
+        'size_bytes': stat.st_size,
+        'duration': probe.get('duration'),
+        'video_codec': probe.get('video_codec'),
+        'audio_codec': probe.get('audio_codec'),
+        'created_at': datetime.fromtimestamp(stat.st_ctime),
+    }
+
+
+def index_recording(filepath: str, meeting_id: Optional[str] = None, participant_id: Optional[str] = None):
+    """
+    Add or refresh a recording in the index.
+
+    Args:
+        filepath: Path to the recording file
+        meeting_id: The meeting ID (parsed from the filename if omitted)
+        participant_id: The participant ID (parsed from the filename if omitted)
+    """
+    try:
+        row = _build_row(filepath, meeting_id, participant_id)
+        with get_db() as db:
+            recording = db.query(Recording).filter(Recording.filename == row['filename']).first()
+            if recording is None:
+                db.add(Recording(**row))
+            else:
+                for key, value in row.items():
+                    setattr(recording, key, value)
+        logger.info(f"Indexed recording {row['filename']}")
+    except Exception as e:
+        logger.error(f"Error indexing recording {filepath}: {e}", exc_info=True)
+
+
+def remove_recording(filename: str):
+    """Drop a recording from the index."""
+    with get_db() as db:
+        db.query(Recording).filter(Recording.filename == filename).delete(synchronize_session=False)
+
+
+def get_recording(filename: str) -> Optional[Dict]:
+    """Get one indexed recording by file name, or None if it is not indexed."""
+    with get_db() as db:
+        recording = db.query(Recording).filter(Recording.filename == filename).first()
+        return recording_to_dict(recording) if recording else None
+
+
+def recording_etag(recording: Dict) -> str:
+    """
+    Strong ETag for a recording, derived from its index entry.
+
+    The entry is refreshed whenever the file is rewritten, so the tag changes
+    with the content without hashing the file on every request.
+    """
+    created = recording['created'].timestamp() if recording['created'] else 0
+    return f"{recording['filename']}-{recording['size_bytes']}-{int(created)}"
+
+
+def list_recordings(meeting_id: Optional[str] = None) -> List[Dict]:
+    """
+    List indexed recordings, newest filename first.
+
+    Args:
+        meeting_id: Only return recordings for this meeting
+
+    Returns:
+        List of recording dicts
+    """
+    with get_db() as db:
+        query = db.query(Recording)
+        if meeting_id is not None:
+            query = query.filter(Recording.meeting_id == meeting_id)
+        return [recording_to_dict(r) for r in query.order_by(Recording.filename.desc()).all()]
+
+
+def reconcile() -> Dict[str, int]:
+    """
+    Rebuild the index from the stored files.
+
+    webm files still waiting on a conversion job are skipped, since they are
+    removed once the MP4 is written.
+
+    Returns:
+        Counts of added, updated and removed entries
+    """
+    with get_db() as db:
+        pending_inputs = {
+            os.path.basename(job.input_path)
+            for job in db.query(ConversionJob).filter(ConversionJob.status.in_(['queued', 'running'])).all()
+        }
+        indexed = {r.filename: r.size_bytes for r in db.query(Recording).all()}
+
+    on_disk = set()
+    added = updated = 0
+    for filepath, size_bytes in storage.iter_files(RECORDINGS, RECORDING_EXTENSIONS):
+        filename = os.path.basename(filepath)
+        if filename in pending_inputs:
+            continue
+        on_disk.add(filename)
+        if filename not in indexed:
+            added += 1
+        elif indexed[filename] != size_bytes:
+            updated += 1
+        else:
+            continue
+        # Only new or changed recordings are fetched (from object storage) to be probed,
+        # and copies fetched for that are dropped again unless a job is using them
+        storage.retain(filepath)
+        try:
+            if storage.ensure_local(filepath):
+                index_recording(filepath)
+        finally:
+            storage.release(filepath)
+
+    stale = [filename for filename in indexed if filename not in on_disk]
+    for filename in stale:
+        remove_recording(filename)
+
+    logger.info(f"Recording index reconciled: {added} added, {updated} updated, {len(stale)} removed")
+    return {'added': added, 'updated': updated, 'removed': len(stale)}
+
+
+if __name__ == "__main__":
+    from src.database import init_db
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    print(reconcile())
@@ -0,0 +1,179 @@
+"""
+Cache for the meeting transcript API responses.
+
+The transcript, stitched transcript and summary endpoints are cached as
+serialized JSON keyed by the meeting's transcript version: a generation
+number bumped whenever ``save_transcript`` writes for the meeting, plus the
+name, size and mtime of each transcript file (so files written by other
+tools are picked up too). Responses carry that version as an ETag, so
+clients polling for a transcript get ``304 Not Modified`` until it changes.
+
+Two backends, selected by ``RESPONSE_CACHE_BACKEND``:
+    memory - per-process LRU bounded by ``RESPONSE_CACHE_MAX_BYTES`` (default)
+    redis  - shared by every worker via ``REDIS_URL`` (``pip install redis``)
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+# Upper bound on cached response bytes per process (memory backend)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# Lifetime of cached responses in Redis in seconds (stale versions are never read, this just frees memory)
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+
+
+class MemoryResponseCache:
+    """
+    Per-process LRU of response bodies, bounded by total size.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def generation(self, meeting_id: str) -> int:
+        with self._lock:
+            return self._generations.get(meeting_id, 0)
+
+    def invalidate(self, meeting_id: str):
+        """Bump the meeting's generation and drop its entries."""
+        prefix = f"{meeting_id}:"
+        with self._lock:
+            self._generations[meeting_id] = self._generations.get(meeting_id, 0) + 1
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._size -= len(self._entries.pop(key))
+
+
+class RedisResponseCache:
+    """
+    Response bodies and meeting generations shared through Redis.
+    """
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = RESPONSE_CACHE_TTL):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(f"response:{key}")
+
+    def set(self, key: str, body: bytes):
+        self.client.set(f"response:{key}", body, ex=self.ttl)
+
+    def generation(self, meeting_id: str) -> int:
+        return int(self.client.get(f"generation:{meeting_id}") or 0)
+
+    def invalidate(self, meeting_id: str):
+        # Old entries are unreachable once the generation changes and expire on their own
+        self.client.incr(f"generation:{meeting_id}")
+
+
+def create_response_cache():
+    """Create the cache backend selected by RESPONSE_CACHE_BACKEND."""
+    if RESPONSE_CACHE_BACKEND == 'redis':
+        try:
+            cache = RedisResponseCache()
+            cache.client.ping()
+            logger.info(f"Using Redis response cache at {REDIS_URL}")
+            return cache
+        except Exception as e:
+            logger.warning(f"Redis response cache unavailable ({e}); using in-memory cache")
+    elif RESPONSE_CACHE_BACKEND != 'memory':
+        logger.warning(f"Unknown RESPONSE_CACHE_BACKEND '{RESPONSE_CACHE_BACKEND}'; using in-memory cache")
+    return MemoryResponseCache()
+
+
+def meeting_version(meeting_id: str) -> str:
+    """
+    Version token of a meeting's transcripts: changes whenever one is written.
+    """
+    from src.stitching import source_versions
+
+    try:
+        # From the storage listing alone; nothing is downloaded
+        sources = source_versions(meeting_id)
+    except OSError:
+        # A transcript was replaced while listing; never match a cached entry
+        sources = [os.urandom(8).hex()]
+    identity = json.dumps([response_cache.generation(meeting_id), sources])
+    return hashlib.sha1(identity.encode()).hexdigest()
+
+
+def cached_meeting_response(endpoint: str) -> Callable:
+    """
+    Cache a view taking ``meeting_id`` that returns ``(dict, status)``.
+
+    Successful responses are cached per meeting version and query string and
+    sent with an ETag. Error responses are not cached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(meeting_id, *args, **kwargs):
+            try:
+                version = meeting_version(meeting_id)
+            except Exception as e:
+                logger.warning(f"Could not version transcripts of meeting {meeting_id}: {e}")
+                return view(meeting_id, *args, **kwargs)
+
+            key = f"{meeting_id}:{endpoint}:{version}:{request.query_string.decode()}"
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            body = response_cache.get(key)
+            if body is None:
+                result = view(meeting_id, *args, **kwargs)
+                data, status = result
+                if status != 200:
+                    return result
+                body = json.dumps(data).encode('utf-8')
+                response_cache.set(key, body)
+
+            response = Response(body, status=200, mimetype='application/json')
+            response.set_etag(etag)
+            # Clients may keep the body but must revalidate it
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+# Global response cache instance
+response_cache = create_response_cache()
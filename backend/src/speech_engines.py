@@ -0,0 +1,531 @@
+"""
+Speech-to-text engines for the transcription service.
+
+Every engine turns a speech audio file (16 kHz mono FLAC) into the same
+result dictionary:
+
+    {'transcript': str, 'words': [{'word', 'start_time', 'end_time', 'confidence'}], 'language': str}
+
+The engine is picked with ``STT_ENGINE``:
+    google  - Google Cloud Speech-to-Text (needs GOOGLE_APPLICATION_CREDENTIALS)
+    whisper - faster-whisper running locally on CPU or GPU
+    vosk    - Vosk/Kaldi running locally on CPU
+    mock    - deterministic offline stand-in (src.mock_speech)
+
+The local engines need no network access and have no per-request audio
+length limit. Their libraries are only imported when selected.
+"""
+
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import wave
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STT_ENGINE = os.getenv('STT_ENGINE', 'google')
+
+# faster-whisper model and runtime
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+WHISPER_DEVICE = os.getenv('WHISPER_DEVICE', 'cpu')
+WHISPER_COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
+WHISPER_CPU_THREADS = int(os.getenv('WHISPER_CPU_THREADS', '0'))  # 0 = library default
+
+# Directory of an unpacked Vosk model, e.g. vosk-model-small-en-us-0.15
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', '')
+
+# Bytes of 16 kHz mono 16-bit PCM fed to Vosk per call (about 2.5 s)
+VOSK_READ_SIZE = 80000
+
+# Engines without native streaming transcribe live audio in windows of this length
+STT_STREAM_WINDOW_SECONDS = float(os.getenv('STT_STREAM_WINDOW_SECONDS', '5'))
+
+
+def _result(transcript_parts: List[str], words: List[Dict], language_code: str) -> Dict:
+    return {
+        'transcript': " ".join(part.strip() for part in transcript_parts if part.strip()),
+        'words': words,
+        'language': language_code
+    }
+
+
+def _shift_words(words: List[Dict], offset_seconds: float) -> List[Dict]:
+    shifted = []
+    for word in words:
+        word = dict(word)
+        word['start_time'] += offset_seconds
+        word['end_time'] += offset_seconds
+        shifted.append(word)
+    return shifted
+
+
+def google_response_to_dict(response, language_code: str) -> Dict:
+    """Convert a Cloud Speech recognize response into the transcript result dictionary."""
+    transcript_parts = []
+    words = []
+    for result in response.results:
+        alternative = result.alternatives[0]
+        transcript_parts.append(alternative.transcript)
+
+        # Extract word-level timestamps
+        for word_info in alternative.words:
+            words.append({
+                'word': word_info.word,
+                'start_time': word_info.start_time.total_seconds(),
+                'end_time': word_info.end_time.total_seconds(),
+                'confidence': alternative.confidence
+            })
+    return _result(transcript_parts, words, language_code)
+
+
+class SpeechEngine(ABC):
+    """
+    Base class for speech-to-text engines.
+    """
+
+    name = 'base'
+    # Longest audio a single transcribe() call accepts, or None for no limit
+    max_sync_seconds: Optional[float] = None
+    # Longest audio one stream() call may receive, or None for no limit
+    max_stream_seconds: Optional[float] = None
+
+    def available(self) -> bool:
+        """Whether the engine is configured and can transcribe."""
+        return True
+
+    def cache_key(self) -> str:
+        """Engine name and every setting that changes its output (used by the recognition cache)."""
+        return self.name
+
+    @abstractmethod
+    def transcribe(self, audio_path: str, language_code: str = "en-US") -> Optional[Dict]:
+        """
+        Transcribe an audio file.
+
+        Args:
+            audio_path: Path to the audio file
+            language_code: Language code (e.g., 'en-US', 'es-ES')
+
+        Returns:
+            Transcription result dictionary or None if transcription failed
+        """
+
+    def transcribe_long(self, audio_path: str, language_code: str = "en-US",
+                        gcs_uri: Optional[str] = None) -> Optional[Dict]:
+        """Transcribe audio longer than max_sync_seconds. Engines without a limit just transcribe."""
+        return self.transcribe(audio_path, language_code)
+
+    def stream(self, frames: Iterable[bytes], language_code: str = "en-US",
+               sample_rate: int = 16000) -> Iterator[Dict]:
+        """
+        Transcribe live 16-bit mono PCM audio as it arrives.
+
+        The default implementation transcribes fixed windows of
+        STT_STREAM_WINDOW_SECONDS; engines with a streaming API override it.
+
+        Args:
+            frames: PCM audio chunks, ending when the stream ends
+            language_code: Language code
+            sample_rate: Sample rate of the PCM audio
+
+        Yields:
+            Dicts with 'transcript', 'is_final' and, for final results, 'words'
+            with times relative to the start of the stream
+        """
+        window_bytes = int(STT_STREAM_WINDOW_SECONDS * sample_rate) * 2
+        buffer = bytearray()
+        offset = 0.0
+
+        def flush():
+            result = self._transcribe_pcm(bytes(buffer), language_code, sample_rate)
+            if result and result['words']:
+                return {
+                    'transcript': result['transcript'],
+                    'is_final': True,
+                    'words': _shift_words(result['words'], offset),
+                }
+            return None
+
+        for frame in frames:
+            buffer.extend(frame)
+            if len(buffer) >= window_bytes:
+                result = flush()
+                if result:
+                    yield result
+                offset += len(buffer) / (2 * sample_rate)
+                buffer.clear()
+        if buffer:
+            result = flush()
+            if result:
+                yield result
+
+    def _transcribe_pcm(self, pcm: bytes, language_code: str, sample_rate: int) -> Optional[Dict]:
+        """Transcribe a buffer of PCM audio through a temporary WAV file."""
+        fd, wav_path = tempfile.mkstemp(suffix='.wav')
+        try:
+            with os.fdopen(fd, 'wb') as f, wave.open(f, 'wb') as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(sample_rate)
+                wav.writeframes(pcm)
+            return self.transcribe(wav_path, language_code)
+        finally:
+            os.remove(wav_path)
+
+
+class GoogleSpeechEngine(SpeechEngine):
+    """
+    Google Cloud Speech-to-Text.
+    """
+
+    name = 'google'
+    # Synchronous recognize is limited to about a minute of audio
+    max_sync_seconds = 55
+    # Cloud Speech closes streams after about five minutes of audio
+    max_stream_seconds = 290
+
+    def __init__(self):
+        self.client = None
+        try:
+            # Check if credentials are set
+            if 'GOOGLE_APPLICATION_CREDENTIALS' in os.environ:
+                from google.cloud import speech_v1p1beta1 as speech
+                self.speech = speech
+                self.client = speech.SpeechClient()
+                logger.info("Google Cloud Speech client initialized successfully")
+            else:
+                logger.warning("GOOGLE_APPLICATION_CREDENTIALS not set. Transcription will be disabled.")
+        except Exception as e:
+            logger.error(f"Error initializing Google Cloud Speech client: {e}", exc_info=True)
+            self.client = None
+
+    def available(self) -> bool:
+        return self.client is not None
+
+    def cache_key(self) -> str:
+        return f"{self.name}|video|punctuation"
+
+    def _config(self, audio_path: str, language_code: str):
+        # Pick the recognition encoding from the audio file extension
+        encoding = self.speech.RecognitionConfig.AudioEncoding
+        return self.speech.RecognitionConfig(
+            encoding=encoding.MP3 if audio_path.endswith('.mp3') else encoding.FLAC,
+            sample_rate_hertz=16000,
+            language_code=language_code,
+            enable_automatic_punctuation=True,
+            enable_word_time_offsets=True,
+            model='video',  # Optimized for video
+        )
+
+    def transcribe(self, audio_path: str, language_code: str = "en-US") -> Optional[Dict]:
+        if not self.client:
+            logger.error("Google Cloud Speech client not initialized")
+            return None
+
+        try:
+            with open(audio_path, 'rb') as audio_file:
+                audio = self.speech.RecognitionAudio(content=audio_file.read())
+
+            logger.info(f"Transcribing audio file: {audio_path}")
+            response = self.client.recognize(config=self._config(audio_path, language_code), audio=audio)
+            return google_response_to_dict(response, language_code)
+        except Exception as e:
+            logger.error(f"Error transcribing audio {audio_path}: {e}", exc_info=True)
+            return None
+
+    def transcribe_long(self, audio_path: str, language_code: str = "en-US",
+                        gcs_uri: Optional[str] = None) -> Optional[Dict]:
+        if not self.client:
+            logger.error("Google Cloud Speech client not initialized")
+            return None
+
+        try:
+            # If no GCS URI provided, use local file (will fail for files > 10MB)
+            if gcs_uri:
+                audio = self.speech.RecognitionAudio(uri=gcs_uri)
+            else:
+                with open(audio_path, 'rb') as audio_file:
+                    audio = self.speech.RecognitionAudio(content=audio_file.read())
+
+            logger.info(f"Starting long audio transcription: {audio_path}")
+            operation = self.client.long_running_recognize(config=self._config(audio_path, language_code), audio=audio)
+
+            logger.info("Waiting for transcription to complete...")
+            response = operation.result(timeout=600)  # 10 minute timeout
+            return google_response_to_dict(response, language_code)
+        except Exception as e:
+            logger.error(f"Error transcribing long audio {audio_path}: {e}", exc_info=True)
+            return None
+
+    def stream(self, frames: Iterable[bytes], language_code: str = "en-US",
+               sample_rate: int = 16000) -> Iterator[Dict]:
+        if not self.client:
+            logger.error("Google Cloud Speech client not initialized")
+            return
+
+        config = self.speech.RecognitionConfig(
+            encoding=self.speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=language_code,
+            enable_automatic_punctuation=True,
+            enable_word_time_offsets=True,
+            model='video',
+        )
+        streaming_config = self.speech.StreamingRecognitionConfig(config=config, interim_results=True)
+        requests = (self.speech.StreamingRecognizeRequest(audio_content=frame) for frame in frames)
+
+        for response in self.client.streaming_recognize(streaming_config, requests):
+            for result in response.results:
+                if not result.alternatives:
+                    continue
+                final = google_response_to_dict(SimpleNamespace(results=[result]), language_code) if result.is_final else None
+                yield {
+                    'transcript': result.alternatives[0].transcript.strip(),
+                    'is_final': result.is_final,
+                    'words': final['words'] if final else [],
+                }
+
+
+class MockSpeechEngine(GoogleSpeechEngine):
+    """
+    Google engine backed by the offline mock client, for tests and local development.
+    """
+
+    name = 'mock'
+    # The mock client has no streaming API; use the windowed default
+    max_stream_seconds = None
+
+    def __init__(self):
+        from src.mock_speech import MockSpeechClient
+        self.client = MockSpeechClient()
+        # The mock accepts any config; only the audio content is read
+        self.speech = SimpleNamespace(
+            RecognitionAudio=lambda content=None, uri=None: SimpleNamespace(content=content, uri=uri),
+            RecognitionConfig=SimpleNamespace(AudioEncoding=SimpleNamespace(MP3='MP3', FLAC='FLAC')),
+        )
+        logger.info("Using mock speech client")
+
+    def _config(self, audio_path: str, language_code: str):
+        return None
+
+    def stream(self, frames: Iterable[bytes], language_code: str = "en-US",
+               sample_rate: int = 16000) -> Iterator[Dict]:
+        return SpeechEngine.stream(self, frames, language_code, sample_rate)
+
+    def cache_key(self) -> str:
+        return f"{self.name}|{self.client.word_seconds}"
+
+
+class WhisperEngine(SpeechEngine):
+    """
+    faster-whisper (CTranslate2 Whisper) running locally.
+    """
+
+    name = 'whisper'
+
+    def __init__(self, model_size: str = WHISPER_MODEL):
+        self.model_size = model_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        # Loading the model takes seconds, so do it once on first use
+        with self._lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                logger.info(f"Loading Whisper model '{self.model_size}' on {WHISPER_DEVICE}")
+                self._model = WhisperModel(
+                    self.model_size,
+                    device=WHISPER_DEVICE,
+                    compute_type=WHISPER_COMPUTE_TYPE,
+                    cpu_threads=WHISPER_CPU_THREADS
+                )
+            return self._model
+
+    def available(self) -> bool:
+        try:
+            import faster_whisper  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def cache_key(self) -> str:
+        return f"{self.name}|{self.model_size}|{WHISPER_COMPUTE_TYPE}"
+
+    def transcribe(self, audio_path: str, language_code: str = "en-US") -> Optional[Dict]:
+        try:
+            logger.info(f"Transcribing audio file with Whisper: {audio_path}")
+            segments, _ = self._get_model().transcribe(
+                audio_path,
+                language=language_code.split('-')[0],
+                word_timestamps=True,
+                vad_filter=True
+            )
+
+            transcript_parts = []
+            words = []
+            for segment in segments:
+                transcript_parts.append(segment.text)
+                for word in segment.words or []:
+                    words.append({
+                        'word': word.word.strip(),
+                        'start_time': word.start,
+                        'end_time': word.end,
+                        'confidence': word.probability
+                    })
+            return _result(transcript_parts, words, language_code)
+        except Exception as e:
+            logger.error(f"Error transcribing audio {audio_path} with Whisper: {e}", exc_info=True)
+            return None
+
+
+class VoskEngine(SpeechEngine):
+    """
+    Vosk (Kaldi) running locally. The model is chosen by VOSK_MODEL_PATH and
+    determines the language.
+    """
+
+    name = 'vosk'
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                from vosk import Model
+                logger.info(f"Loading Vosk model from {self.model_path}")
+                self._model = Model(self.model_path)
+            return self._model
+
+    def available(self) -> bool:
+        try:
+            import vosk  # noqa: F401
+        except ImportError:
+            return False
+        return bool(self.model_path) and os.path.isdir(self.model_path)
+
+    def cache_key(self) -> str:
+        return f"{self.name}|{os.path.basename(os.path.normpath(self.model_path))}"
+
+    def _words(self, result: Dict) -> List[Dict]:
+        return [{
+            'word': word['word'],
+            'start_time': word['start'],
+            'end_time': word['end'],
+            'confidence': word.get('conf', 1.0)
+        } for word in result.get('result', [])]
+
+    def stream(self, frames: Iterable[bytes], language_code: str = "en-US",
+               sample_rate: int = 16000) -> Iterator[Dict]:
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self._get_model(), sample_rate)
+        recognizer.SetWords(True)
+        for frame in frames:
+            if recognizer.AcceptWaveform(frame):
+                result = json.loads(recognizer.Result())
+                if result.get('text'):
+                    yield {'transcript': result['text'], 'is_final': True, 'words': self._words(result)}
+            else:
+                partial = json.loads(recognizer.PartialResult()).get('partial', '')
+                if partial:
+                    yield {'transcript': partial, 'is_final': False, 'words': []}
+        result = json.loads(recognizer.FinalResult())
+        if result.get('text'):
+            yield {'transcript': result['text'], 'is_final': True, 'words': self._words(result)}
+
+    def transcribe(self, audio_path: str, language_code: str = "en-US") -> Optional[Dict]:
+        from vosk import KaldiRecognizer
+
+        try:
+            recognizer = KaldiRecognizer(self._get_model(), 16000)
+            recognizer.SetWords(True)
+
+            # Vosk takes raw 16 kHz mono PCM; decode the FLAC with ffmpeg
+            decoder = subprocess.Popen(
+                ['ffmpeg', '-loglevel', 'error', '-i', audio_path, '-ac', '1', '-ar', '16000', '-f', 's16le', '-'],
+                stdout=subprocess.PIPE
+            )
+            try:
+                results = []
+                while True:
+                    data = decoder.stdout.read(VOSK_READ_SIZE)
+                    if not data:
+                        break
+                    if recognizer.AcceptWaveform(data):
+                        results.append(json.loads(recognizer.Result()))
+                results.append(json.loads(recognizer.FinalResult()))
+                if decoder.wait() != 0:
+                    logger.error(f"Decoding {audio_path} for Vosk failed")
+                    return None
+            finally:
+                # Don't leave ffmpeg running (or a zombie) when recognition fails part way
+                if decoder.poll() is None:
+                    decoder.kill()
+                decoder.stdout.close()
+                decoder.wait()
+
+            return _result(
+                [result.get('text', '') for result in results],
+                [word for result in results for word in self._words(result)],
+                language_code
+            )
+        except Exception as e:
+            logger.error(f"Error transcribing audio {audio_path} with Vosk: {e}", exc_info=True)
+            return None
+
+
+ENGINES = {
+    'google': GoogleSpeechEngine,
+    'whisper': WhisperEngine,
+    'vosk': VoskEngine,
+    'mock': MockSpeechEngine,
+}
+
+
+def create_engine(name: str = STT_ENGINE) -> SpeechEngine:
+    """
+    Build the configured speech-to-text engine.
+
+    Args:
+        name: Engine name from ENGINES
+
+    Returns:
+        The engine instance
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown STT_ENGINE '{name}', expected one of: {', '.join(ENGINES)}")
+    engine = ENGINES[name]()
+    if not engine.available():
+        logger.warning(f"Speech engine '{name}' is not available. Transcription will be disabled.")
+    return engine
+
+
+if __name__ == "__main__":
+    # Benchmark engines on one file: python -m src.speech_engines <audio.flac> [engine ...]
+    import sys
+    import time
+    from src.conversion import probe_media
+
+    logging.basicConfig(level=logging.INFO)
+    audio_path = sys.argv[1]
+    probe = probe_media(audio_path)
+    duration = probe['duration'] if probe else None
+
+    for name in sys.argv[2:] or [STT_ENGINE]:
+        engine = create_engine(name)
+        started = time.monotonic()
+        result = engine.transcribe_long(audio_path)
+        elapsed = time.monotonic() - started
+        speed = f", {duration / elapsed:.1f}x real time" if duration and elapsed else ""
+        words = len(result['words']) if result else 0
+        print(f"{name}: {elapsed:.2f}s, {words} words{speed}")
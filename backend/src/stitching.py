@@ -0,0 +1,160 @@
+"""
+Stitched meeting transcripts.
+
+Each participant's transcript is already in time order, so the meeting
+transcript is a k-way merge of those word streams (a heap over one cursor
+per participant) rather than a sort of every word. Consecutive words from
+the same speaker are grouped into one sentence as they come off the merge.
+
+The result is written once per meeting to
+``transcripts/<meeting_id>/<meeting>_stitched.json`` when a participant's
+transcript is finished (``transcript_finished``), together with the version
+of every source transcript as storage lists it (size and modification time,
+or the object's ETag). Reads serve that file while the sources are unchanged
+and re-stitch otherwise.
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+from src.storage import (storage, parse_recording_filename, TRANSCRIPTS, TRANSCRIPT_COLUMNAR_SUFFIX,
+                         TRANSCRIPT_SUFFIX)
+from src.transcript_store import read_word_columns
+
+logger = logging.getLogger(__name__)
+
+STITCHED_VERSION = 1
+
+# Serializes writes of the stitched file per process
+_stitch_lock = threading.Lock()
+
+
+def source_versions(meeting_id: str) -> List[List[str]]:
+    """
+    Key and version of each of a meeting's source transcripts, used to detect changes.
+    Read from the storage listing, so no transcript is downloaded.
+    """
+    versions = storage.meeting_file_versions(TRANSCRIPTS, meeting_id, (TRANSCRIPT_COLUMNAR_SUFFIX, TRANSCRIPT_SUFFIX))
+    return [list(version) for version in versions]
+
+
+def stitch(participants: List[Tuple[str, List[str], List[float]]]) -> Dict:
+    """
+    Merge participants' time-ordered words into speaker-run sentences.
+
+    Args:
+        participants: (participant_id, words, start times) per participant,
+            each already sorted by start time
+
+    Returns:
+        {'sentences', 'sentence_count', 'participant_count', 'total_words'}
+    """
+    streams = []
+    for participant_id, words, starts in participants:
+        if not words:
+            logger.warning(f"Participant {participant_id} has no words in transcript")
+            continue
+        # (start, order, participant, word): ties keep participant order like a stable sort
+        order = len(streams)
+        streams.append([(start, order, participant_id, word) for start, word in zip(starts, words)])
+
+    sentences = []
+    total_words = 0
+    for participant_id, run in groupby(heapq.merge(*streams), key=lambda item: item[2]):
+        run = list(run)
+        total_words += len(run)
+        text = " ".join(item[3] for item in run).strip()
+        if text:  # Only add non-empty sentences
+            sentences.append({
+                'participant_id': participant_id,
+                'text': text,
+                'start': run[0][0],
+                'end': run[-1][0]
+            })
+
+    return {
+        'sentences': sentences,
+        'sentence_count': len(sentences),
+        'participant_count': len(streams),
+        'total_words': total_words
+    }
+
+
+def stitch_files(paths: List[str]) -> Dict:
+    """Stitch transcript files (JSON or columnar) into sentences."""
+    participants = []
+    for path in sorted(paths):
+        words, starts = read_word_columns(path)
+        participants.append((parse_recording_filename(os.path.basename(path))['participant_id'], words, starts))
+    return stitch(participants)
+
+
+def build_stitched(meeting_id: str) -> Optional[Dict]:
+    """
+    Stitch a meeting's transcripts and write the stitched file.
+
+    Returns:
+        The stitched transcript, or None if the meeting has no transcripts
+    """
+    from src.transcription import transcription_service
+
+    paths = transcription_service.list_meeting_transcripts(meeting_id)
+    if not paths:
+        return None
+
+    with _stitch_lock:
+        sources = source_versions(meeting_id)
+        stitched = stitch_files(paths)
+        stitched['meeting_id'] = meeting_id
+
+        path = storage.stitched_path(meeting_id)
+        temp_path = f"{path}.{threading.get_ident()}.part"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STITCHED_VERSION, 'sources': sources, 'stitched': stitched}, f,
+                      ensure_ascii=False)
+        os.replace(temp_path, path)
+        storage.publish(path, keep_local=True)
+
+    logger.info(f"Stitched {stitched['total_words']} words from {stitched['participant_count']} "
+                f"participants for meeting {meeting_id}")
+    return stitched
+
+
+def get_stitched(meeting_id: str) -> Optional[Dict]:
+    """
+    Get a meeting's stitched transcript, re-stitching if any source transcript changed.
+
+    Returns:
+        The stitched transcript, or None if the meeting has no transcripts
+    """
+    sources = source_versions(meeting_id)
+    if not sources:
+        return None
+
+    path = storage.ensure_local(storage.stitched_path(meeting_id, create=False))
+    if path:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == STITCHED_VERSION and cached.get('sources') == sources:
+                return cached['stitched']
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable stitched transcript {path}: {e}")
+
+    return build_stitched(meeting_id)
+
+
+def transcript_finished(meeting_id: str):
+    """
+    Refresh a meeting's stitched transcript after one participant's transcript is finished,
+    and start its summary once no other transcript is in progress.
+    """
+    from src.summaries import summary_service
+
+    stitched = build_stitched(meeting_id)
+    summary_service.transcript_finished(meeting_id, stitched)
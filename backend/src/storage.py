@@ -0,0 +1,564 @@
+"""
+Storage for recordings, audio and transcripts.
+
+Files are sharded by meeting and participant:
+
+    recordings/<meeting_id>/<participant_id>/<meeting>_<participant>_<timestamp>.mp4
+    audio/<meeting_id>/<participant_id>/<meeting>_<participant>_<timestamp>.flac
+    transcripts/<meeting_id>/<participant_id>/<meeting>_<participant>_transcript.npz (or .json)
+    transcripts/<meeting_id>/<meeting>_stitched.json
+    hls/<meeting_id>/<participant_id>/<meeting>_<participant>_<timestamp>/master.m3u8
+
+so listing one meeting's artifacts only touches that meeting's directory.
+File names are unchanged from the old flat layout. To move existing flat
+files into place, run from ``backend/``:
+
+    python -m src.storage migrate
+
+Two backends share this layout, selected by ``STORAGE_BACKEND``:
+    local - files live only on this node's disk (default)
+    s3    - the local tree is a working cache; finished recordings and
+            transcripts are uploaded to an S3-compatible bucket (AWS, MinIO,
+            moto) under the same keys and served via presigned URLs
+"""
+
+import logging
+import os
+import re
+import shutil
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Storage backend: 'local' or 's3'
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+S3_BUCKET = os.getenv('S3_BUCKET', '')
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+S3_REGION = os.getenv('S3_REGION')
+# Remove local copies of recordings once they are uploaded
+S3_KEEP_LOCAL = os.getenv('S3_KEEP_LOCAL', 'false').lower() == 'true'
+# Lifetime of presigned playback URLs in seconds
+S3_PRESIGN_EXPIRES = int(os.getenv('S3_PRESIGN_EXPIRES', '3600'))
+# Files above this size are uploaded with S3 multipart upload
+S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', str(16 * 1024 * 1024)))
+
+CONTENT_TYPES = {
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+    '.flac': 'audio/flac',
+    '.json': 'application/json',
+    '.npz': 'application/octet-stream',
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+    '.jpg': 'image/jpeg',
+    '.vtt': 'text/vtt',
+}
+
+RECORDINGS = 'recordings'
+AUDIO = 'audio'
+TRANSCRIPTS = 'transcripts'
+PACKAGES = 'hls'
+
+TRANSCRIPT_SUFFIX = '_transcript.json'
+# Columnar transcripts (see src.transcript_store)
+TRANSCRIPT_COLUMNAR_SUFFIX = '_transcript.npz'
+# Whole-meeting stitched transcript (see src.stitching)
+STITCHED_SUFFIX = '_stitched.json'
+
+
+# meeting_participant[_YYYYmmdd_HHMMSS]; the timestamp is matched from the end so
+# participant IDs (e.g. Socket.IO sids) may contain underscores
+_FILENAME_RE = re.compile(r'^(?P<meeting_id>[^_]*)_(?P<participant_id>.+?)(?:_(?P<timestamp>\d{8}_\d{6}))?$')
+
+
+def parse_recording_filename(filename: str) -> Dict[str, str]:
+    """
+    Split meeting_participant_timestamp.ext into its parts.
+
+    Names only tell the IDs apart when the meeting ID has no underscore; use
+    the recording index for the IDs of a saved recording.
+    """
+    file_base = filename.rsplit('.', 1)[0]
+    if file_base.endswith('_transcript'):
+        file_base = file_base[:-len('_transcript')]
+    match = _FILENAME_RE.match(file_base)
+    if not match:
+        return {'meeting_id': file_base or 'Unknown', 'participant_id': 'Unknown', 'timestamp': 'Unknown'}
+    return {
+        'meeting_id': match.group('meeting_id'),
+        'participant_id': match.group('participant_id'),
+        'timestamp': match.group('timestamp') or 'Unknown',
+    }
+
+
+def _safe_component(value) -> str:
+    """Make an ID safe to use as a single directory name."""
+    value = re.sub(r'[^A-Za-z0-9._-]', '-', str(value))
+    return value if value not in ('', '.', '..') else 'unknown'
+
+
+class LocalStorage:
+    """
+    Local filesystem storage with a per-meeting directory layout.
+    """
+
+    def __init__(self, root: str = BASE_DIR):
+        self.root = root
+        for kind in (RECORDINGS, AUDIO, TRANSCRIPTS, PACKAGES):
+            os.makedirs(self.kind_dir(kind), exist_ok=True)
+
+    def kind_dir(self, kind: str) -> str:
+        """Top-level directory for one kind of artifact."""
+        return os.path.join(self.root, kind)
+
+    def meeting_dir(self, kind: str, meeting_id: str) -> str:
+        """Directory holding one meeting's artifacts of a kind."""
+        return os.path.join(self.kind_dir(kind), _safe_component(meeting_id))
+
+    def path_for(self, kind: str, meeting_id: str, participant_id: str, filename: str,
+                 create: bool = True) -> str:
+        """
+        Get the path for a file, creating its directory.
+
+        Args:
+            kind: 'recordings', 'audio', 'transcripts' or 'hls'
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            filename: File name within the participant directory
+            create: Create the participant directory if it is missing
+
+        Returns:
+            Absolute file path
+        """
+        directory = os.path.join(self.meeting_dir(kind, meeting_id), _safe_component(participant_id))
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, os.path.basename(filename))
+
+    def recording_path(self, meeting_id: str, participant_id: str, filename: str) -> str:
+        return self.path_for(RECORDINGS, meeting_id, participant_id, filename)
+
+    def audio_path(self, meeting_id: str, participant_id: str, filename: str) -> str:
+        return self.path_for(AUDIO, meeting_id, participant_id, filename)
+
+    def transcript_path(self, meeting_id: str, participant_id: str, create: bool = True,
+                        suffix: str = TRANSCRIPT_SUFFIX) -> str:
+        return self.path_for(TRANSCRIPTS, meeting_id, participant_id,
+                             f"{meeting_id}_{participant_id}{suffix}", create=create)
+
+    def stitched_path(self, meeting_id: str, create: bool = True) -> str:
+        """Path of a meeting's stitched transcript, next to the participant directories."""
+        meeting_dir = self.meeting_dir(TRANSCRIPTS, meeting_id)
+        if create:
+            os.makedirs(meeting_dir, exist_ok=True)
+        return os.path.join(meeting_dir, f"{_safe_component(meeting_id)}{STITCHED_SUFFIX}")
+
+    def package_dir(self, filename: str, create: bool = True) -> str:
+        """Directory holding the streaming package of a recording (named after its stem)."""
+        parsed = parse_recording_filename(os.path.basename(filename))
+        stem = os.path.splitext(os.path.basename(filename))[0]
+        return self.path_for(PACKAGES, parsed['meeting_id'], parsed['participant_id'], stem, create=create)
+
+    def locate(self, kind: str, filename: str, meeting_id: Optional[str] = None,
+               participant_id: Optional[str] = None) -> Optional[str]:
+        """
+        Find an existing file by name.
+
+        Args:
+            kind: 'recordings', 'audio' or 'transcripts'
+            filename: Name in meeting_participant_... form
+            meeting_id: The meeting ID (parsed from the name if omitted)
+            participant_id: The participant ID (parsed from the name if omitted)
+
+        Returns:
+            Absolute path, or None if the file does not exist
+        """
+        filename = os.path.basename(filename)
+        parsed = parse_recording_filename(filename)
+        path = os.path.join(
+            self.meeting_dir(kind, meeting_id or parsed['meeting_id']),
+            _safe_component(participant_id or parsed['participant_id']),
+            filename
+        )
+        return path if os.path.isfile(path) else None
+
+    def list_meeting_files(self, kind: str, meeting_id: str, suffixes: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        """
+        List one meeting's files of a kind.
+
+        Args:
+            kind: 'recordings', 'audio' or 'transcripts'
+            meeting_id: The meeting ID
+            suffixes: File name endings to include
+
+        Returns:
+            List of (participant directory name, absolute path)
+        """
+        meeting_dir = self.meeting_dir(kind, meeting_id)
+        if not os.path.isdir(meeting_dir):
+            return []
+
+        files = []
+        for participant in os.listdir(meeting_dir):
+            participant_dir = os.path.join(meeting_dir, participant)
+            if not os.path.isdir(participant_dir):
+                continue
+            for filename in os.listdir(participant_dir):
+                if filename.endswith(suffixes):
+                    files.append((participant, os.path.join(participant_dir, filename)))
+        return files
+
+    def meeting_file_versions(self, kind: str, meeting_id: str, suffixes: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        """
+        Version of each of one meeting's files of a kind, without reading or fetching them.
+
+        Returns:
+            Sorted list of (storage key, version), where the version changes whenever the file is rewritten
+        """
+        versions = []
+        for _, path in self.list_meeting_files(kind, meeting_id, suffixes):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            versions.append((self.key_for(path), f"{stat.st_size}-{stat.st_mtime_ns}"))
+        return sorted(versions)
+
+    def key_for(self, path: str) -> str:
+        """Get the storage key (path relative to the root) of a local file."""
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def path_for_key(self, key: str) -> str:
+        """Get the local path of a storage key."""
+        return os.path.join(self.root, *key.split('/'))
+
+    def publish(self, path: str, keep_local: Optional[bool] = None) -> str:
+        """
+        Make a finished file durable. Local files are already in place.
+
+        Returns:
+            The file's storage key
+        """
+        return self.key_for(path)
+
+    def ensure_local(self, path: str) -> Optional[str]:
+        """Make sure a file is present on local disk. Returns the path, or None if it does not exist."""
+        return path if os.path.isfile(path) else None
+
+    def remove(self, path: str):
+        """Delete a file if it exists."""
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def retain(self, path: str):
+        """Mark a local file as in use, e.g. by packaging or transcription, so release() keeps it."""
+
+    def release(self, path: str):
+        """Drop a use taken with retain(). Local files are the only copy, so they always stay."""
+
+    def url_for(self, kind: str, filename: str, meeting_id: Optional[str] = None,
+                participant_id: Optional[str] = None) -> Optional[str]:
+        """Get a direct download URL for a file, or None to serve it from local disk."""
+        return None
+
+    def url_for_path(self, path: str) -> Optional[str]:
+        """Get a direct download URL for a local path, or None to serve it from local disk."""
+        return None
+
+    def iter_files(self, kind: str, suffixes: Tuple[str, ...]):
+        """
+        Yield (path, size in bytes) of every file of a kind (used by maintenance tasks).
+
+        Call ensure_local() before reading a path; with object storage it may
+        only exist in the bucket.
+        """
+        for dirpath, _, filenames in os.walk(self.kind_dir(kind)):
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    path = os.path.join(dirpath, filename)
+                    yield path, os.path.getsize(path)
+
+    def migrate_flat_layout(self) -> Dict[str, int]:
+        """
+        Move files left in the old flat directories into the sharded layout.
+
+        Returns:
+            Number of files moved per kind
+        """
+        moved = {}
+        for kind in (RECORDINGS, AUDIO, TRANSCRIPTS):
+            moved[kind] = 0
+            kind_dir = self.kind_dir(kind)
+            for filename in os.listdir(kind_dir):
+                source = os.path.join(kind_dir, filename)
+                if not os.path.isfile(source) or filename.startswith('.') or filename.upper() == 'README.MD':
+                    continue
+                parsed = parse_recording_filename(filename)
+                target = self.path_for(kind, parsed['meeting_id'], parsed['participant_id'], filename)
+                shutil.move(source, target)
+                moved[kind] += 1
+            logger.info(f"Moved {moved[kind]} file(s) into {kind}/<meeting>/<participant>/")
+        return moved
+
+
+class S3Storage(LocalStorage):
+    """
+    S3-compatible object storage backed by a local working cache.
+
+    ffmpeg and transcription still work on local files; finished files are
+    uploaded under the same keys as the local layout and fetched back on
+    demand, so any backend node can serve any meeting.
+    """
+
+    def __init__(self, bucket: str, root: str = BASE_DIR, endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, keep_local: bool = S3_KEEP_LOCAL):
+        super().__init__(root)
+        # Imported here so boto3 is only needed when the s3 backend is used
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        if not bucket:
+            raise ValueError('S3_BUCKET must be set when STORAGE_BACKEND=s3')
+        self.bucket = bucket
+        self.keep_local = keep_local
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+        # Local path -> number of jobs still reading the cached copy
+        self._users: Dict[str, int] = {}
+        self._users_lock = threading.Lock()
+        self.transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_THRESHOLD
+        )
+
+    def _head(self, key: str) -> Optional[Dict]:
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+
+    def _exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def _mark_current(self, path: str, head: Dict):
+        # The local copy's mtime records the version of the object it matches
+        modified = head['LastModified'].timestamp()
+        os.utime(path, (modified, modified))
+
+    @staticmethod
+    def _is_current(path: str, head: Dict) -> bool:
+        """Whether a local copy matches the object, or holds newer writes that are not uploaded yet."""
+        stat = os.stat(path)
+        modified = head['LastModified'].timestamp()
+        if stat.st_mtime > modified + 1:
+            return True
+        return abs(stat.st_mtime - modified) <= 1 and stat.st_size == head['ContentLength']
+
+    def publish(self, path: str, keep_local: Optional[bool] = None) -> str:
+        """
+        Upload a finished file to the bucket (multipart above the threshold).
+
+        Args:
+            path: Local file path inside the storage root
+            keep_local: Keep the local copy; defaults to S3_KEEP_LOCAL
+
+        Returns:
+            The file's storage key
+        """
+        key = self.key_for(path)
+        if not os.path.isfile(path):
+            return key
+
+        content_type = CONTENT_TYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+        self.client.upload_file(path, self.bucket, key,
+                                ExtraArgs={'ContentType': content_type},
+                                Config=self.transfer_config)
+        logger.info(f"Uploaded {path} to s3://{self.bucket}/{key}")
+
+        if not (self.keep_local if keep_local is None else keep_local):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Failed to remove local copy {path}: {e}")
+        else:
+            head = self._head(key)
+            if head:
+                self._mark_current(path, head)
+        return key
+
+    def ensure_local(self, path: str) -> Optional[str]:
+        """
+        Make sure the local cache holds the current version of a file.
+
+        A cached copy is checked against the object's size and LastModified
+        and downloaded again if another node has replaced the object. Files
+        that are not in the bucket (yet) are served from disk as they are.
+        """
+        return self._fetch(path, self._head(self.key_for(path)))
+
+    def _fetch(self, path: str, head: Optional[Dict]) -> Optional[str]:
+        """ensure_local() given the object's metadata (ContentLength and LastModified), or None if it is missing."""
+        if os.path.isfile(path) and (head is None or self._is_current(path, head)):
+            return path
+        if head is None:
+            return None
+
+        from botocore.exceptions import ClientError
+        key = self.key_for(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part_path = path + '.part'
+        try:
+            self.client.download_file(self.bucket, key, part_path, Config=self.transfer_config)
+            os.replace(part_path, path)
+            self._mark_current(path, head)
+            return path
+        except ClientError:
+            return None
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def retain(self, path: str):
+        """Keep the local copy of a file until a matching release(), whatever keep_local says."""
+        with self._users_lock:
+            self._users[path] = self._users.get(path, 0) + 1
+
+    def release(self, path: str):
+        """
+        Drop a use of a local copy. Once no job uses it, a copy that matches the
+        published object is removed unless keep_local is set; unpublished files stay.
+        """
+        with self._users_lock:
+            users = self._users.pop(path, 0) - 1
+            if users > 0:
+                self._users[path] = users
+                return
+            if self.keep_local or not os.path.isfile(path):
+                return
+            head = self._head(self.key_for(path))
+            stat = os.stat(path)
+            if (head is None or stat.st_size != head['ContentLength']
+                    or abs(stat.st_mtime - head['LastModified'].timestamp()) > 1):
+                return
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Failed to remove local copy {path}: {e}")
+
+    def remove(self, path: str):
+        """Delete a file from the bucket and the local cache."""
+        self.client.delete_object(Bucket=self.bucket, Key=self.key_for(path))
+        super().remove(path)
+
+    def locate(self, kind: str, filename: str, meeting_id: Optional[str] = None,
+               participant_id: Optional[str] = None) -> Optional[str]:
+        # A cached copy may be stale, so always go through ensure_local
+        parsed = parse_recording_filename(os.path.basename(filename))
+        return self.ensure_local(self.path_for(kind, meeting_id or parsed['meeting_id'],
+                                               participant_id or parsed['participant_id'], filename))
+
+    def url_for(self, kind: str, filename: str, meeting_id: Optional[str] = None,
+                participant_id: Optional[str] = None) -> Optional[str]:
+        """Presigned GET URL for a file in the bucket, or None if it is not there."""
+        parsed = parse_recording_filename(os.path.basename(filename))
+        return self.url_for_path(self.path_for(kind, meeting_id or parsed['meeting_id'],
+                                               participant_id or parsed['participant_id'], filename, create=False))
+
+    def url_for_path(self, path: str) -> Optional[str]:
+        """Presigned GET URL for the object of a local path, or None if it is not in the bucket."""
+        key = self.key_for(path)
+        if not self._exists(key):
+            return None
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=S3_PRESIGN_EXPIRES
+        )
+
+    def _iter_objects(self, prefix: str):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            yield from page.get('Contents', [])
+
+    def list_meeting_files(self, kind: str, meeting_id: str, suffixes: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        """
+        List one meeting's files from the bucket, caching them locally.
+        Cached copies are checked against the listing, so only missing or
+        replaced files cost a request.
+        """
+        prefix = self.key_for(self.meeting_dir(kind, meeting_id)) + '/'
+        files = []
+        for obj in self._iter_objects(prefix):
+            key = obj['Key']
+            if not key.endswith(suffixes):
+                continue
+            path = self._fetch(self.path_for_key(key), {'ContentLength': obj['Size'],
+                                                        'LastModified': obj['LastModified']})
+            if path:
+                files.append((key[len(prefix):].split('/')[0], path))
+        return files
+
+    def meeting_file_versions(self, kind: str, meeting_id: str, suffixes: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        """Versions (ETag and LastModified) from the bucket listing alone."""
+        prefix = self.key_for(self.meeting_dir(kind, meeting_id)) + '/'
+        versions = []
+        for obj in self._iter_objects(prefix):
+            if obj['Key'].endswith(suffixes):
+                etag = obj['ETag'].strip('"')
+                versions.append((obj['Key'], f"{etag}-{obj['LastModified'].timestamp()}"))
+        return sorted(versions)
+
+    def iter_files(self, kind: str, suffixes: Tuple[str, ...]):
+        """Yield (path, size) of every file of a kind in the bucket, from the listing alone."""
+        seen = set()
+        for obj in self._iter_objects(kind + '/'):
+            if obj['Key'].endswith(suffixes):
+                path = self.path_for_key(obj['Key'])
+                seen.add(path)
+                yield path, obj['Size']
+        # Files not uploaded yet, e.g. recordings still being converted
+        for path, size in super().iter_files(kind, suffixes):
+            if path not in seen:
+                yield path, size
+
+
+def create_storage() -> LocalStorage:
+    """Build the storage backend selected by STORAGE_BACKEND."""
+    if STORAGE_BACKEND == 's3':
+        return S3Storage(S3_BUCKET, endpoint_url=S3_ENDPOINT_URL, region=S3_REGION)
+    return LocalStorage()
+
+
+# Global storage instance
+storage = create_storage()
+
+
+def _migrate():
+    """Migrate flat files and repoint pending conversion jobs at the new paths."""
+    from src.database import init_db, get_db
+    from src.models import ConversionJob
+
+    init_db()
+    moved = storage.migrate_flat_layout()
+
+    with get_db() as db:
+        for job in db.query(ConversionJob).filter(ConversionJob.status.in_(['queued', 'running', 'failed'])).all():
+            if not os.path.exists(job.input_path):
+                relocated = storage.locate(RECORDINGS, job.input_path)
+                if relocated:
+                    job.input_path = relocated
+                    job.output_path = os.path.join(os.path.dirname(relocated), os.path.basename(job.output_path))
+
+    print(moved)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] == ['migrate']:
+        _migrate()
+    else:
+        print("Usage: python -m src.storage migrate")
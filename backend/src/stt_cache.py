@@ -0,0 +1,190 @@
+"""
+Content-addressed cache of speech recognition results.
+
+Results are keyed by the SHA-256 of the audio bytes plus the engine, its
+configuration, the language and the recognition mode, so re-uploads,
+retries after a crash and pipeline re-runs skip recognition entirely. Live
+segments and transcription chunks are cached one by one, so a re-run only
+pays for chunks that changed.
+
+Entries are JSON files under ``STT_CACHE_DIR``. When the cache grows past
+``STT_CACHE_MAX_BYTES`` the least recently used entries are removed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STT_CACHE_ENABLED = os.getenv('STT_CACHE_ENABLED', 'true').lower() == 'true'
+STT_CACHE_DIR = os.getenv('STT_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'stt_cache'))
+STT_CACHE_MAX_BYTES = int(os.getenv('STT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RecognitionCache:
+    """
+    Disk-backed LRU cache of recognition results with hit/miss counters.
+    """
+
+    def __init__(self, cache_dir: str = STT_CACHE_DIR, max_bytes: int = STT_CACHE_MAX_BYTES,
+                 enabled: bool = STT_CACHE_ENABLED):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._size = None  # Computed on first write
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, audio_path: str, engine_key: str, language_code: str, mode: str) -> str:
+        """
+        Build the cache key for recognizing one audio file.
+
+        Args:
+            audio_path: Path to the audio file
+            engine_key: Engine name and configuration (SpeechEngine.cache_key())
+            language_code: Language code
+            mode: How the audio is recognized ('sync', 'long' or 'chunked')
+        """
+        identity = f"{hash_file(audio_path)}|{engine_key}|{language_code}|{mode}"
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a cached entry, marking it as recently used. Returns None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, result: Dict, recognition_seconds: float):
+        """Store a recognition result, evicting old entries if the cache is full."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'result': result, 'recognition_seconds': recognition_seconds}, f)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                if name.endswith('.json'):
+                    total += os.path.getsize(os.path.join(dirpath, name))
+        return total
+
+    def _evict(self):
+        """Remove least recently used entries until the cache is under 90% of its limit."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                if name.endswith('.json'):
+                    path = os.path.join(dirpath, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        self._size = total
+        logger.info(f"Evicted {removed} recognition cache entries ({total} bytes left)")
+
+    def recognize(self, audio_path: str, engine_key: str, language_code: str, mode: str,
+                  recognize: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Return the cached result for an audio file, or run ``recognize`` and cache it.
+
+        Failed recognitions (None) are not cached.
+        """
+        if not self.enabled:
+            return recognize()
+
+        try:
+            key = self.make_key(audio_path, engine_key, language_code, mode)
+        except OSError as e:
+            logger.warning(f"Could not hash {audio_path} for the recognition cache: {e}")
+            return recognize()
+
+        entry = self.get(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += entry.get('recognition_seconds', 0.0)
+            logger.info(f"Recognition cache hit for {audio_path} ({mode})")
+            return entry['result']
+
+        with self._lock:
+            self.misses += 1
+        started = time.monotonic()
+        result = recognize()
+        elapsed = time.monotonic() - started
+
+        if result is not None:
+            try:
+                self.put(key, result, elapsed)
+            except OSError as e:
+                logger.warning(f"Could not write recognition cache entry: {e}")
+        return result
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and the recognition time saved by hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'saved_seconds': round(self.saved_seconds, 3),
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# Global recognition cache instance
+recognition_cache = RecognitionCache()
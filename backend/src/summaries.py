@@ -0,0 +1,451 @@
+"""
+Meeting summaries.
+
+A summary is generated once per stitched transcript in the background and
+stored in the ``meeting_summary`` table, keyed by the SHA-256 of the
+conversation text, the prompt version and the model. The summary endpoint
+serves a stored summary immediately and otherwise reports ``pending``
+while it is generated.
+
+Generation starts when the last participant's transcript of a meeting is
+finished, or on the first request for a meeting without a summary.
+
+Conversations longer than ``SUMMARY_WINDOW_TOKENS`` are summarized
+map-reduce style: speaker turns are packed into windows of at most that
+many tokens, the windows are summarized concurrently, and the window
+summaries are combined (in several rounds if they are still too long).
+Window summaries are stored in ``summary_window`` by the hash of the
+window's text, so when a transcript grows only the changed tail windows
+and the final combination are regenerated.
+
+The model is picked with ``SUMMARY_MODEL``:
+    gemini - Google Gemini (needs GEMINI_API_KEY; model from GEMINI_MODEL)
+    stub   - deterministic offline stand-in for development and tests
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from src.database import get_db
+from src.models import MeetingSummary, SummaryWindow, TranscriptionJob, ConversionJob
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = os.getenv('SUMMARY_MODEL', 'gemini')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+# Summaries generated at once
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '1'))
+# Longest conversation summarized in one request; longer ones are split into windows of this size
+SUMMARY_WINDOW_TOKENS = int(os.getenv('SUMMARY_WINDOW_TOKENS', '6000'))
+# Window summaries generated at once
+SUMMARY_MAP_WORKERS = int(os.getenv('SUMMARY_MAP_WORKERS', '4'))
+# Pending summaries older than this are assumed lost (e.g. the worker restarted) and regenerated
+SUMMARY_PENDING_TIMEOUT = int(os.getenv('SUMMARY_PENDING_TIMEOUT', '600'))
+# Delay of each stub summary, to imitate model latency
+STUB_SUMMARY_LATENCY = float(os.getenv('STUB_SUMMARY_LATENCY', '0'))
+
+# Token counts are estimated from text length; no tokenizer call is needed
+CHARS_PER_TOKEN = 4
+
+# Bump when any prompt below changes so existing summaries are regenerated
+PROMPT_VERSION = 1
+SUMMARY_PROMPT = """Please provide a concise summary of the following conversation between tutoring session participants.
+Focus on the main topics discussed, key points made, and any important takeaways or action items.
+
+Conversation:
+{conversation}
+
+Summary:"""
+WINDOW_PROMPT = """Please summarize the following excerpt of a conversation between tutoring session participants.
+List the topics discussed, key points made, and any takeaways or action items, in the order they came up.
+
+Conversation:
+{conversation}
+
+Summary:"""
+REDUCE_PROMPT = """The following are summaries of consecutive parts of a conversation between tutoring session participants.
+Combine them into one concise summary of the whole conversation.
+Focus on the main topics discussed, key points made, and any important takeaways or action items.
+
+Partial summaries:
+{summaries}
+
+Summary:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def conversation_text(stitched: Dict) -> str:
+    """Format stitched sentences as 'Speaker <id>: <text>' lines."""
+    return "\n".join(f"Speaker {s['participant_id']}: {s['text']}" for s in stitched.get('sentences', []))
+
+
+def split_windows(sentences: List[Dict], max_tokens: int = SUMMARY_WINDOW_TOKENS) -> List[str]:
+    """
+    Pack speaker turns into conversation windows of at most ``max_tokens``.
+
+    Windows end on turn boundaries; only a single turn longer than a window
+    is cut, at word boundaries. Packing is greedy from the start, so adding
+    turns at the end of a conversation leaves the earlier windows unchanged.
+
+    Args:
+        sentences: Stitched sentences ({'participant_id', 'text'})
+        max_tokens: Token budget per window
+
+    Returns:
+        Window texts of 'Speaker <id>: <text>' lines
+    """
+    lines = []
+    for sentence in sentences:
+        prefix = f"Speaker {sentence['participant_id']}: "
+        line = prefix + sentence['text']
+        if estimate_tokens(line) <= max_tokens:
+            lines.append(line)
+            continue
+        piece = prefix
+        for word in sentence['text'].split():
+            if piece != prefix and estimate_tokens(f"{piece} {word}") > max_tokens:
+                lines.append(piece)
+                piece = prefix
+            piece = f"{piece}{word}" if piece == prefix else f"{piece} {word}"
+        lines.append(piece)
+
+    windows = []
+    current = []
+    tokens = 0
+    for line in lines:
+        line_tokens = estimate_tokens(line) + 1  # + newline
+        if current and tokens + line_tokens > max_tokens:
+            windows.append("\n".join(current))
+            current, tokens = [], 0
+        current.append(line)
+        tokens += line_tokens
+    if current:
+        windows.append("\n".join(current))
+    return windows
+
+
+def _new_stage() -> Dict:
+    return {'calls': 0, 'input_tokens': 0, 'output_tokens': 0, 'seconds': 0.0}
+
+
+class SummaryModel(ABC):
+    """
+    Base class for summary models.
+    """
+
+    name = 'base'
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        """Generate the summary text for a prompt."""
+
+
+class GeminiSummaryModel(SummaryModel):
+    """
+    Google Gemini. Imported and configured on first use.
+    """
+
+    def __init__(self, model_name: str = GEMINI_MODEL):
+        self.model_name = model_name
+        self.name = f"gemini:{model_name}"
+        self._model = None
+
+    def available(self) -> bool:
+        return bool(os.environ.get('GEMINI_API_KEY'))
+
+    def generate(self, prompt: str) -> str:
+        if self._model is None:
+            api_key = os.environ.get('GEMINI_API_KEY')
+            if not api_key:
+                raise ValueError('GEMINI_API_KEY not configured')
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model.generate_content(prompt).text
+
+
+class StubSummaryModel(SummaryModel):
+    """
+    Deterministic summary built from the conversation itself, with no network access.
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency: float = STUB_SUMMARY_LATENCY):
+        self.latency = latency
+        self.requests = 0
+
+    def generate(self, prompt: str) -> str:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        # The text to summarize sits between the 'Conversation:' or 'Partial summaries:' line and 'Summary:'
+        body = prompt.split(':\n', 1)[-1].rsplit('\n\nSummary:', 1)[0]
+        lines = [line for line in body.splitlines() if line.strip()]
+        words = sum(len(line.split()) for line in lines)
+        first = lines[0][:80] if lines else ''
+        return f"{len(lines)} lines, {words} words. First: {first}"
+
+
+MODELS = {
+    'gemini': GeminiSummaryModel,
+    'stub': StubSummaryModel,
+}
+
+
+def create_summary_model(name: str = SUMMARY_MODEL) -> SummaryModel:
+    """Create the summary model selected by SUMMARY_MODEL."""
+    if name not in MODELS:
+        raise ValueError(f"Unknown summary model '{name}'. Choose one of: {', '.join(MODELS)}")
+    return MODELS[name]()
+
+
+def _summary_to_dict(summary: MeetingSummary) -> Dict:
+    return {
+        'meeting_id': summary.meeting_id,
+        'status': summary.status,
+        'summary': summary.summary,
+        'model': summary.model,
+        'prompt_version': summary.prompt_version,
+        'error': summary.error,
+        'generation_seconds': summary.generation_seconds,
+        'stats': summary.stats,
+        'generated_at': summary.updated_at.isoformat() if summary.status == 'ready' and summary.updated_at else None,
+    }
+
+
+class SummaryService:
+    """
+    Generates meeting summaries in the background and stores them.
+    """
+
+    def __init__(self, model: Optional[SummaryModel] = None, max_workers: int = SUMMARY_WORKERS,
+                 map_workers: int = SUMMARY_MAP_WORKERS, window_tokens: int = SUMMARY_WINDOW_TOKENS):
+        self.model = model or create_summary_model()
+        self.window_tokens = window_tokens
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary')
+        # Bounds model calls for windows across all summaries being generated
+        self._map_executor = ThreadPoolExecutor(max_workers=map_workers, thread_name_prefix='summary-window')
+        self._stats_lock = threading.Lock()
+
+    def request(self, meeting_id: str, stitched: Dict) -> Dict:
+        """
+        Get the stored summary of a stitched transcript, starting generation if there is none.
+        Failed and abandoned pending summaries are retried.
+
+        Args:
+            meeting_id: The meeting ID
+            stitched: Stitched transcript (src.stitching)
+
+        Returns:
+            Summary state: status is 'pending', 'ready' or 'failed'
+        """
+        conversation = conversation_text(stitched)
+        transcript_hash = hashlib.sha256(conversation.encode('utf-8')).hexdigest()
+        key = {
+            'meeting_id': meeting_id,
+            'transcript_hash': transcript_hash,
+            'prompt_version': PROMPT_VERSION,
+            'model': self.model.name,
+        }
+
+        with get_db() as db:
+            summary = db.query(MeetingSummary).filter_by(**key).first()
+            if summary and (summary.status == 'ready' or (summary.status == 'pending' and not self._abandoned(summary))):
+                return _summary_to_dict(summary)
+            if summary:
+                summary.status = 'pending'
+                summary.error = None
+                summary.updated_at = datetime.utcnow()
+            else:
+                summary = MeetingSummary(status='pending', **key)
+                db.add(summary)
+            try:
+                db.flush()
+            except IntegrityError:
+                # Another worker started the same summary
+                db.rollback()
+                return _summary_to_dict(db.query(MeetingSummary).filter_by(**key).first())
+            summaryid = summary.summaryid
+            state = _summary_to_dict(summary)
+
+        logger.info(f"Generating summary {summaryid} for meeting {meeting_id} with {self.model.name}")
+        self._executor.submit(self._generate, summaryid, meeting_id, stitched.get('sentences', []))
+        return state
+
+    def _abandoned(self, summary: MeetingSummary) -> bool:
+        return datetime.utcnow() - summary.updated_at > timedelta(seconds=SUMMARY_PENDING_TIMEOUT)
+
+    def _call(self, prompt: str, stage: Dict) -> str:
+        """Run one model call and add its tokens to the stage's stats."""
+        text = self.model.generate(prompt)
+        with self._stats_lock:
+            stage['calls'] += 1
+            stage['input_tokens'] += estimate_tokens(prompt)
+            stage['output_tokens'] += estimate_tokens(text)
+        return text
+
+    def summarize(self, meeting_id: str, sentences: List[Dict]):
+        """
+        Summarize a stitched conversation, map-reduce style if it exceeds one window.
+
+        Args:
+            meeting_id: The meeting ID
+            sentences: Stitched sentences
+
+        Returns:
+            (summary text, stats with calls, estimated tokens and seconds per stage)
+        """
+        windows = split_windows(sentences, self.window_tokens)
+        stats = {'windows': len(windows), 'window_tokens': self.window_tokens, 'stages': {}}
+
+        if len(windows) <= 1:
+            stage = stats['stages']['summarize'] = _new_stage()
+            started = time.monotonic()
+            text = self._call(SUMMARY_PROMPT.format(conversation=windows[0] if windows else ''), stage)
+            stage['seconds'] = round(time.monotonic() - started, 3)
+            return text, stats
+
+        stage = stats['stages']['map'] = _new_stage()
+        started = time.monotonic()
+        partials = self._summarize_windows(meeting_id, windows, stage)
+        stage['seconds'] = round(time.monotonic() - started, 3)
+
+        stage = stats['stages']['reduce'] = _new_stage()
+        started = time.monotonic()
+        text = self._reduce(partials, stage)
+        stage['seconds'] = round(time.monotonic() - started, 3)
+        return text, stats
+
+    def _summarize_windows(self, meeting_id: str, windows: List[str], stage: Dict) -> List[str]:
+        """Summarize each window concurrently, reusing stored summaries of unchanged windows."""
+        hashes = [hashlib.sha256(window.encode('utf-8')).hexdigest() for window in windows]
+        with get_db() as db:
+            stored = db.query(SummaryWindow.window_hash, SummaryWindow.summary).filter(
+                SummaryWindow.window_hash.in_(set(hashes)),
+                SummaryWindow.prompt_version == PROMPT_VERSION,
+                SummaryWindow.model == self.model.name
+            ).all()
+        summaries = dict(stored)
+
+        missing = [i for i, window_hash in enumerate(hashes) if window_hash not in summaries]
+        stage['reused'] = len(windows) - len(missing)
+
+        def summarize_window(i: int) -> str:
+            prompt = WINDOW_PROMPT.format(conversation=windows[i])
+            text = self._call(prompt, stage)
+            try:
+                with get_db() as db:
+                    db.add(SummaryWindow(
+                        meeting_id=meeting_id,
+                        window_hash=hashes[i],
+                        prompt_version=PROMPT_VERSION,
+                        model=self.model.name,
+                        summary=text,
+                        input_tokens=estimate_tokens(prompt),
+                        output_tokens=estimate_tokens(text)
+                    ))
+            except IntegrityError:
+                pass  # Stored concurrently by another summary of the same text
+            return text
+
+        for i, text in zip(missing, self._map_executor.map(summarize_window, missing)):
+            summaries[hashes[i]] = text
+        return [summaries[window_hash] for window_hash in hashes]
+
+    def _reduce(self, partials: List[str], stage: Dict) -> str:
+        """Combine window summaries, in several rounds while they exceed one window."""
+        stage['levels'] = 1
+        while True:
+            joined = "\n\n".join(partials)
+            groups = self._group(partials)
+            if estimate_tokens(joined) <= self.window_tokens or len(groups) == len(partials):
+                return self._call(REDUCE_PROMPT.format(summaries=joined), stage)
+            partials = list(self._map_executor.map(
+                lambda group: self._call(REDUCE_PROMPT.format(summaries="\n\n".join(group)), stage), groups
+            ))
+            stage['levels'] += 1
+
+    def _group(self, partials: List[str]) -> List[List[str]]:
+        """Pack consecutive summaries into groups that fit one window."""
+        groups = []
+        tokens = 0
+        for partial in partials:
+            partial_tokens = estimate_tokens(partial) + 1
+            if groups and tokens + partial_tokens <= self.window_tokens:
+                groups[-1].append(partial)
+                tokens += partial_tokens
+            else:
+                groups.append([partial])
+                tokens = partial_tokens
+        return groups
+
+    def _generate(self, summaryid: int, meeting_id: str, sentences: List[Dict]):
+        started = time.monotonic()
+        stats = None
+        try:
+            text, stats = self.summarize(meeting_id, sentences)
+            status, error = 'ready', None
+        except Exception as e:
+            logger.error(f"Error generating summary {summaryid}: {e}", exc_info=True)
+            text, status, error = None, 'failed', str(e)
+
+        with get_db() as db:
+            summary = db.query(MeetingSummary).filter(MeetingSummary.summaryid == summaryid).first()
+            if summary:
+                summary.status = status
+                summary.summary = text
+                summary.error = error
+                summary.generation_seconds = time.monotonic() - started
+                summary.stats = stats
+
+    def transcription_in_progress(self, meeting_id: str) -> bool:
+        """Whether any participant of the meeting still has a transcript on the way."""
+        from src.live_transcription import live_transcriber
+        from src.live_ingest import live_ingest
+
+        if any(key[0] == meeting_id for key in list(live_transcriber.streams)):
+            return True
+        if any(key[0] == meeting_id for key in list(live_ingest.sessions)):
+            return True
+        with get_db() as db:
+            pending = db.query(TranscriptionJob).filter(
+                TranscriptionJob.meeting_id == meeting_id,
+                TranscriptionJob.status.in_(['queued', 'running'])
+            ).count()
+        with get_db() as db:
+            pending += db.query(ConversionJob).filter(
+                ConversionJob.meeting_id == meeting_id,
+                ConversionJob.status.in_(['queued', 'running']),
+                ConversionJob.transcribe.is_(True)
+            ).count()
+        return pending > 0
+
+    def transcript_finished(self, meeting_id: str, stitched: Optional[Dict]):
+        """Start the meeting's summary once its last transcript is finished."""
+        if not stitched or not stitched.get('total_words'):
+            return
+        if self.transcription_in_progress(meeting_id):
+            logger.info(f"Meeting {meeting_id} still has transcripts in progress; summary deferred")
+            return
+        self.request(meeting_id, stitched)
+
+
+# Global summary service instance
+summary_service = SummaryService()
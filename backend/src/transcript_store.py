@@ -0,0 +1,309 @@
+"""
+Columnar transcript files.
+
+A transcript JSON file stores one dict per word, so a long session is
+megabytes per participant and has to be parsed in full to read any of it.
+The columnar format stores the same data as numpy arrays in an uncompressed
+``.npz`` archive:
+
+    word_ids      int32    index of each word in the string table
+    start_ms      int32    word start time in milliseconds
+    end_ms        int32    word end time in milliseconds
+    confidence    float32  word confidence (NaN when the engine gave none)
+    vocab_bytes   uint8    UTF-8 bytes of every distinct word, concatenated
+    vocab_offsets int32    start of each distinct word in vocab_bytes (+ end)
+    language      str
+    transcript    str      only stored when it is not the words joined by spaces
+
+Archive members are stored uncompressed, so they are memory-mapped rather
+than read: slicing a time range only touches the pages it needs. Readers
+always return the transcript JSON shape, so the API is unchanged. Times are
+rounded to the millisecond.
+
+``TRANSCRIPT_FORMAT`` picks the format for new transcripts: ``npz``
+(default) or ``json``. numpy is optional; without it transcripts are
+written as JSON. To convert existing JSON transcripts, run from
+``backend/``:
+
+    python -m src.transcript_store
+"""
+
+import json
+import logging
+import math
+import os
+import struct
+import sys
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+from src.storage import TRANSCRIPT_SUFFIX, TRANSCRIPT_COLUMNAR_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+# Format of newly written transcripts: 'npz' or 'json'
+TRANSCRIPT_FORMAT = os.getenv('TRANSCRIPT_FORMAT', 'npz').lower()
+
+FORMAT_VERSION = 1
+
+# Size of a zip local file header before the file name and extra field
+_ZIP_LOCAL_HEADER_SIZE = 30
+
+
+def columnar_available() -> bool:
+    """Whether numpy is installed, so columnar transcripts can be read and written."""
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def transcript_suffix() -> str:
+    """File name ending for newly written transcripts."""
+    if TRANSCRIPT_FORMAT == 'npz':
+        if columnar_available():
+            return TRANSCRIPT_COLUMNAR_SUFFIX
+        logger.warning("numpy is not installed; writing JSON transcripts")
+    return TRANSCRIPT_SUFFIX
+
+
+def _words_text(words: List[Dict]) -> str:
+    return " ".join(w['word'] for w in words)
+
+
+def write_columnar(path: str, transcript_data: Dict):
+    """
+    Write a transcript result dictionary as a columnar ``.npz`` file.
+
+    Args:
+        path: Destination path
+        transcript_data: {'transcript', 'words', 'language'}
+    """
+    import numpy as np
+
+    # Readers binary-search the start times, so keep them in order
+    words = sorted(transcript_data.get('words', []), key=lambda w: w['start_time'])
+    vocab: Dict[str, int] = {}
+    word_ids = np.empty(len(words), dtype=np.int32)
+    for i, word in enumerate(words):
+        word_ids[i] = vocab.setdefault(word['word'], len(vocab))
+
+    encoded = [text.encode('utf-8') for text in vocab]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    columns = {
+        'format_version': np.array(FORMAT_VERSION, dtype=np.int32),
+        'word_ids': word_ids,
+        'start_ms': np.array([round(w['start_time'] * 1000) for w in words], dtype=np.int32),
+        'end_ms': np.array([round(w['end_time'] * 1000) for w in words], dtype=np.int32),
+        'confidence': np.array([w['confidence'] if w.get('confidence') is not None else math.nan
+                                for w in words], dtype=np.float32),
+        'vocab_bytes': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        'vocab_offsets': offsets,
+        'language': np.array(transcript_data.get('language', 'en-US')),
+    }
+    transcript = transcript_data.get('transcript', '')
+    if transcript != _words_text(words):
+        columns['transcript'] = np.array(transcript)
+
+    temp_path = path + '.part'
+    with open(temp_path, 'wb') as f:
+        np.savez(f, **columns)
+    os.replace(temp_path, path)
+
+
+def _open_columns(path: str) -> Dict:
+    """
+    Map the arrays of a columnar transcript without reading them.
+
+    Returns:
+        Array name -> array (memory-mapped for non-empty stored members)
+    """
+    import numpy as np
+    from numpy.lib import format as npy_format
+
+    columns = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                # Written by another tool with compression; fall back to reading it
+                with archive.open(info) as member:
+                    columns[name] = npy_format.read_array(member)
+                continue
+
+            f.seek(info.header_offset)
+            header = f.read(_ZIP_LOCAL_HEADER_SIZE)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            f.seek(info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_length + extra_length)
+
+            version = npy_format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = npy_format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = npy_format.read_array_header_2_0(f)
+
+            if not shape or 0 in shape:
+                columns[name] = np.fromfile(f, dtype=dtype, count=1 if not shape else 0).reshape(shape)
+            else:
+                columns[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                          order='F' if fortran_order else 'C')
+    return columns
+
+
+def read_columnar(path: str, start: Optional[float] = None, end: Optional[float] = None) -> Dict:
+    """
+    Read a columnar transcript, optionally only the words starting in [start, end).
+
+    Args:
+        path: Path to the ``.npz`` file
+        start: Range start in seconds, or None for the beginning
+        end: Range end in seconds, or None for the end
+
+    Returns:
+        Transcript dictionary in the JSON shape
+    """
+    import numpy as np
+
+    columns = _open_columns(path)
+    start_ms = columns['start_ms']
+
+    # Words are stored in start time order, so the range is two binary searches
+    lo = int(np.searchsorted(start_ms, round(start * 1000), 'left')) if start is not None else 0
+    hi = int(np.searchsorted(start_ms, round(end * 1000), 'left')) if end is not None else len(start_ms)
+    hi = max(lo, hi)
+
+    word_ids = np.asarray(columns['word_ids'][lo:hi])
+    starts = np.asarray(start_ms[lo:hi])
+    ends = np.asarray(columns['end_ms'][lo:hi])
+    confidences = np.asarray(columns['confidence'][lo:hi])
+
+    # Decode only the distinct words in the range
+    vocab_bytes = columns['vocab_bytes']
+    offsets = columns['vocab_offsets']
+    texts = {}
+    for word_id in np.unique(word_ids).tolist():
+        texts[word_id] = bytes(vocab_bytes[offsets[word_id]:offsets[word_id + 1]]).decode('utf-8')
+
+    words = []
+    for word_id, start_time, end_time, confidence in zip(word_ids.tolist(), starts.tolist(),
+                                                         ends.tolist(), confidences.tolist()):
+        words.append({
+            'word': texts[word_id],
+            'start_time': start_time / 1000,
+            'end_time': end_time / 1000,
+            'confidence': None if math.isnan(confidence) else round(confidence, 4),
+        })
+
+    whole = start is None and end is None
+    if whole and 'transcript' in columns:
+        transcript = str(columns['transcript'])
+    else:
+        transcript = _words_text(words)
+
+    return {
+        'transcript': transcript,
+        'words': words,
+        'language': str(columns['language']),
+    }
+
+
+def read_word_columns(path: str) -> Tuple[List[str], List[float]]:
+    """
+    Read only the word texts and start times of a transcript, in time order.
+
+    Returns:
+        (words, start times in seconds)
+    """
+    if not path.endswith(TRANSCRIPT_COLUMNAR_SUFFIX):
+        words = sorted(read_json(path).get('words', []), key=lambda w: w.get('start_time', 0))
+        return [w.get('word', '') for w in words], [w.get('start_time', 0) for w in words]
+
+    columns = _open_columns(path)
+    vocab_bytes = bytes(columns['vocab_bytes'])
+    offsets = columns['vocab_offsets'].tolist()
+    vocab = [vocab_bytes[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+    return [vocab[i] for i in columns['word_ids'].tolist()], (columns['start_ms'] / 1000).tolist()
+
+
+def write_json(path: str, transcript_data: Dict):
+    """Write a transcript result dictionary as JSON."""
+    temp_path = path + '.part'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(transcript_data, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def read_json(path: str, start: Optional[float] = None, end: Optional[float] = None) -> Dict:
+    """Read a JSON transcript, optionally only the words starting in [start, end)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        transcript_data = json.load(f)
+    if start is None and end is None:
+        return transcript_data
+
+    words = [w for w in transcript_data.get('words', [])
+             if (start is None or w['start_time'] >= start) and (end is None or w['start_time'] < end)]
+    return {
+        'transcript': _words_text(words),
+        'words': words,
+        'language': transcript_data.get('language', 'en-US'),
+    }
+
+
+def write_transcript(path: str, transcript_data: Dict):
+    """Write a transcript in the format given by the path's ending."""
+    if path.endswith(TRANSCRIPT_COLUMNAR_SUFFIX):
+        write_columnar(path, transcript_data)
+    else:
+        write_json(path, transcript_data)
+
+
+def read_transcript(path: str, start: Optional[float] = None, end: Optional[float] = None) -> Dict:
+    """
+    Read a transcript file of either format into the JSON shape.
+
+    Args:
+        path: Path to a ``_transcript.npz`` or ``_transcript.json`` file
+        start: Only include words starting at or after this time (seconds)
+        end: Only include words starting before this time (seconds)
+    """
+    if path.endswith(TRANSCRIPT_COLUMNAR_SUFFIX):
+        return read_columnar(path, start, end)
+    return read_json(path, start, end)
+
+
+def convert_json_transcripts() -> Dict[str, int]:
+    """
+    Rewrite existing JSON transcripts as columnar files.
+
+    Returns:
+        Number of files converted and bytes before and after
+    """
+    from src.storage import storage, TRANSCRIPTS
+
+    stats = {'converted': 0, 'json_bytes': 0, 'npz_bytes': 0}
+    for json_path, _ in list(storage.iter_files(TRANSCRIPTS, (TRANSCRIPT_SUFFIX,))):
+        npz_path = json_path[:-len(TRANSCRIPT_SUFFIX)] + TRANSCRIPT_COLUMNAR_SUFFIX
+        try:
+            if not storage.ensure_local(json_path):
+                continue
+            write_columnar(npz_path, read_json(json_path))
+            storage.publish(npz_path, keep_local=True)
+            stats['json_bytes'] += os.path.getsize(json_path)
+            stats['npz_bytes'] += os.path.getsize(npz_path)
+            storage.remove(json_path)
+            stats['converted'] += 1
+        except Exception as e:
+            logger.error(f"Failed to convert {json_path}: {e}")
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if not columnar_available():
+        print("numpy is required: pip install numpy")
+        sys.exit(1)
+    print(json.dumps(convert_json_transcripts(), indent=2))
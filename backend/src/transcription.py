@@ -1,82 +1,80 @@
 """
-Audio transcription service using Google Cloud Speech-to-Text API.
-Extracts audio from video files and transcribes them.
+Audio transcription service.
+Extracts audio from video files and transcribes them with the speech engine
+selected by STT_ENGINE (see src.speech_engines).
 """
 
 import os
 import logging
 import subprocess
-import json
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List
-from google.cloud import speech_v1p1beta1 as speech
-from google.cloud import storage
+from typing import Optional, Dict, List, Tuple
+from src.conversion import probe_media, speech_audio_args
+from src.audio_chunking import chunk_audio, CHUNK_MAX_SECONDS
+from src.speech_engines import SpeechEngine, create_engine
+from src.stt_cache import RecognitionCache, recognition_cache
+from src.storage import (storage as file_storage, parse_recording_filename, AUDIO, TRANSCRIPTS,
+                         TRANSCRIPT_SUFFIX, TRANSCRIPT_COLUMNAR_SUFFIX)
+from src.transcript_store import read_transcript, write_transcript, transcript_suffix
+from src.response_cache import response_cache
 
 logger = logging.getLogger(__name__)
 
-# Directory to store audio files and transcriptions
-AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'audio')
-TRANSCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'transcripts')
-os.makedirs(AUDIO_DIR, exist_ok=True)
-os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+# Directory to store audio files and transcriptions (sharded by meeting/participant)
+AUDIO_DIR = file_storage.kind_dir(AUDIO)
+TRANSCRIPTS_DIR = file_storage.kind_dir(TRANSCRIPTS)
+
+# Transcribe long recordings as parallel silence-split chunks instead of one long-running request
+TRANSCRIPTION_CHUNKING = os.getenv('TRANSCRIPTION_CHUNKING', 'true').lower() == 'true'
+TRANSCRIPTION_CHUNK_WORKERS = int(os.getenv('TRANSCRIPTION_CHUNK_WORKERS', '4'))
 
 
 class TranscriptionService:
     """
-    Service for extracting audio from videos and transcribing with Google Cloud Speech-to-Text.
+    Service for extracting audio from videos and transcribing them.
     """
     
-    def __init__(self):
-        """Initialize the transcription service."""
-        self.client: Optional[speech.SpeechClient] = None
-        self._init_client()
+    def __init__(self, engine: Optional[SpeechEngine] = None, cache: Optional[RecognitionCache] = None):
+        """Initialize the transcription service with the configured speech engine."""
+        self.engine = engine or create_engine()
+        self.cache = cache or recognition_cache
+        self._transcript_lock = threading.Lock()
+        # (meeting_id, participant_id) -> session whose words the transcript file holds
+        self._append_sessions: Dict[Tuple[str, str], str] = {}
     
-    def _init_client(self):
-        """Initialize Google Cloud Speech client."""
-        try:
-            # Check if credentials are set
-            if 'GOOGLE_APPLICATION_CREDENTIALS' in os.environ:
-                self.client = speech.SpeechClient()
-                logger.info("Google Cloud Speech client initialized successfully")
-            else:
-                logger.warning("GOOGLE_APPLICATION_CREDENTIALS not set. Transcription will be disabled.")
-        except Exception as e:
-            logger.error(f"Error initializing Google Cloud Speech client: {e}", exc_info=True)
-            self.client = None
+    def audio_path_for(self, video_path: str) -> str:
+        """Get the path of the speech audio track extracted from a video."""
+        stem = Path(video_path).stem
+        parsed = parse_recording_filename(stem)
+        return file_storage.audio_path(parsed['meeting_id'], parsed['participant_id'], f"{stem}.flac")
     
-    def extract_audio(self, video_path: str) -> Optional[str]:
+    def extract_audio(self, video_path: str, audio_path: Optional[str] = None) -> Optional[str]:
         """
-        Extract audio from video file as MP3.
+        Extract audio from video file as 16 kHz mono FLAC.
         
         Args:
             video_path: Path to the video file
+            audio_path: Output path (default: the recording's path in the audio directory)
             
         Returns:
             Path to the extracted audio file, or None if extraction failed
         """
         try:
             # Generate output path
-            video_name = Path(video_path).stem
-            audio_path = os.path.join(AUDIO_DIR, f"{video_name}.mp3")
+            audio_path = audio_path or self.audio_path_for(video_path)
             
-            # Check if video file exists
-            if not os.path.exists(video_path):
+            # Check if video file exists (fetching it back from object storage if needed)
+            if not file_storage.ensure_local(video_path):
                 logger.error(f"Video file not found: {video_path}")
                 return None
             
             # Extract audio using ffmpeg
             # Convert to mono, 16kHz sample rate (optimal for speech recognition)
-            command = [
-                'ffmpeg',
-                '-i', video_path,
-                '-vn',  # No video
-                '-acodec', 'libmp3lame',
-                '-ac', '1',  # Mono
-                '-ar', '16000',  # 16kHz sample rate
-                '-ab', '64k',  # 64kbps bitrate
-                '-y',  # Overwrite output file
-                audio_path
-            ]
+            command = ['ffmpeg', '-i', video_path] + speech_audio_args() + ['-y', audio_path]
             
             logger.info(f"Extracting audio from {video_path} to {audio_path}")
             result = subprocess.run(
@@ -102,8 +100,7 @@ class TranscriptionService:
     
     def transcribe_audio_local(self, audio_path: str, language_code: str = "en-US") -> Optional[Dict]:
         """
-        Transcribe audio file using Google Cloud Speech-to-Text (local file).
-        For files under 60 seconds.
+        Transcribe a short audio file (under the engine's synchronous limit).
         
         Args:
             audio_path: Path to the audio file
@@ -112,64 +109,18 @@ class TranscriptionService:
         Returns:
             Transcription result dictionary or None if transcription failed
         """
-        if not self.client:
-            logger.error("Google Cloud Speech client not initialized")
-            return None
-        
-        try:
-            # Read audio file
-            with open(audio_path, 'rb') as audio_file:
-                content = audio_file.read()
-            
-            audio = speech.RecognitionAudio(content=content)
-            
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.MP3,
-                sample_rate_hertz=16000,
-                language_code=language_code,
-                enable_automatic_punctuation=True,
-                enable_word_time_offsets=True,
-                model='video',  # Optimized for video
-            )
-            
-            logger.info(f"Transcribing audio file: {audio_path}")
-            response = self.client.recognize(config=config, audio=audio)
-            
-            # Process results
-            transcript_text = ""
-            words = []
-            
-            for result in response.results:
-                alternative = result.alternatives[0]
-                transcript_text += alternative.transcript + " "
-                
-                # Extract word-level timestamps
-                for word_info in alternative.words:
-                    words.append({
-                        'word': word_info.word,
-                        'start_time': word_info.start_time.total_seconds(),
-                        'end_time': word_info.end_time.total_seconds(),
-                        'confidence': alternative.confidence
-                    })
-            
-            result_dict = {
-                'transcript': transcript_text.strip(),
-                'words': words,
-                'language': language_code
-            }
-            
-            logger.info(f"Transcription completed: {len(transcript_text)} characters")
-            return result_dict
-            
-        except Exception as e:
-            logger.error(f"Error transcribing audio {audio_path}: {e}", exc_info=True)
-            return None
+        result = self.cache.recognize(
+            audio_path, self.engine.cache_key(), language_code, 'sync',
+            lambda: self.engine.transcribe(audio_path, language_code=language_code)
+        )
+        if result:
+            logger.info(f"Transcription completed: {len(result['transcript'])} characters")
+        return result
     
     def transcribe_audio_long(self, audio_path: str, gcs_uri: Optional[str] = None, 
                             language_code: str = "en-US") -> Optional[Dict]:
         """
-        Transcribe long audio file using Google Cloud Speech-to-Text (async).
-        For files over 60 seconds, requires Google Cloud Storage.
+        Transcribe a long audio file in one request.
         
         Args:
             audio_path: Path to the audio file
@@ -179,67 +130,73 @@ class TranscriptionService:
         Returns:
             Transcription result dictionary or None if transcription failed
         """
-        if not self.client:
-            logger.error("Google Cloud Speech client not initialized")
-            return None
+        result = self.cache.recognize(
+            audio_path, self.engine.cache_key(), language_code, 'long',
+            lambda: self.engine.transcribe_long(audio_path, language_code=language_code, gcs_uri=gcs_uri)
+        )
+        if result:
+            logger.info(f"Long transcription completed: {len(result['transcript'])} characters")
+        return result
+    
+    def transcribe_audio_chunked(self, audio_path: str, duration: float,
+                                 language_code: str = "en-US") -> Optional[Dict]:
+        """
+        Transcribe long audio as silence-split chunks recognized in parallel.
+        Each chunk stays under the synchronous recognize limit; word times are
+        shifted by the chunk offset and merged back in order.
         
+        Args:
+            audio_path: Path to the audio file
+            duration: Audio length in seconds
+            language_code: Language code
+            
+        Returns:
+            Transcription result dictionary or None if any chunk failed
+        """
+        return self.cache.recognize(
+            audio_path, self.engine.cache_key(), language_code, 'chunked',
+            lambda: self._transcribe_chunks(audio_path, duration, language_code)
+        )
+    
+    def _transcribe_chunks(self, audio_path: str, duration: float, language_code: str) -> Optional[Dict]:
+        chunk_dir = tempfile.mkdtemp(prefix='chunks_', dir=os.path.dirname(audio_path))
         try:
-            # If no GCS URI provided, use local file (will fail for files > 10MB)
-            if gcs_uri:
-                audio = speech.RecognitionAudio(uri=gcs_uri)
-            else:
-                with open(audio_path, 'rb') as audio_file:
-                    content = audio_file.read()
-                audio = speech.RecognitionAudio(content=content)
-            
-            config = speech.RecognitionConfig(
-                encoding=speech.RecognitionConfig.AudioEncoding.MP3,
-                sample_rate_hertz=16000,
-                language_code=language_code,
-                enable_automatic_punctuation=True,
-                enable_word_time_offsets=True,
-                model='video',
-            )
+            chunks = chunk_audio(audio_path, duration, chunk_dir)
+            if not chunks:
+                return None
             
-            logger.info(f"Starting long audio transcription: {audio_path}")
-            operation = self.client.long_running_recognize(config=config, audio=audio)
+            workers = max(1, min(TRANSCRIPTION_CHUNK_WORKERS, len(chunks)))
+            logger.info(f"Transcribing {len(chunks)} chunks of {audio_path} with {workers} workers")
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcribe-chunk') as executor:
+                results = list(executor.map(
+                    lambda chunk: self.transcribe_audio_local(chunk[0], language_code=language_code),
+                    chunks
+                ))
             
-            logger.info("Waiting for transcription to complete...")
-            response = operation.result(timeout=600)  # 10 minute timeout
+            if any(result is None for result in results):
+                logger.error(f"{results.count(None)} of {len(chunks)} chunks failed for {audio_path}")
+                return None
             
-            # Process results
-            transcript_text = ""
             words = []
-            
-            for result in response.results:
-                alternative = result.alternatives[0]
-                transcript_text += alternative.transcript + " "
-                
-                for word_info in alternative.words:
-                    words.append({
-                        'word': word_info.word,
-                        'start_time': word_info.start_time.total_seconds(),
-                        'end_time': word_info.end_time.total_seconds(),
-                        'confidence': alternative.confidence
-                    })
-            
-            result_dict = {
-                'transcript': transcript_text.strip(),
+            for (_, offset), result in zip(chunks, results):
+                for word in result['words']:
+                    shifted = dict(word)
+                    shifted['start_time'] = word['start_time'] + offset
+                    shifted['end_time'] = word['end_time'] + offset
+                    words.append(shifted)
+            
+            return {
+                'transcript': " ".join(r['transcript'] for r in results if r['transcript']),
                 'words': words,
                 'language': language_code
             }
-            
-            logger.info(f"Long transcription completed: {len(transcript_text)} characters")
-            return result_dict
-            
-        except Exception as e:
-            logger.error(f"Error transcribing long audio {audio_path}: {e}", exc_info=True)
-            return None
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
     
     def save_transcript(self, meeting_id: str, participant_id: str, 
                        transcript_data: Dict) -> str:
         """
-        Save transcript to JSON file.
+        Save transcript in the configured format (columnar .npz or JSON).
         
         Args:
             meeting_id: Meeting ID
@@ -250,11 +207,22 @@ class TranscriptionService:
             Path to the saved transcript file
         """
         try:
-            filename = f"{meeting_id}_{participant_id}_transcript.json"
-            filepath = os.path.join(TRANSCRIPTS_DIR, filename)
+            suffix = transcript_suffix()
+            filepath = file_storage.transcript_path(meeting_id, participant_id, suffix=suffix)
+            write_transcript(filepath, transcript_data)
+            
+            # Transcripts are small and re-read often, so keep the local copy
+            file_storage.publish(filepath, keep_local=True)
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(transcript_data, f, indent=2, ensure_ascii=False)
+            # Drop a copy in the other format so readers never see a stale one
+            for other in (TRANSCRIPT_SUFFIX, TRANSCRIPT_COLUMNAR_SUFFIX):
+                if other != suffix:
+                    stale = file_storage.transcript_path(meeting_id, participant_id, create=False, suffix=other)
+                    if os.path.exists(stale):
+                        file_storage.remove(stale)
+            
+            # Cached transcript API responses for the meeting are now out of date
+            response_cache.invalidate(meeting_id)
             
             logger.info(f"Transcript saved to {filepath}")
             return filepath
@@ -263,8 +231,107 @@ class TranscriptionService:
             logger.error(f"Error saving transcript: {e}", exc_info=True)
             return ""
     
+    def load_transcript(self, meeting_id: str, participant_id: str,
+                        start: Optional[float] = None, end: Optional[float] = None) -> Optional[Dict]:
+        """
+        Read a participant's transcript in the JSON shape, whatever format it is stored in.
+        
+        Args:
+            meeting_id: Meeting ID
+            participant_id: Participant ID
+            start: Only include words starting at or after this time (seconds)
+            end: Only include words starting before this time (seconds)
+            
+        Returns:
+            Transcript dictionary, or None if there is no transcript
+        """
+        filepath = self.get_transcript_path(meeting_id, participant_id)
+        if not os.path.exists(filepath):
+            return None
+        return read_transcript(filepath, start, end)
+    
+    def append_transcript(self, meeting_id: str, participant_id: str,
+                          transcript_data: Dict, offset_seconds: float, session_id: str) -> str:
+        """
+        Merge a segment's transcript into the participant's transcript file.
+        Word times are shifted by the segment offset and kept in time order,
+        so segments may finish transcribing in any order. The first segment of
+        a new session replaces the words of earlier sessions, whose times are
+        relative to a different recording.
+        
+        Args:
+            meeting_id: Meeting ID
+            participant_id: Participant ID
+            transcript_data: Transcription result for the segment
+            offset_seconds: Start of the segment within the recording
+            session_id: Live session the segment belongs to
+            
+        Returns:
+            Path to the saved transcript file
+        """
+        key = (meeting_id, participant_id)
+        with self._transcript_lock:
+            existing = None
+            if self._append_sessions.get(key) == session_id:
+                existing = self.load_transcript(meeting_id, participant_id)
+            self._append_sessions[key] = session_id
+            words = existing['words'] if existing else []
+            
+            for word in transcript_data.get('words', []):
+                shifted = dict(word)
+                shifted['start_time'] = word['start_time'] + offset_seconds
+                shifted['end_time'] = word['end_time'] + offset_seconds
+                words.append(shifted)
+            words.sort(key=lambda w: w['start_time'])
+            
+            return self.save_transcript(meeting_id, participant_id, {
+                'transcript': " ".join(w['word'] for w in words),
+                'words': words,
+                'language': transcript_data.get('language', 'en-US')
+            })
+    
+    def process_segment(self, segment_path: str, meeting_id: str, participant_id: str,
+                        offset_seconds: float, session_id: str, language_code: str = "en-US") -> Optional[str]:
+        """
+        Transcribe one closed live-recording segment and append it to the transcript.
+        Segments are kept under the ~60 s synchronous recognition limit.
+        
+        Args:
+            segment_path: Path to the segment file
+            meeting_id: Meeting ID
+            participant_id: Participant ID
+            offset_seconds: Start of the segment within the recording
+            session_id: Live session the segment belongs to
+            language_code: Language code for transcription
+            
+        Returns:
+            Path to the transcript file, or None if processing failed
+        """
+        # Segment names are not recording names, so extract next to the segment in its session directory
+        audio_path = os.path.splitext(segment_path)[0] + '.flac'
+        try:
+            if not self.extract_audio(segment_path, audio_path):
+                logger.error(f"Audio extraction failed for segment {segment_path}")
+                return None
+            
+            transcript_data = self.transcribe_audio_local(audio_path, language_code=language_code)
+            if not transcript_data:
+                logger.error(f"Transcription failed for segment {segment_path}")
+                return None
+            
+            return self.append_transcript(meeting_id, participant_id, transcript_data, offset_seconds, session_id)
+        except Exception as e:
+            logger.error(f"Error transcribing segment {segment_path}: {e}", exc_info=True)
+            return None
+        finally:
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+    
     def process_recording(self, video_path: str, meeting_id: str, 
-                         participant_id: str, language_code: str = "en-US") -> Optional[str]:
+                         participant_id: str, language_code: str = "en-US",
+                         audio_path: Optional[str] = None) -> Optional[str]:
         """
         Complete pipeline: extract audio, transcribe, and save.
         
@@ -273,6 +340,7 @@ class TranscriptionService:
             meeting_id: Meeting ID
             participant_id: Participant ID
             language_code: Language code for transcription
+            audio_path: Speech audio already produced during conversion, if any
             
         Returns:
             Path to the transcript file, or None if processing failed
@@ -280,17 +348,35 @@ class TranscriptionService:
         try:
             logger.info(f"Starting transcription pipeline for {video_path}")
             
-            # Step 1: Extract audio
-            audio_path = self.extract_audio(video_path)
+            # Step 1: Extract audio, unless conversion (or an earlier run) already wrote it
+            existing_audio = self.audio_path_for(video_path)
+            if audio_path and os.path.exists(audio_path):
+                logger.info(f"Using audio track from conversion: {audio_path}")
+            elif (os.path.exists(existing_audio) and os.path.exists(video_path)
+                  and os.path.getmtime(existing_audio) >= os.path.getmtime(video_path)):
+                logger.info(f"Reusing previously extracted audio: {existing_audio}")
+                audio_path = existing_audio
+            else:
+                audio_path = self.extract_audio(video_path)
             if not audio_path:
                 logger.error("Audio extraction failed")
                 return None
             
             # Step 2: Get audio duration to decide which method to use
+            probe = probe_media(audio_path)
+            duration = probe['duration'] if probe else None
             audio_size = os.path.getsize(audio_path)
             
-            # Use long_running_recognize for files > 10MB (roughly > 1 minute)
-            if audio_size > 10 * 1024 * 1024:
+            # Engines with a synchronous limit (Cloud Speech: about a minute) need
+            # chunking or a long-running request for longer audio
+            limit = self.engine.max_sync_seconds
+            if limit is None:
+                logger.info(f"Transcribing with the {self.engine.name} engine")
+                transcript_data = self.transcribe_audio_local(audio_path, language_code=language_code)
+            elif TRANSCRIPTION_CHUNKING and duration is not None and duration > min(limit, CHUNK_MAX_SECONDS):
+                logger.info("Using parallel chunked transcription for long file")
+                transcript_data = self.transcribe_audio_chunked(audio_path, duration, language_code=language_code)
+            elif (duration is not None and duration > limit) or (duration is None and audio_size > 10 * 1024 * 1024):
                 logger.info("Using long-running transcription for large file")
                 transcript_data = self.transcribe_audio_long(audio_path, language_code=language_code)
             else:
@@ -311,6 +397,34 @@ class TranscriptionService:
             logger.error(f"Error in transcription pipeline: {e}", exc_info=True)
             return None
     
+    def cache_stats(self) -> Dict:
+        """Recognition cache hit/miss counters."""
+        return self.cache.stats()
+    
+    def get_transcript_path(self, meeting_id: str, participant_id: str) -> str:
+        """
+        Get the transcript file path for a participant (the file may not exist yet).
+        A columnar transcript is preferred over a JSON one.
+        """
+        for suffix in (TRANSCRIPT_COLUMNAR_SUFFIX, TRANSCRIPT_SUFFIX):
+            filepath = file_storage.transcript_path(meeting_id, participant_id, create=False, suffix=suffix)
+            # Another node may have written it; pull it into the local cache
+            if file_storage.ensure_local(filepath):
+                return filepath
+        return file_storage.transcript_path(meeting_id, participant_id, create=False, suffix=transcript_suffix())
+    
+    def list_meeting_transcripts(self, meeting_id: str) -> List[str]:
+        """
+        List transcript file paths for one meeting (only reads that meeting's directory).
+        Each participant is listed once, preferring the columnar transcript.
+        """
+        by_participant = {}
+        files = file_storage.list_meeting_files(TRANSCRIPTS, meeting_id, (TRANSCRIPT_COLUMNAR_SUFFIX, TRANSCRIPT_SUFFIX))
+        for participant, path in files:
+            if participant not in by_participant or path.endswith(TRANSCRIPT_COLUMNAR_SUFFIX):
+                by_participant[participant] = path
+        return list(by_participant.values())
+    
     def get_transcripts_dir(self) -> str:
         """Get the directory where transcripts are stored."""
         return TRANSCRIPTS_DIR
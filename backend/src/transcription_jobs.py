@@ -0,0 +1,314 @@
+"""
+Managed background queue for recording transcription.
+
+Jobs are persisted in the ``transcription_job`` table and run by a fixed
+pool of ``TRANSCRIPTION_WORKERS`` threads, so an end-of-meeting burst of
+uploads queues up instead of starting one ffmpeg process and speech request
+per recording at once. Shorter recordings are transcribed first, and waiting
+jobs gain priority over time so long recordings are not starved. On shutdown
+the workers finish their current job; anything still queued stays in the
+table and is resumed on the next start.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from src.database import get_db
+from src.models import TranscriptionJob
+from src.conversion import probe_media
+from src.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of recordings transcribed at once
+TRANSCRIPTION_WORKERS = int(os.getenv('TRANSCRIPTION_WORKERS', '2'))
+# Attempts before a job is marked failed
+TRANSCRIPTION_MAX_ATTEMPTS = int(os.getenv('TRANSCRIPTION_MAX_ATTEMPTS', '2'))
+# Seconds shutdown waits for running jobs to finish
+TRANSCRIPTION_SHUTDOWN_TIMEOUT = int(os.getenv('TRANSCRIPTION_SHUTDOWN_TIMEOUT', '30'))
+
+# Seconds of recording duration a queued job gains for every second it waits
+TRANSCRIPTION_PRIORITY_AGING = float(os.getenv('TRANSCRIPTION_PRIORITY_AGING', '1.0'))
+
+# Priority of recordings whose duration cannot be probed (sorted after an hour of audio)
+UNKNOWN_DURATION_PRIORITY = 3600.0
+
+
+def _job_to_dict(job: TranscriptionJob) -> Dict:
+    return {
+        'job_id': job.jobid,
+        'status': job.status,
+        'meeting_id': job.meeting_id,
+        'participant_id': job.participant_id,
+        'duration': job.priority if job.priority != UNKNOWN_DURATION_PRIORITY else None,
+        'attempts': job.attempts,
+        'transcript_path': job.transcript_path,
+        'error': job.error,
+        'created': job.created_at.isoformat() if job.created_at else None,
+        'updated': job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+class TranscriptionJobQueue:
+    """
+    Runs transcription jobs shortest-first on a fixed number of worker threads.
+    """
+
+    def __init__(self, max_workers: int = TRANSCRIPTION_WORKERS, max_attempts: int = TRANSCRIPTION_MAX_ATTEMPTS,
+                 aging: float = TRANSCRIPTION_PRIORITY_AGING):
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.aging = aging
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = 0  # Keeps equal priorities in submission order
+        self._workers = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        # Metrics since start
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    def start(self):
+        """Start the workers and resume any jobs left over from a previous run."""
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping.clear()
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._work, daemon=True, name=f'transcription-worker-{i}')
+                worker.start()
+                self._workers.append(worker)
+        self._recover()
+
+    def _recover(self):
+        """Requeue jobs that were queued or interrupted mid-transcription."""
+        with get_db() as db:
+            pending = db.query(TranscriptionJob).filter(TranscriptionJob.status.in_(['queued', 'running'])).all()
+            resume = []
+            for job in pending:
+                if job.status == 'running' and job.attempts >= self.max_attempts:
+                    job.status = 'failed'
+                    job.error = job.error or 'Transcription interrupted too many times'
+                    continue
+                job.status = 'queued'
+                resume.append((job.priority, job.created_at, job.jobid))
+                storage.retain(job.video_path)
+
+        if resume:
+            logger.info(f"Resuming {len(resume)} transcription job(s) from previous run")
+        for priority, created_at, jobid in resume:
+            self._enqueue(priority, created_at, jobid)
+
+    def _enqueue(self, priority: float, created_at: datetime, jobid: str):
+        # Ordering by duration - aging * waited is the same at any moment as ordering by
+        # duration + aging * created, so a job's key never has to change while it waits
+        created = created_at.replace(tzinfo=timezone.utc).timestamp()
+        with self._lock:
+            self._sequence += 1
+            self._queue.put((priority + self.aging * created, self._sequence, time.monotonic(), jobid))
+
+    def submit(self, meeting_id: str, participant_id: str, video_path: str,
+               audio_path: Optional[str] = None) -> str:
+        """
+        Queue a finished recording for transcription.
+
+        Args:
+            meeting_id: The meeting ID
+            participant_id: The participant ID
+            video_path: Path to the MP4 recording
+            audio_path: Speech audio already extracted during conversion, if any
+
+        Returns:
+            The new job ID
+        """
+        probe = probe_media(audio_path or video_path)
+        duration = probe['duration'] if probe and probe['duration'] else UNKNOWN_DURATION_PRIORITY
+        jobid = uuid.uuid4().hex
+        created_at = datetime.utcnow()
+
+        with get_db() as db:
+            db.add(TranscriptionJob(
+                jobid=jobid,
+                meeting_id=meeting_id,
+                participant_id=participant_id,
+                video_path=video_path,
+                audio_path=audio_path,
+                priority=duration,
+                status='queued',
+                attempts=0,
+                created_at=created_at
+            ))
+
+        # Keep the recording on local disk until the job is done with it
+        storage.retain(video_path)
+        logger.info(f"Queued transcription job {jobid} for {video_path} (priority {duration:.0f})")
+        self._enqueue(duration, created_at, jobid)
+        return jobid
+
+    def get_job(self, jobid: str) -> Optional[Dict]:
+        """Get the current state of a job, or None if it does not exist."""
+        with get_db() as db:
+            job = db.query(TranscriptionJob).filter(TranscriptionJob.jobid == jobid).first()
+            return _job_to_dict(job) if job else None
+
+    def stats(self) -> Dict:
+        """Queue depth, concurrency and timing metrics since start."""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'workers': self.max_workers,
+                'queued': self._queue.qsize(),
+                'running': self._running,
+                'completed': self._completed,
+                'failed': self._failed,
+                'retried': self._retried,
+                'avg_wait_seconds': round(self._wait_seconds / finished, 3) if finished else None,
+                'avg_run_seconds': round(self._run_seconds / finished, 3) if finished else None,
+                'stopping': self._stopping.is_set(),
+            }
+
+    def _claim(self, jobid: str) -> Optional[TranscriptionJob]:
+        """Atomically move a queued job to running so it is only transcribed once."""
+        with get_db() as db:
+            claimed = db.query(TranscriptionJob).filter(
+                TranscriptionJob.jobid == jobid,
+                TranscriptionJob.status == 'queued'
+            ).update({
+                'status': 'running',
+                'attempts': TranscriptionJob.attempts + 1,
+                'updated_at': datetime.utcnow()
+            }, synchronize_session=False)
+            if not claimed:
+                return None
+            job = db.query(TranscriptionJob).filter(TranscriptionJob.jobid == jobid).first()
+            db.expunge(job)
+            return job
+
+    def _finish(self, jobid: str, status: str, error: Optional[str] = None, transcript_path: Optional[str] = None):
+        with get_db() as db:
+            job = db.query(TranscriptionJob).filter(TranscriptionJob.jobid == jobid).first()
+            if job:
+                job.status = status
+                job.error = error
+                job.transcript_path = transcript_path
+
+    def _work(self):
+        """Worker loop: take the shortest queued job until shutdown."""
+        while True:
+            _, _, queued_at, jobid = self._queue.get()
+            if jobid is None:
+                return
+            if self._stopping.is_set():
+                # Leave it queued in the database for the next start
+                continue
+
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += time.monotonic() - queued_at
+            started = time.monotonic()
+            outcome = self._run(jobid)
+            with self._lock:
+                self._running -= 1
+                if outcome is None:
+                    # Already claimed through another queue entry; not counted
+                    self._wait_seconds -= started - queued_at
+                    continue
+                # Time spent on retried attempts counts towards the job that finally finishes
+                self._run_seconds += time.monotonic() - started
+                if outcome == 'done':
+                    self._completed += 1
+                elif outcome == 'failed':
+                    self._failed += 1
+                else:
+                    self._retried += 1
+
+    def _run(self, jobid: str) -> Optional[str]:
+        """
+        Transcribe one job.
+
+        Returns:
+            'done', 'requeued' if the attempt failed and will be retried, 'failed' if
+            it will not, or None if the job was not queued
+        """
+        from src.transcription import transcription_service
+
+        job = None
+        try:
+            job = self._claim(jobid)
+            if not job:
+                return None
+
+            logger.info(f"Transcription job {jobid} attempt {job.attempts}/{self.max_attempts}: {job.video_path}")
+            transcript_path = transcription_service.process_recording(
+                job.video_path,
+                job.meeting_id,
+                job.participant_id,
+                audio_path=job.audio_path
+            )
+            if transcript_path:
+                self._finish(jobid, 'done', transcript_path=transcript_path)
+                logger.info(f"Transcription job {jobid} done: {transcript_path}")
+                storage.release(job.video_path)
+                self._transcript_finished(job.meeting_id)
+                return 'done'
+            error = 'Transcription failed'
+        except Exception as e:
+            logger.error(f"Error running transcription job {jobid}: {e}", exc_info=True)
+            error = str(e)
+
+        try:
+            # Exceptions and empty results share the same attempts
+            if job is not None and job.attempts < self.max_attempts and not self._stopping.is_set():
+                logger.warning(f"Transcription job {jobid} failed, retrying: {error}")
+                self._finish(jobid, 'queued', error)
+                self._enqueue(job.priority, job.created_at, jobid)
+                return 'requeued'
+            logger.error(f"Transcription job {jobid} failed permanently: {error}")
+            self._finish(jobid, 'failed', error)
+            if job is not None:
+                storage.release(job.video_path)
+        except Exception as e:
+            logger.error(f"Error recording failure of transcription job {jobid}: {e}", exc_info=True)
+        return 'failed'
+
+    def _transcript_finished(self, meeting_id: str):
+        """Refresh the meeting's stitched transcript (and summary) now that a participant's transcript is done."""
+        from src.stitching import transcript_finished
+        try:
+            transcript_finished(meeting_id)
+        except Exception as e:
+            logger.error(f"Failed to stitch meeting {meeting_id}: {e}", exc_info=True)
+
+    def shutdown(self, timeout: float = TRANSCRIPTION_SHUTDOWN_TIMEOUT):
+        """
+        Stop taking new work and wait for running jobs to finish.
+        Queued jobs stay in the database and are resumed on the next start.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+        if not workers:
+            return
+
+        self._stopping.set()
+        # Sentinels sort after every real job
+        for _ in workers:
+            self._queue.put((float('inf'), float('inf'), 0, None))
+
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(timeout=max(0, deadline - time.monotonic()))
+        logger.info(f"Transcription queue stopped, {self._queue.qsize()} job(s) left queued")
+
+
+# Global transcription queue instance
+transcription_queue = TranscriptionJobQueue()
@@ -0,0 +1,45 @@
+"""
+Test configuration.
+
+The environment is set before any ``src`` module is imported, because the
+modules read their settings and open the database engine at import time.
+Every test that uses the database gets a fresh SQLite file.
+"""
+
+import os
+import tempfile
+
+_TEST_DIR = tempfile.mkdtemp(prefix='backend-tests-')
+_DATABASE_PATH = os.path.join(_TEST_DIR, 'test.db')
+
+os.environ['DATABASE_URL'] = f'sqlite:///{_DATABASE_PATH}'
+os.environ['STT_ENGINE'] = 'mock'
+os.environ['SUMMARY_MODEL'] = 'stub'
+os.environ['STT_CACHE_ENABLED'] = 'false'
+os.environ['STORAGE_BACKEND'] = 'local'
+
+import pytest  # noqa: E402
+
+from src.database import db_session, engine, init_db  # noqa: E402
+
+
+@pytest.fixture
+def empty_db():
+    """An empty database file, for tests that create an older schema themselves."""
+    db_session.remove()
+    engine.dispose()
+    if os.path.exists(_DATABASE_PATH):
+        os.remove(_DATABASE_PATH)
+    yield engine
+    db_session.remove()
+    engine.dispose()
+
+
+@pytest.fixture
+def db(empty_db):
+    """A database with the current schema, set up the way the app does at startup."""
+    from src.migrations import run_migrations
+
+    init_db()
+    run_migrations()
+    return empty_db
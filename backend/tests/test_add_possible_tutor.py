@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src import add_possible_tutor as add_possible_tutor_module
+from src.add_possible_tutor import add_possible_tutor, add_possible_tutor_batch
+from src.database import engine, get_db
+from src.models import RequestedEvent, TutorOffer, User
+
+START = 1893456000
+
+
+@pytest.fixture
+def events(db):
+    """Events 1-3 are open, event 4 is deleted."""
+    with get_db() as db_session:
+        db_session.add_all([User(userid=1, email='tutee@example.com', password='x', name='Tutee'),
+                            User(userid=2, email='tutor@example.com', password='x', name='Tutor'),
+                            User(userid=3, email='rival@example.com', password='x', name='Rival')])
+        db_session.flush()
+        for i in range(4):
+            db_session.add(RequestedEvent(userid_tutee=1, available_start_time=datetime(2030, 1, 1 + i),
+                                          available_end_time=datetime(2030, 1, 1 + i) + timedelta(hours=2),
+                                          category='Math', title=f'Event {i}', is_deleted=i == 3))
+
+
+def offers_of(userid_tutor):
+    with get_db() as db_session:
+        return {(offer.eventid, offer.start, offer.end)
+                for offer in db_session.query(TutorOffer).filter(TutorOffer.userid_tutor == userid_tutor)}
+
+
+def test_batch_creates_offers(events):
+    results = add_possible_tutor_batch(2, [{'eventid': 1, 'start': START, 'end': START + 3600},
+                                           {'eventid': '2', 'start': START, 'end': START + 1800}])
+
+    assert results == [{'eventid': 1, 'status': 'created'}, {'eventid': 2, 'status': 'created'}]
+    assert offers_of(2) == {(1, START, START + 3600), (2, START, START + 1800)}
+
+
+def test_first_offer_stands(events):
+    add_possible_tutor(1, 2, START, START + 3600)
+
+    results = add_possible_tutor_batch(2, [{'eventid': 1, 'start': START + 60, 'end': START + 120}])
+
+    assert results == [{'eventid': 1, 'status': 'exists'}]
+    assert offers_of(2) == {(1, START, START + 3600)}
+
+
+def test_invalid_items_are_reported_in_order(events):
+    results = add_possible_tutor_batch(2, [
+        {'eventid': 1, 'start': START, 'end': START + 60},
+        {'eventid': 'one', 'start': START, 'end': START + 60},
+        {'eventid': 2, 'start': START, 'end': START},
+        {'eventid': 1, 'start': START, 'end': START + 60},
+        {'eventid': 2, 'start': True, 'end': START},
+        {'eventid': 4, 'start': START, 'end': START + 60},
+        {'eventid': 99, 'start': START, 'end': START + 60},
+        'not an offer',
+        {'eventid': 3, 'start': str(START), 'end': START + 60},
+    ])
+
+    assert [result['status'] for result in results] == [
+        'created', 'invalid', 'invalid', 'invalid', 'invalid', 'invalid', 'invalid', 'invalid', 'created']
+    assert results[2]['error'] == 'end must be after start'
+    assert results[3]['error'] == 'Duplicate offer on event 1'
+    assert results[5]['error'] == 'Event 4 not found'
+    assert results[6]['error'] == 'Event 99 not found'
+    assert results[7]['eventid'] is None
+    assert offers_of(2) == {(1, START, START + 60), (3, START, START + 60)}
+
+
+def test_nothing_valid_writes_nothing(events):
+    assert add_possible_tutor_batch(2, [{'eventid': 99, 'start': START, 'end': START + 60}])[0]['status'] == 'invalid'
+    assert add_possible_tutor_batch(2, []) == []
+    assert offers_of(2) == set()
+
+
+def test_offers_of_other_tutors_do_not_count(events):
+    add_possible_tutor(1, 3, START, START + 60)
+
+    results = add_possible_tutor_batch(2, [{'eventid': 1, 'start': START, 'end': START + 60}])
+
+    assert results == [{'eventid': 1, 'status': 'created'}]
+
+
+def test_offer_written_during_batch_is_reported_as_existing(events):
+    def race(conn, cursor, statement, parameters, context, executemany):
+        # Another request stores the tutor's offer on event 2 between the check and the insert
+        if statement.startswith('INSERT INTO tutor_offer') and not conn.info.get('raced'):
+            conn.info['raced'] = True
+            cursor.execute("INSERT INTO tutor_offer (eventid, userid_tutor, start, \"end\", status, created_at) "
+                           "VALUES (2, 2, 0, 60, 'offered', CURRENT_TIMESTAMP)")
+
+    event.listen(engine, 'before_cursor_execute', race)
+    try:
+        results = add_possible_tutor_batch(2, [{'eventid': 1, 'start': START, 'end': START + 60},
+                                               {'eventid': 2, 'start': START, 'end': START + 60}])
+    finally:
+        event.remove(engine, 'before_cursor_execute', race)
+
+    assert results == [{'eventid': 1, 'status': 'created'}, {'eventid': 2, 'status': 'exists'}]
+    assert offers_of(2) == {(1, START, START + 60), (2, 0, 60)}
+
+
+def test_dialects_without_on_conflict_insert_offer_by_offer(events, monkeypatch):
+    monkeypatch.setattr(add_possible_tutor_module, '_UPSERT_INSERTS', {})
+    add_possible_tutor(2, 2, 0, 60)
+
+    results = add_possible_tutor_batch(2, [{'eventid': 1, 'start': START, 'end': START + 60},
+                                           {'eventid': 2, 'start': START, 'end': START + 60}])
+
+    assert results == [{'eventid': 1, 'status': 'created'}, {'eventid': 2, 'status': 'exists'}]
+    assert offers_of(2) == {(1, START, START + 60), (2, 0, 60)}
+
+
+def test_dialects_without_on_conflict_skip_racing_offer(events, monkeypatch):
+    monkeypatch.setattr(add_possible_tutor_module, '_UPSERT_INSERTS', {})
+
+    def race(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO tutor_offer') and not conn.info.get('raced'):
+            conn.info['raced'] = True
+            cursor.execute("INSERT INTO tutor_offer (eventid, userid_tutor, start, \"end\", status, created_at) "
+                           "VALUES (1, 2, 0, 60, 'offered', CURRENT_TIMESTAMP)")
+
+    event.listen(engine, 'before_cursor_execute', race)
+    try:
+        results = add_possible_tutor_batch(2, [{'eventid': 1, 'start': START, 'end': START + 60},
+                                               {'eventid': 2, 'start': START, 'end': START + 60}])
+    finally:
+        event.remove(engine, 'before_cursor_execute', race)
+
+    assert results == [{'eventid': 1, 'status': 'exists'}, {'eventid': 2, 'status': 'created'}]
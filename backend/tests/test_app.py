@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def client(db):
+    from app import app
+
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def test_meeting_transcripts_keep_underscores_in_participant_ids(client, tmp_path, monkeypatch):
+    from src.transcription import transcription_service
+
+    paths = []
+    for participant_id in ('p1', 'guest_42'):
+        path = tmp_path / f'meeting-1_{participant_id}_transcript.json'
+        path.write_text(json.dumps({'transcript': 'hello there', 'words': []}))
+        paths.append(str(path))
+    monkeypatch.setattr(transcription_service, 'list_meeting_transcripts', lambda meeting_id: paths)
+
+    response = client.get('/api/transcripts/meeting/meeting-1')
+
+    assert response.status_code == 200
+    assert [t['participant_id'] for t in response.get_json()['transcripts']] == ['p1', 'guest_42']
+
+
+def test_package_files_are_privately_cached(client, tmp_path, monkeypatch):
+    import app as app_module
+
+    segment = tmp_path / 'segment_0001.ts'
+    segment.write_bytes(b'ts')
+    monkeypatch.setattr(app_module, 'locate_package_file', lambda stem, asset: str(segment))
+
+    response = client.get('/recordings/hls/m1_p1_20240101_120000/v0/segment_0001.ts')
+
+    assert response.status_code == 200
+    assert response.cache_control.private
+    assert not response.cache_control.public
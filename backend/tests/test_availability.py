@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from src.availability import AVAILABILITY_TABLE, availability_index_available, create_availability_index
+from src.database import get_db
+from src.models import RequestedEvent, User
+from src.queries import get_events_available_between
+
+pytestmark = pytest.mark.skipif(not availability_index_available(), reason='SQLite R*Tree is unavailable')
+
+
+def add_events(*windows):
+    with get_db() as db:
+        db.add(User(userid=1, email='tutee@example.com', password='x', name='Tutee'))
+        db.flush()
+        for start, end in windows:
+            db.add(RequestedEvent(userid_tutee=1, available_start_time=start, available_end_time=end,
+                                  category='Math', title='Event'))
+
+
+def test_overlap_after_2038(db):
+    add_events((datetime(2040, 1, 1, 10), datetime(2040, 1, 1, 11)),
+               (datetime(2040, 1, 1, 12), datetime(2040, 1, 1, 13)))
+
+    assert get_events_available_between(datetime(2040, 1, 1, 10, 30), datetime(2040, 1, 1, 12)) == [1]
+
+
+def test_overlap_is_exact_to_the_second(db):
+    add_events((datetime(2030, 1, 1, 10, 0, 30), datetime(2030, 1, 1, 11, 0, 30)))
+
+    # Within the same minute as the event's start and end, but not overlapping
+    assert get_events_available_between(datetime(2030, 1, 1, 10, 0, 10), datetime(2030, 1, 1, 10, 0, 30)) == []
+    assert get_events_available_between(datetime(2030, 1, 1, 11, 0, 30), datetime(2030, 1, 1, 11, 0, 50)) == []
+    assert get_events_available_between(datetime(2030, 1, 1, 10, 0, 10), datetime(2030, 1, 1, 10, 0, 31)) == [1]
+    assert get_events_available_between(datetime(2030, 1, 1, 11, 0, 29), datetime(2030, 1, 1, 11, 0, 50)) == [1]
+
+
+def test_index_in_seconds_layout_is_rebuilt(db):
+    add_events((datetime(2030, 1, 1, 10), datetime(2030, 1, 1, 11)))
+    with db.begin() as conn:
+        for name in ('event_availability_insert', 'event_availability_update', 'event_availability_delete'):
+            conn.execute(text(f"DROP TRIGGER {name}"))
+        conn.execute(text(f"DROP TABLE {AVAILABILITY_TABLE}"))
+        conn.execute(text(f"CREATE VIRTUAL TABLE {AVAILABILITY_TABLE} "
+                          "USING rtree_i32(eventid, start_ts, end_ts, +category)"))
+
+    create_availability_index()
+
+    with db.connect() as conn:
+        rows = conn.execute(text(f"SELECT eventid, start_min, end_min FROM {AVAILABILITY_TABLE}")).fetchall()
+    assert [tuple(row) for row in rows] == [(1, 31558200, 31558260)]
+    assert get_events_available_between(datetime(2030, 1, 1, 10, 30), datetime(2030, 1, 1, 10, 45)) == [1]
+
+    # The recreated triggers keep the index in sync
+    with get_db() as db_session:
+        db_session.query(RequestedEvent).filter(RequestedEvent.eventid == 1).update({'is_deleted': True})
+    with db.connect() as conn:
+        assert conn.execute(text(f"SELECT COUNT(*) FROM {AVAILABILITY_TABLE}")).scalar() == 0
@@ -0,0 +1,57 @@
+import hashlib
+import io
+import os
+import shutil
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from src import chunked_upload, recording
+from src.chunked_upload import append_chunk, finalize_upload, init_upload
+from src.conversion_jobs import conversion_queue
+from src.database import engine
+
+DATA = b'webm bytes'
+
+
+@pytest.fixture
+def upload(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(chunked_upload, 'UPLOADS_DIR', str(tmp_path))
+
+    def save(meeting_id, participant_id, source_path, file_extension):
+        target = str(tmp_path / f'{meeting_id}_{participant_id}.{file_extension}')
+        shutil.move(source_path, target)
+        return target
+
+    monkeypatch.setattr(recording, 'save_recording_file', save)
+    submitted = []
+    monkeypatch.setattr(conversion_queue, 'submit',
+                        lambda *args: submitted.append(args) or f'job{len(submitted)}')
+    session = init_upload('m1', 'p1', 'webm', total_size=len(DATA))
+    append_chunk(session['upload_id'], 0, io.BytesIO(DATA))
+    return session['upload_id'], submitted
+
+
+def test_retried_finalize_reuses_the_conversion_job(upload):
+    uploadid, submitted = upload
+
+    def fail_once(conn, cursor, statement, parameters, context, executemany):
+        # The process dies after the job was queued, before the upload is marked finalized
+        if statement.startswith('UPDATE upload_session') and 'status' in statement and not conn.info.get('failed'):
+            conn.info['failed'] = True
+            raise OperationalError(statement, parameters, Exception('connection lost'))
+
+    event.listen(engine, 'before_cursor_execute', fail_once)
+    try:
+        with pytest.raises(OperationalError):
+            finalize_upload(uploadid, hashlib.sha256(DATA).hexdigest())
+    finally:
+        event.remove(engine, 'before_cursor_execute', fail_once)
+
+    result = finalize_upload(uploadid, hashlib.sha256(DATA).hexdigest())
+
+    assert len(submitted) == 1
+    assert result['job_id'] == 'job1'
+    assert os.path.exists(result['filepath'])
+    assert finalize_upload(uploadid, hashlib.sha256(DATA).hexdigest())['job_id'] == 'job1'
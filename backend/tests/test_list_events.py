@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database import get_db
+from src.list_events import (decode_cursor, encode_cursor, event_page_args, list_available_events, list_events,
+                             list_tutee_events)
+from src.models import RequestedEvent, User
+
+BASE = datetime(2030, 5, 1, 9, 0)
+
+
+@pytest.fixture
+def events(db):
+    """Twelve events, in pairs sharing a start time, alternating categories; every fourth one accepted."""
+    with get_db() as db_session:
+        db_session.add_all([User(userid=1, email='tutee@example.com', password='x', name='Tutee'),
+                            User(userid=2, email='other@example.com', password='x', name='Other'),
+                            User(userid=3, email='tutor@example.com', password='x', name='Tutor')])
+        db_session.flush()
+        for i in range(12):
+            start = BASE + timedelta(hours=i // 2)
+            accepted = i % 4 == 3
+            db_session.add(RequestedEvent(
+                userid_tutee=1 if i < 8 else 2,
+                available_start_time=start,
+                available_end_time=start + timedelta(hours=1),
+                category='Math' if i % 2 else 'Physics',
+                title=f'Event {i}',
+                userid_tutor=3 if accepted else None,
+                is_accepted=accepted,
+            ))
+
+
+def all_pages(list_function, *args, **page):
+    ids, cursor, pages = [], None, 0
+    while True:
+        result = list_function(*args, cursor=cursor, **page)
+        ids += [event['eventid'] for event in result['events']]
+        pages += 1
+        cursor = result['next_cursor']
+        if not cursor:
+            return ids, pages
+
+
+def test_pages_cover_every_event_once_in_order(events):
+    ids, pages = all_pages(list_events, limit=5)
+
+    assert ids == list(range(1, 13))
+    assert pages == 3
+
+
+def test_page_boundary_inside_equal_start_times(events):
+    first = list_events(limit=3)
+    second = list_events(limit=3, cursor=first['next_cursor'])
+
+    # Events 3 and 4 share a start time and land on different pages
+    assert [e['eventid'] for e in first['events']] == [1, 2, 3]
+    assert [e['eventid'] for e in second['events']] == [4, 5, 6]
+
+
+def test_exact_last_page_has_no_next_cursor(events):
+    assert list_events(limit=12)['next_cursor'] is None
+    assert list_events(limit=11)['next_cursor'] is not None
+
+
+def test_filters_apply_to_every_page(events):
+    ids, _ = all_pages(list_events, limit=2, category='Math', accepted=False)
+
+    assert ids == [2, 6, 10]
+
+
+def test_tutee_pages(events):
+    ids, _ = all_pages(list_tutee_events, 2, limit=3)
+
+    assert ids == [9, 10, 11, 12]
+
+
+def test_available_events_pages(events):
+    ids, _ = all_pages(list_available_events, BASE + timedelta(hours=1, minutes=30), BASE + timedelta(hours=4),
+                       limit=2)
+
+    # Open events available between 10:30 and 13:00
+    assert ids == [3, 5, 6, 7]
+
+
+def test_fields_project_events(events):
+    page = list_events(limit=1, fields=['eventid', 'title'])
+
+    assert page['events'] == [{'eventid': 1, 'title': 'Event 0'}]
+
+
+def test_cursor_round_trip(events):
+    with get_db() as db_session:
+        event = db_session.query(RequestedEvent).filter(RequestedEvent.eventid == 4).one()
+        cursor = encode_cursor(event)
+
+    assert decode_cursor(cursor) == (BASE + timedelta(hours=1), 4)
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'bnVsbA==', 'WzFd'])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor)
+
+
+def test_page_args():
+    page = event_page_args({'accepted': 'false', 'limit': '20', 'from': '1893456000', 'fields': 'eventid, title',
+                            'cursor': 'abc'})
+
+    assert page == {'category': None, 'accepted': False, 'start_from': datetime(2030, 1, 1), 'start_to': None,
+                    'eventid': None, 'fields': ['eventid', 'title'], 'limit': 20, 'cursor': 'abc'}
+
+
+@pytest.mark.parametrize('args', [{'limit': '0'}, {'limit': '100000'}, {'limit': 'ten'}, {'accepted': 'maybe'},
+                                  {'fields': 'eventid,secret'}, {'from': 'yesterday'}, {'eventid': 'x'}])
+def test_invalid_page_args(args):
+    with pytest.raises(ValueError):
+        event_page_args(args)
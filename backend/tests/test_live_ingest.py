@@ -0,0 +1,104 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from src.live_ingest import WebmClusterScanner, live_ingest
+from src.transcription import TranscriptionService
+
+CLUSTER = b'\x1f\x43\xb6\x75\x01\xff\xff\xff\xff\xff\xff\xff'
+HEADER = (b'\x1a\x45\xdf\xa3\x84webm'                                  # EBML header
+          b'\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff'         # Segment of unknown size
+          b'\x15\x49\xa9\x66\x83abc')                                 # Info
+
+
+def cluster(payload):
+    """A cluster of unknown size with a timecode and one SimpleBlock."""
+    return CLUSTER + b'\xe7\x81\x00' + b'\xa3' + bytes([0x80 | len(payload)]) + payload
+
+
+def scan(stream, chunk_size):
+    scanner = WebmClusterScanner()
+    found = []
+    for start in range(0, len(stream), chunk_size):
+        found += [start + offset for offset in scanner.feed(stream[start:start + chunk_size])]
+    return found
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 16, 1000])
+def test_scanner_finds_clusters_but_not_cluster_ids_in_frames(chunk_size):
+    first = cluster(b'frame ' + CLUSTER[:4] + b' data')
+    second = cluster(b'next')
+    stream = HEADER + first + second
+
+    assert scan(stream, chunk_size) == [len(HEADER), len(HEADER) + len(first)]
+
+
+def test_scanner_gives_up_on_unparseable_streams():
+    scanner = WebmClusterScanner()
+
+    assert scanner.feed(HEADER + b'\x00' + cluster(b'x')) == []
+    assert scanner.failed
+    assert scanner.feed(cluster(b'y')) == []
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = TranscriptionService()
+    files = {}
+    monkeypatch.setattr(service, 'load_transcript', lambda meeting_id, participant_id: files.get(participant_id))
+    monkeypatch.setattr(service, 'save_transcript',
+                        lambda meeting_id, participant_id, data: files.__setitem__(participant_id, data))
+    return service, files
+
+
+def words(*times):
+    return {'words': [{'word': f'w{t}', 'start_time': t, 'end_time': t + 0.5} for t in times]}
+
+
+def test_segments_of_a_new_session_replace_the_old_transcript(service):
+    service, files = service
+    service.append_transcript('m1', 'p1', words(0, 1), 0.0, 'first')
+    service.append_transcript('m1', 'p1', words(0), 50.0, 'first')
+    assert [w['start_time'] for w in files['p1']['words']] == [0, 1, 50.0]
+
+    service.append_transcript('m1', 'p1', words(2), 0.0, 'second')
+    assert [w['start_time'] for w in files['p1']['words']] == [2]
+
+
+def test_transcript_finishes_after_every_segment(tmp_path, monkeypatch):
+    finished, requested = [], []
+    monkeypatch.setattr('src.stitching.transcript_finished', finished.append)
+    monkeypatch.setattr('src.conversion_jobs.conversion_queue.request_transcription', requested.append)
+    segment_jobs = [Future(), Future()]
+    session = {'meeting_id': 'm1', 'participant_id': 'p1', 'dir': str(tmp_path / 'session'),
+               'segment_jobs': segment_jobs}
+    os.makedirs(session['dir'])
+
+    thread = threading.Thread(target=live_ingest._finish_segments, args=(session, 'job1'))
+    thread.start()
+    # The last segment finishes first; an earlier one is still running
+    segment_jobs[1].set_result(True)
+    thread.join(timeout=0.2)
+    assert thread.is_alive() and finished == []
+
+    segment_jobs[0].set_result(True)
+    thread.join(timeout=5)
+    assert finished == ['m1'] and requested == []
+    assert not os.path.exists(session['dir'])
+
+
+def test_failed_segment_transcribes_the_recording(tmp_path, monkeypatch):
+    finished, requested = [], []
+    monkeypatch.setattr('src.stitching.transcript_finished', finished.append)
+    monkeypatch.setattr('src.conversion_jobs.conversion_queue.request_transcription', requested.append)
+    segment_jobs = [Future(), Future()]
+    segment_jobs[0].set_result(True)
+    segment_jobs[1].set_result(False)
+    session = {'meeting_id': 'm1', 'participant_id': 'p1', 'dir': str(tmp_path / 'session'),
+               'segment_jobs': segment_jobs}
+
+    live_ingest._finish_segments(session, 'job1')
+
+    assert finished == [] and requested == ['job1']
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from src import live_transcription
+from src.live_ingest import live_ingest
+from src.live_transcription import LiveTranscriber
+
+
+@pytest.fixture
+def transcriber(monkeypatch):
+    """A transcriber whose recognizer threads wait until the test releases them."""
+    release = threading.Event()
+
+    def run(self, stream):
+        release.wait()
+        while stream['queue'].get() is not None:
+            pass
+
+    monkeypatch.setattr(live_transcription, 'LIVE_QUEUE_FRAMES', 2)
+    monkeypatch.setattr(LiveTranscriber, '_run', run)
+    monkeypatch.setattr('src.stitching.transcript_finished', lambda meeting_id: None)
+    transcriber = LiveTranscriber()
+    yield transcriber, release
+    release.set()
+
+
+def test_full_queue_drops_frames_and_reports_once(transcriber):
+    transcriber, _ = transcriber
+    transcriber.start('m1', 'p1', 'room')
+    transcriber.push('m1', 'p1', b'\0\0')
+    transcriber.push('m1', 'p1', b'\0\0')
+
+    with pytest.raises(ValueError, match='falling behind'):
+        transcriber.push('m1', 'p1', b'\0\0')
+    transcriber.push('m1', 'p1', b'\0\0')
+
+    assert not transcriber.is_live('m1', 'p1')
+
+
+def test_stop_does_not_wait_for_the_recognizer(transcriber):
+    transcriber, release = transcriber
+    since = time.monotonic()
+    transcriber.start('m1', 'p1', 'room')
+
+    started = time.monotonic()
+    assert transcriber.stop('m1', 'p1')
+    assert time.monotonic() - started < 1
+
+    release.set()
+    assert transcriber.finish('m1', 'p1', since)
+
+
+class RecordingService:
+    def __init__(self):
+        self.appended = []
+
+    def append_transcript(self, meeting_id, participant_id, transcript_data, offset_seconds, session_id):
+        self.appended.append((session_id, [w['start_time'] + offset_seconds for w in transcript_data['words']]))
+
+
+def test_word_times_are_relative_to_the_recording(monkeypatch):
+    transcriber = LiveTranscriber()
+    stream = {'meeting_id': 'm1', 'participant_id': 'p1', 'room': 'room', 'language_code': 'en-US',
+              'first_frame_at': 110.0, 'recording_offset': None, 'session_id': 'stream'}
+    result = {'transcript': 'a b', 'is_final': True, 'words': [
+        {'word': 'a', 'start_time': 0.5, 'end_time': 1.0},
+        {'word': 'b', 'start_time': 2.0, 'end_time': 2.5}]}
+    service = RecordingService()
+
+    monkeypatch.setattr(live_ingest, 'recording_session', lambda meeting_id, participant_id: ('s1', 100.0))
+    transcriber._handle_result(service, stream, result, 0.0)
+    # The recording has stopped; late results keep the same alignment
+    monkeypatch.setattr(live_ingest, 'recording_session', lambda meeting_id, participant_id: None)
+    transcriber._handle_result(service, stream, result, 30.0)
+    # A recording that started after the words were spoken
+    stream = dict(stream, recording_offset=None)
+    monkeypatch.setattr(live_ingest, 'recording_session', lambda meeting_id, participant_id: ('s2', 111.5))
+    transcriber._handle_result(service, stream, result, 0.0)
+
+    assert service.appended == [('s1', [10.5, 12.0]), ('s1', [40.5, 42.0]), ('s2', [0.5])]
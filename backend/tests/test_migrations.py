@@ -0,0 +1,168 @@
+import json
+
+import pytest
+from sqlalchemy import inspect, text
+
+from src.database import get_db, init_db
+from src.list_events import list_tutor_events
+from src.migrations import run_migrations
+from src.models import TutorOffer
+
+# Tables as the first release created them: offers in a JSON blob, the accepted tutor in userid_tutor
+BASELINE_SCHEMA = [
+    """CREATE TABLE user (
+        userid INTEGER NOT NULL PRIMARY KEY,
+        email VARCHAR(255) NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        name VARCHAR(255) NOT NULL
+    )""",
+    "CREATE UNIQUE INDEX ix_user_email ON user (email)",
+    "CREATE TABLE subjects (subject VARCHAR(255) NOT NULL PRIMARY KEY)",
+    """CREATE TABLE requested_event (
+        eventid INTEGER NOT NULL PRIMARY KEY,
+        userid_tutee INTEGER NOT NULL REFERENCES user (userid),
+        available_start_time DATETIME NOT NULL,
+        available_end_time DATETIME NOT NULL,
+        category VARCHAR(255) NOT NULL,
+        title VARCHAR(500) NOT NULL,
+        description TEXT,
+        userid_tutor INTEGER REFERENCES user (userid),
+        possible_tutors JSON,
+        is_accepted BOOLEAN,
+        is_deleted BOOLEAN
+    )""",
+    "CREATE INDEX ix_requested_event_userid_tutee ON requested_event (userid_tutee)",
+    "CREATE INDEX ix_requested_event_userid_tutor ON requested_event (userid_tutor)",
+    """CREATE TABLE meeting (
+        eventid INTEGER NOT NULL PRIMARY KEY REFERENCES requested_event (eventid),
+        start_time DATETIME NOT NULL,
+        end_time DATETIME NOT NULL
+    )""",
+]
+
+
+def legacy_blob(value):
+    """A JSON column holding a JSON-encoded string, as json.dumps into Column(JSON) stored it."""
+    return json.dumps(json.dumps(value))
+
+
+def add_legacy_event(conn, eventid, possible_tutors=None, userid_tutor=None, is_accepted=False):
+    conn.execute(text(
+        "INSERT INTO requested_event (eventid, userid_tutee, available_start_time, available_end_time, category, "
+        "title, userid_tutor, possible_tutors, is_accepted, is_deleted) VALUES (:eventid, 1, "
+        "'2030-01-01 10:00:00.000000', '2030-01-01 12:00:00.000000', 'Math', 'Event', :userid_tutor, "
+        ":possible_tutors, :is_accepted, 0)"
+    ), {'eventid': eventid, 'userid_tutor': userid_tutor, 'is_accepted': is_accepted,
+        'possible_tutors': legacy_blob(possible_tutors) if possible_tutors is not None else None})
+
+
+@pytest.fixture
+def baseline_db(empty_db):
+    with empty_db.begin() as conn:
+        for sql in BASELINE_SCHEMA:
+            conn.execute(text(sql))
+        for userid in (1, 2, 3, 4):
+            conn.execute(text("INSERT INTO user VALUES (:userid, :email, 'x', 'User')"),
+                         {'userid': userid, 'email': f'user{userid}@example.com'})
+    return empty_db
+
+
+def migrate():
+    init_db()
+    run_migrations()
+
+
+def offers():
+    with get_db() as db:
+        return {(offer.eventid, offer.userid_tutor): (offer.start, offer.end, offer.status)
+                for offer in db.query(TutorOffer).all()}
+
+
+def test_offers_move_from_blob_to_table(baseline_db):
+    with baseline_db.begin() as conn:
+        add_legacy_event(conn, 1, possible_tutors=[
+            {'userid_tutor': 2, 'start': 100, 'end': 200},
+            {'userid_tutor': 3, 'start': '300', 'end': '400'},
+            {'userid_tutor': 4},
+        ])
+        add_legacy_event(conn, 2)
+
+    migrate()
+
+    assert offers() == {(1, 2): (100, 200, 'offered'), (1, 3): (300, 400, 'offered')}
+    with baseline_db.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM requested_event WHERE possible_tutors IS NOT NULL")).scalar() == 0
+
+
+def test_offers_on_accepted_event_are_accepted_or_declined(baseline_db):
+    with baseline_db.begin() as conn:
+        add_legacy_event(conn, 1, is_accepted=True,
+                         userid_tutor=json.dumps({'userid_tutor': 3, 'start': 300, 'end': 400}),
+                         possible_tutors=[{'userid_tutor': 2, 'start': 100, 'end': 200},
+                                          {'userid_tutor': 3, 'start': 300, 'end': 400}])
+
+    migrate()
+
+    assert offers() == {(1, 2): (100, 200, 'declined'), (1, 3): (300, 400, 'accepted')}
+
+
+def test_migrations_are_idempotent(baseline_db):
+    with baseline_db.begin() as conn:
+        add_legacy_event(conn, 1, possible_tutors=[{'userid_tutor': 2, 'start': 100, 'end': 200}])
+
+    migrate()
+    before = offers()
+    migrate()
+
+    assert offers() == before
+
+
+def test_migrated_database_has_current_schema(baseline_db):
+    migrate()
+
+    inspector = inspect(baseline_db)
+    indexes = {index['name'] for index in inspector.get_indexes('requested_event')}
+    assert {'ix_requested_event_start', 'ix_requested_event_category_start'} <= indexes
+    assert 'tutor_offer' in inspector.get_table_names()
+
+
+def accepted_columns(conn):
+    return [tuple(row) for row in conn.execute(text(
+        "SELECT eventid, userid_tutor, typeof(userid_tutor), accepted_start, accepted_end FROM requested_event "
+        "ORDER BY eventid"
+    ))]
+
+
+def test_accepted_tutor_blob_becomes_typed_columns(baseline_db):
+    with baseline_db.begin() as conn:
+        add_legacy_event(conn, 1, is_accepted=True,
+                         userid_tutor=json.dumps({'userid_tutor': 3, 'start': 300, 'end': 400}))
+        add_legacy_event(conn, 2, is_accepted=True,
+                         userid_tutor=json.dumps(json.dumps({'userid_tutor': '2', 'start': '100', 'end': '200'})))
+        add_legacy_event(conn, 3, is_accepted=True, userid_tutor='not a tutor')
+        add_legacy_event(conn, 4, userid_tutor=4)
+        add_legacy_event(conn, 5)
+
+    migrate()
+
+    with baseline_db.connect() as conn:
+        assert accepted_columns(conn) == [
+            (1, 3, 'integer', 300, 400),
+            (2, 2, 'integer', 100, 200),
+            (3, None, 'null', None, None),
+            (4, 4, 'integer', None, None),
+            (5, None, 'null', None, None),
+        ]
+
+
+def test_accepted_events_list_after_migration(baseline_db):
+    with baseline_db.begin() as conn:
+        add_legacy_event(conn, 1, is_accepted=True,
+                         userid_tutor=json.dumps({'userid_tutor': 3, 'start': 300, 'end': 400}),
+                         possible_tutors=[{'userid_tutor': 3, 'start': 300, 'end': 400}])
+
+    migrate()
+
+    page = list_tutor_events(3, fields=['eventid', 'userid_tutor', 'is_accepted'])
+    assert page['events'] == [{'eventid': 1, 'userid_tutor': {'userid_tutor': 3, 'start': 300, 'end': 400},
+                               'is_accepted': True}]
@@ -0,0 +1,206 @@
+import os
+
+import pytest
+
+pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+from src.storage import RECORDINGS, TRANSCRIPTS, S3Storage
+
+BUCKET = 'media-test'
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        s3 = S3Storage(BUCKET, root=str(tmp_path), region='us-east-1', keep_local=False)
+        s3.client.create_bucket(Bucket=BUCKET)
+        yield s3
+
+
+def write_recording(storage, content=b'video bytes', filename='m1_p1_20240101_120000.mp4'):
+    path = storage.recording_path('m1', 'p1', filename)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def object_body(storage, key):
+    return storage.client.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+
+
+def test_publish_uploads_under_local_layout_key(storage):
+    path = write_recording(storage)
+
+    key = storage.publish(path)
+
+    assert key == 'recordings/m1/p1/m1_p1_20240101_120000.mp4'
+    assert object_body(storage, key) == b'video bytes'
+    head = storage.client.head_object(Bucket=BUCKET, Key=key)
+    assert head['ContentType'] == 'video/mp4'
+    assert not os.path.exists(path)
+
+
+def test_locate_downloads_published_file(storage):
+    path = write_recording(storage)
+    storage.publish(path)
+
+    located = storage.locate(RECORDINGS, 'm1_p1_20240101_120000.mp4')
+
+    assert located == path
+    with open(located, 'rb') as f:
+        assert f.read() == b'video bytes'
+    assert storage.locate(RECORDINGS, 'm1_p2_20240101_120000.mp4') is None
+
+
+def test_kept_local_copy_is_not_downloaded_again(storage):
+    path = write_recording(storage)
+    storage.publish(path, keep_local=True)
+    before = os.stat(path).st_mtime_ns
+
+    assert storage.ensure_local(path) == path
+    assert os.stat(path).st_mtime_ns == before
+
+
+def test_stale_local_copy_is_refreshed(storage):
+    path = write_recording(storage)
+    key = storage.publish(path, keep_local=True)
+
+    # Another node replaces the object
+    storage.client.put_object(Bucket=BUCKET, Key=key, Body=b'a longer re-encoded recording')
+
+    assert storage.ensure_local(path) == path
+    with open(path, 'rb') as f:
+        assert f.read() == b'a longer re-encoded recording'
+
+
+def test_unpublished_local_file_is_served_as_is(storage):
+    path = write_recording(storage)
+
+    assert storage.ensure_local(path) == path
+
+
+def test_url_for_presigns_existing_objects_only(storage):
+    storage.publish(write_recording(storage))
+
+    url = storage.url_for(RECORDINGS, 'm1_p1_20240101_120000.mp4')
+
+    assert BUCKET in url
+    assert 'recordings/m1/p1/m1_p1_20240101_120000.mp4' in url
+    assert 'Signature' in url or 'X-Amz-Signature' in url
+    assert storage.url_for(RECORDINGS, 'm1_p2_20240101_120000.mp4') is None
+
+
+def test_url_for_uses_given_ids(storage):
+    path = storage.recording_path('meeting_1', 'p1', 'meeting_1_p1_20240101_120000.mp4')
+    with open(path, 'wb') as f:
+        f.write(b'x')
+    storage.publish(path)
+
+    assert storage.url_for(RECORDINGS, 'meeting_1_p1_20240101_120000.mp4') is None
+    assert storage.url_for(RECORDINGS, 'meeting_1_p1_20240101_120000.mp4', meeting_id='meeting_1',
+                           participant_id='p1') is not None
+
+
+def test_iter_files_lists_sizes_without_downloading(storage):
+    published = write_recording(storage, b'12345')
+    storage.publish(published)
+    pending = write_recording(storage, b'123', filename='m1_p1_20240101_130000.webm')
+
+    files = sorted(storage.iter_files(RECORDINGS, ('.mp4', '.webm')))
+
+    assert files == sorted([(published, 5), (pending, 3)])
+    assert not os.path.exists(published)
+
+
+def test_list_meeting_files_fetches_from_bucket(storage):
+    path = storage.transcript_path('m1', 'p1')
+    with open(path, 'w') as f:
+        f.write('{}')
+    storage.publish(path)
+
+    assert storage.list_meeting_files(TRANSCRIPTS, 'm1', ('_transcript.json',)) == [('p1', path)]
+    assert os.path.exists(path)
+
+
+def test_remove_deletes_object_and_local_copy(storage):
+    path = write_recording(storage)
+    key = storage.publish(path, keep_local=True)
+
+    storage.remove(path)
+
+    assert not os.path.exists(path)
+    assert storage.ensure_local(path) is None
+    assert 'Contents' not in storage.client.list_objects_v2(Bucket=BUCKET, Prefix=key)
+
+
+def test_released_copy_is_removed_once_unused(storage):
+    path = write_recording(storage)
+    storage.retain(path)
+    storage.retain(path)
+    storage.publish(path, keep_local=True)
+
+    storage.release(path)
+    assert os.path.exists(path)
+    storage.release(path)
+    assert not os.path.exists(path)
+    assert storage.ensure_local(path) == path
+
+
+def test_unpublished_copy_survives_release(storage):
+    path = write_recording(storage)
+    storage.retain(path)
+
+    storage.release(path)
+
+    assert os.path.exists(path)
+
+
+def test_url_for_path_presigns_package_files(storage):
+    package_dir = storage.package_dir('m1_p1_20240101_120000.mp4')
+    os.makedirs(package_dir)
+    path = os.path.join(package_dir, 'segment_0001.ts')
+    with open(path, 'wb') as f:
+        f.write(b'ts')
+
+    assert storage.url_for_path(path) is None
+    storage.publish(path)
+    assert 'hls/m1/p1/m1_p1_20240101_120000/segment_0001.ts' in storage.url_for_path(path)
+
+
+def test_meeting_listing_uses_object_metadata(storage, monkeypatch):
+    path = storage.transcript_path('m1', 'p1')
+    with open(path, 'w') as f:
+        f.write('{}')
+    key = storage.publish(path, keep_local=True)
+
+    def no_head(key):
+        raise AssertionError(f"head_object for {key}")
+
+    monkeypatch.setattr(storage, '_head', no_head)
+    versions = storage.meeting_file_versions(TRANSCRIPTS, 'm1', ('_transcript.json',))
+    assert [k for k, _ in versions] == [key]
+    assert storage.list_meeting_files(TRANSCRIPTS, 'm1', ('_transcript.json',)) == [('p1', path)]
+
+    storage.client.put_object(Bucket=BUCKET, Key=key, Body=b'{"words": []}')
+    assert storage.meeting_file_versions(TRANSCRIPTS, 'm1', ('_transcript.json',)) != versions
+    storage.list_meeting_files(TRANSCRIPTS, 'm1', ('_transcript.json',))
+    with open(path) as f:
+        assert f.read() == '{"words": []}'
+
+
+def test_reconcile_drops_the_copies_it_downloads(storage, db, monkeypatch):
+    from src import recording_index
+    from src.recording_index import get_recording, reconcile
+
+    path = write_recording(storage)
+    storage.publish(path)
+    monkeypatch.setattr(recording_index, 'storage', storage)
+
+    assert reconcile()['added'] == 1
+
+    assert get_recording('m1_p1_20240101_120000.mp4') is not None
+    assert not os.path.exists(path)
@@ -0,0 +1,70 @@
+from src.stitching import stitch, stitch_files
+from src.transcript_store import columnar_available, write_transcript
+
+
+def words_at(*items):
+    """(word, start) pairs as transcript word dicts."""
+    return [{'word': word, 'start_time': start, 'end_time': start + 0.4, 'confidence': 0.9} for word, start in items]
+
+
+def test_merge_groups_consecutive_words_by_speaker():
+    result = stitch([
+        ('alice', ['hi', 'how', 'are', 'you'], [0.0, 0.5, 3.0, 3.5]),
+        ('bob', ['hello', 'fine'], [1.0, 5.0]),
+    ])
+
+    assert [(s['participant_id'], s['text']) for s in result['sentences']] == [
+        ('alice', 'hi how'),
+        ('bob', 'hello'),
+        ('alice', 'are you'),
+        ('bob', 'fine'),
+    ]
+    assert [(s['start'], s['end']) for s in result['sentences']] == [(0.0, 0.5), (1.0, 1.0), (3.0, 3.5), (5.0, 5.0)]
+    assert result['sentence_count'] == 4
+    assert result['participant_count'] == 2
+    assert result['total_words'] == 6
+
+
+def test_ties_keep_participant_order():
+    result = stitch([
+        ('alice', ['a1', 'a2'], [1.0, 2.0]),
+        ('bob', ['b1', 'b2'], [1.0, 2.0]),
+    ])
+
+    assert [s['text'] for s in result['sentences']] == ['a1', 'b1', 'a2', 'b2']
+
+
+def test_participants_without_words_are_skipped():
+    result = stitch([('alice', [], []), ('bob', ['hey'], [0.0])])
+
+    assert result['participant_count'] == 1
+    assert result['sentences'] == [{'participant_id': 'bob', 'text': 'hey', 'start': 0.0, 'end': 0.0}]
+
+
+def test_nothing_to_stitch():
+    assert stitch([]) == {'sentences': [], 'sentence_count': 0, 'participant_count': 0, 'total_words': 0}
+
+
+def test_stitch_files_reads_participant_from_file_name(tmp_path):
+    alice = str(tmp_path / 'm1_alice_transcript.json')
+    write_transcript(alice, {'transcript': 'one three', 'words': words_at(('one', 0.0), ('three', 2.0)),
+                             'language': 'en-US'})
+    bob_suffix = '_transcript.npz' if columnar_available() else '_transcript.json'
+    bob = str(tmp_path / f'm1_bob_x{bob_suffix}')
+    write_transcript(bob, {'transcript': 'two', 'words': words_at(('two', 1.0)), 'language': 'en-US'})
+
+    result = stitch_files([bob, alice])
+
+    assert [(s['participant_id'], s['text']) for s in result['sentences']] == [
+        ('alice', 'one'),
+        ('bob_x', 'two'),
+        ('alice', 'three'),
+    ]
+
+
+def test_stitch_files_sorts_unsorted_json_words(tmp_path):
+    path = str(tmp_path / 'm1_alice_transcript.json')
+    write_transcript(path, {'transcript': '', 'words': words_at(('second', 2.0), ('first', 1.0)),
+                            'language': 'en-US'})
+
+    assert stitch_files([path])['sentences'][0]['text'] == 'first second'
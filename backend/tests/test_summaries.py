@@ -0,0 +1,156 @@
+import time
+
+import pytest
+
+from src.database import get_db
+from src.models import MeetingSummary
+from src.summaries import StubSummaryModel, SummaryModel, SummaryService, estimate_tokens, split_windows
+
+
+STITCHED = {
+    'sentences': [
+        {'participant_id': 'alice', 'text': 'Can we go over derivatives?', 'start': 0.0, 'end': 2.0},
+        {'participant_id': 'bob', 'text': 'Sure, start with the chain rule.', 'start': 3.0, 'end': 5.0},
+    ],
+    'total_words': 11,
+}
+
+
+class FlakyModel(SummaryModel):
+    """Fails its first call."""
+
+    name = 'flaky'
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError('model unavailable')
+        return 'recovered'
+
+
+def wait_for_summary(meeting_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with get_db() as db:
+            summary = db.query(MeetingSummary).filter(MeetingSummary.meeting_id == meeting_id).order_by(
+                MeetingSummary.summaryid.desc()).first()
+            if summary and summary.status != 'pending':
+                return {'status': summary.status, 'summary': summary.summary, 'error': summary.error,
+                        'stats': summary.stats}
+        time.sleep(0.01)
+    raise AssertionError(f"Summary of {meeting_id} still pending")
+
+
+@pytest.fixture
+def model():
+    return StubSummaryModel()
+
+
+@pytest.fixture
+def service(db, model):
+    return SummaryService(model=model)
+
+
+def test_request_generates_summary_in_background(service, model):
+    state = service.request('m1', STITCHED)
+    assert state['status'] == 'pending'
+    assert state['model'] == 'stub'
+
+    summary = wait_for_summary('m1')
+    assert summary['status'] == 'ready'
+    assert summary['summary'] == '2 lines, 15 words. First: Speaker alice: Can we go over derivatives?'
+    assert summary['stats']['stages']['summarize']['calls'] == 1
+    assert model.requests == 1
+
+
+def test_ready_summary_is_reused(service, model):
+    service.request('m1', STITCHED)
+    wait_for_summary('m1')
+
+    state = service.request('m1', STITCHED)
+
+    assert state['status'] == 'ready'
+    assert state['generated_at'] is not None
+    assert model.requests == 1
+
+
+def test_changed_transcript_gets_new_summary(service, model):
+    service.request('m1', STITCHED)
+    wait_for_summary('m1')
+
+    longer = dict(STITCHED, sentences=STITCHED['sentences'] + [
+        {'participant_id': 'alice', 'text': 'Thanks!', 'start': 6.0, 'end': 6.0}])
+    assert service.request('m1', longer)['status'] == 'pending'
+
+    assert wait_for_summary('m1')['summary'].startswith('3 lines')
+    assert model.requests == 2
+
+
+def test_failed_summary_is_retried(db):
+    service = SummaryService(model=FlakyModel())
+    service.request('m1', STITCHED)
+    failed = wait_for_summary('m1')
+    assert failed['status'] == 'failed'
+    assert failed['error'] == 'model unavailable'
+
+    assert service.request('m1', STITCHED)['status'] == 'pending'
+    retried = wait_for_summary('m1')
+    assert (retried['status'], retried['summary'], retried['error']) == ('ready', 'recovered', None)
+
+
+def turns(count, words=20):
+    return [{'participant_id': 'alice' if i % 2 else 'bob', 'text': ' '.join(f'w{i}_{j}' for j in range(words))}
+            for i in range(count)]
+
+
+def test_windows_end_on_turn_boundaries():
+    windows = split_windows(turns(10), max_tokens=150)
+
+    assert len(windows) > 1
+    assert '\n'.join(windows) == '\n'.join(f"Speaker {t['participant_id']}: {t['text']}" for t in turns(10))
+    for window in windows:
+        assert estimate_tokens(window) <= 150
+
+
+def test_long_turn_is_cut_at_word_boundaries():
+    windows = split_windows(turns(1, words=200), max_tokens=100)
+
+    assert len(windows) > 1
+    for window in windows:
+        assert window.startswith('Speaker bob: w0_')
+        assert estimate_tokens(window) <= 100
+
+
+def test_adding_turns_keeps_earlier_windows():
+    before = split_windows(turns(10), max_tokens=150)
+    after = split_windows(turns(14), max_tokens=150)
+
+    assert after[:len(before) - 1] == before[:-1]
+
+
+def test_long_meeting_is_summarized_map_reduce(db, model):
+    service = SummaryService(model=model, window_tokens=150)
+
+    text, stats = service.summarize('m1', turns(10))
+
+    assert stats['windows'] > 1
+    assert stats['stages']['map']['calls'] == stats['windows']
+    assert stats['stages']['map']['reused'] == 0
+    assert stats['stages']['reduce']['calls'] >= 1
+    assert text.startswith(f"{stats['windows']} lines")
+
+
+def test_unchanged_windows_are_reused(db, model):
+    service = SummaryService(model=model, window_tokens=150)
+    _, first = service.summarize('m1', turns(10))
+    calls = model.requests
+
+    _, second = service.summarize('m1', turns(14))
+
+    # Every window but the last one of the first run is unchanged
+    assert second['stages']['map']['reused'] == first['windows'] - 1
+    assert second['stages']['map']['calls'] == second['windows'] - second['stages']['map']['reused']
+    assert model.requests - calls == second['stages']['map']['calls'] + second['stages']['reduce']['calls']
@@ -0,0 +1,80 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from src.transcript_store import read_columnar, read_json, read_transcript, read_word_columns, write_transcript
+
+
+TRANSCRIPT = {
+    'transcript': 'Hello there. General Kenobi!',
+    'words': [
+        {'word': 'there.', 'start_time': 0.5, 'end_time': 0.9, 'confidence': 0.9},
+        {'word': 'Hello', 'start_time': 0.0, 'end_time': 0.4, 'confidence': 0.8},
+        {'word': 'General', 'start_time': 2.0, 'end_time': 2.5, 'confidence': None},
+        {'word': 'Kenobi!', 'start_time': 2.6, 'end_time': 3.1, 'confidence': 0.75},
+        {'word': 'Hello', 'start_time': 4.0, 'end_time': 4.2, 'confidence': 0.5},
+    ],
+    'language': 'en-GB',
+}
+
+
+@pytest.fixture
+def npz_path(tmp_path):
+    path = str(tmp_path / 'm_p_transcript.npz')
+    write_transcript(path, TRANSCRIPT)
+    return path
+
+
+def test_round_trip_keeps_words_in_time_order(npz_path):
+    result = read_transcript(npz_path)
+
+    assert [w['word'] for w in result['words']] == ['Hello', 'there.', 'General', 'Kenobi!', 'Hello']
+    assert [w['start_time'] for w in result['words']] == [0.0, 0.5, 2.0, 2.6, 4.0]
+    assert [w['end_time'] for w in result['words']] == [0.4, 0.9, 2.5, 3.1, 4.2]
+    assert [w['confidence'] for w in result['words']] == [0.8, 0.9, None, 0.75, 0.5]
+    assert result['language'] == 'en-GB'
+
+
+def test_round_trip_keeps_transcript_text_that_differs_from_words(npz_path):
+    assert read_transcript(npz_path)['transcript'] == 'Hello there. General Kenobi!'
+
+
+def test_round_trip_of_unicode_and_empty_transcripts(tmp_path):
+    path = str(tmp_path / 'u_transcript.npz')
+    write_transcript(path, {'transcript': 'größe 寿司', 'words': [
+        {'word': 'größe', 'start_time': 0.0, 'end_time': 0.3, 'confidence': 1.0},
+        {'word': '寿司', 'start_time': 0.3, 'end_time': 0.6, 'confidence': 1.0},
+    ], 'language': 'de-DE'})
+    assert read_transcript(path)['transcript'] == 'größe 寿司'
+
+    write_transcript(path, {'transcript': '', 'words': [], 'language': 'en-US'})
+    assert read_transcript(path) == {'transcript': '', 'words': [], 'language': 'en-US'}
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (0.5, 2.6, ['there.', 'General']),
+    (None, 0.5, ['Hello']),
+    (2.6, None, ['Kenobi!', 'Hello']),
+    (1.0, 2.0, []),
+    (3.0, 1.0, []),
+])
+def test_range_reads_words_starting_in_range(npz_path, start, end, expected):
+    result = read_columnar(npz_path, start, end)
+
+    assert [w['word'] for w in result['words']] == expected
+    assert result['transcript'] == ' '.join(expected)
+
+
+def test_range_reads_match_json(npz_path, tmp_path):
+    json_path = str(tmp_path / 'm_p_transcript.json')
+    write_transcript(json_path, read_transcript(npz_path))
+
+    for start, end in [(0.0, 2.0), (0.4, 4.0), (2.6, 10.0)]:
+        assert read_columnar(npz_path, start, end) == read_json(json_path, start, end)
+
+
+def test_word_columns(npz_path):
+    words, starts = read_word_columns(npz_path)
+
+    assert words == ['Hello', 'there.', 'General', 'Kenobi!', 'Hello']
+    assert starts == [0.0, 0.5, 2.0, 2.6, 4.0]
@@ -0,0 +1,123 @@
+import struct
+import subprocess
+
+import pytest
+
+from src.audio_chunking import plan_chunks
+from src.mock_speech import MockSpeechClient, flac_duration
+from src.speech_engines import MockSpeechEngine
+from src.stt_cache import RecognitionCache
+from src import transcription
+from src.transcription import TranscriptionService
+
+
+def fake_flac(seconds, sample_rate=16000):
+    """Bytes with a FLAC marker and STREAMINFO block, enough for the mock client to read the duration."""
+    packed = (sample_rate << 44) | (15 << 36) | int(seconds * sample_rate)
+    return b'fLaC' + b'\x00' * 4 + b'\x00' * 10 + struct.pack('>Q', packed) + b'\x00' * 16
+
+
+def write_flac(path, seconds):
+    path.write_bytes(fake_flac(seconds))
+    return str(path)
+
+
+@pytest.fixture
+def service():
+    return TranscriptionService(engine=MockSpeechEngine(), cache=RecognitionCache(enabled=False))
+
+
+def test_short_audio_is_one_chunk():
+    assert plan_chunks(40.0, [(10.0, 11.0)], max_seconds=55, min_seconds=20) == [(0.0, 40.0)]
+
+
+def test_chunks_cut_in_latest_pause_in_window():
+    silences = [(10.0, 11.0), (30.0, 31.0), (50.0, 52.0), (70.0, 71.0)]
+    chunks = plan_chunks(120.0, silences, max_seconds=55, min_seconds=20)
+
+    # 10.5 is too early, 51.0 is the latest pause before 55 s
+    assert chunks[0] == (0.0, 51.0)
+    assert chunks[1][0] == 51.0
+
+
+def test_chunks_without_pauses_cut_at_max_length():
+    chunks = plan_chunks(130.0, [], max_seconds=55, min_seconds=20)
+    assert chunks == [(0.0, 55.0), (55.0, 110.0), (110.0, 130.0)]
+
+
+def test_chunks_cover_whole_audio_within_bounds():
+    silences = [(t, t + 0.5) for t in range(7, 600, 13)]
+    chunks = plan_chunks(600.0, silences, max_seconds=55, min_seconds=20)
+
+    assert chunks[0][0] == 0.0
+    assert chunks[-1][1] == 600.0
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+    for start, end in chunks:
+        assert end - start <= 55
+
+
+def test_mock_client_emits_word_per_interval():
+    client = MockSpeechClient(word_seconds=1.0)
+    response = client.recognize(audio=type('Audio', (), {'content': fake_flac(3.5)})())
+
+    words = response.results[0].alternatives[0].words
+    assert flac_duration(fake_flac(3.5)) == 3.5
+    assert [w.word for w in words] == ['word0', 'word1', 'word2']
+    assert [w.start_time.total_seconds() for w in words] == [0.0, 1.0, 2.0]
+    assert client.requests == 1
+
+
+def test_mock_engine_transcribes_file(service, tmp_path):
+    result = service.transcribe_audio_local(write_flac(tmp_path / 'a.flac', 2))
+
+    assert result['transcript'] == 'word0 word1'
+    assert [w['end_time'] for w in result['words']] == [0.5, 1.5]
+    assert result['language'] == 'en-US'
+
+
+def test_mock_engine_returns_no_words_for_silence(service, tmp_path):
+    result = service.transcribe_audio_local(write_flac(tmp_path / 'a.flac', 0.5))
+
+    assert result == {'transcript': '', 'words': [], 'language': 'en-US'}
+
+
+def test_chunked_transcription_shifts_words_by_chunk_offset(service, tmp_path, monkeypatch):
+    chunks = [(write_flac(tmp_path / 'chunk_0000.flac', 2), 0.0),
+              (write_flac(tmp_path / 'chunk_0001.flac', 3), 51.0)]
+    monkeypatch.setattr(transcription, 'chunk_audio', lambda audio_path, duration, output_dir: chunks)
+
+    result = service.transcribe_audio_chunked(str(tmp_path / 'audio.flac'), 54.0)
+
+    assert [w['start_time'] for w in result['words']] == [0.0, 1.0, 51.0, 52.0, 53.0]
+    assert [w['end_time'] for w in result['words']] == [0.5, 1.5, 51.5, 52.5, 53.5]
+    assert result['transcript'] == 'word0 word1 word0 word1 word2'
+
+
+def test_chunked_transcription_fails_if_a_chunk_fails(service, tmp_path, monkeypatch):
+    chunks = [(write_flac(tmp_path / 'chunk_0000.flac', 2), 0.0),
+              (str(tmp_path / 'missing.flac'), 51.0)]
+    monkeypatch.setattr(transcription, 'chunk_audio', lambda audio_path, duration, output_dir: chunks)
+
+    assert service.transcribe_audio_chunked(str(tmp_path / 'audio.flac'), 54.0) is None
+
+
+def test_split_audio_returns_only_written_chunks(tmp_path, monkeypatch):
+    from src import audio_chunking
+
+    commands = []
+
+    def ffmpeg(command, **kwargs):
+        # The audio ends before the last planned cut
+        commands.append(command)
+        for i in range(2):
+            (tmp_path / f'chunk_{i:04d}.flac').write_bytes(b'fLaC')
+        return subprocess.CompletedProcess(command, 0, b'', b'')
+
+    monkeypatch.setattr(audio_chunking.subprocess, 'run', ffmpeg)
+
+    written = audio_chunking.split_audio('audio.flac', [(0.0, 50.0), (50.0, 100.0), (100.0, 120.0)], str(tmp_path))
+
+    assert written == [(str(tmp_path / 'chunk_0000.flac'), 0.0), (str(tmp_path / 'chunk_0001.flac'), 50.0)]
+    assert commands[0][commands[0].index('-f') + 1] == 'segment'
+    assert commands[0].count('-f') == 1
@@ -0,0 +1,36 @@
+export interface EventPage {
+    events: any[];
+    next_cursor: string | null;
+}
+
+// Fetch one page of an event listing; pass the previous page's next_cursor to continue.
+export async function fetchEventPage(
+    url: string,
+    token: string | null,
+    cursor: string | null = null,
+): Promise<EventPage> {
+    const separator = url.includes("?") ? "&" : "?";
+    const pageUrl = cursor
+        ? `${url}${separator}cursor=${encodeURIComponent(cursor)}`
+        : url;
+    const res = await fetch(pageUrl, {
+        headers: { Authorization: `Bearer ${token}` },
+    });
+    if (!res.ok) throw new Error(`Failed to fetch ${url}`);
+
+    const data = await res.json();
+    return { events: data.events, next_cursor: data.next_cursor };
+}
+
+// Event listings are paginated; follow next_cursor to collect every page.
+// Only use this for listings bounded per user (their own events).
+export async function fetchAllEvents(url: string, token: string | null): Promise<any[]> {
+    const events: any[] = [];
+    let cursor: string | null = null;
+    do {
+        const page: EventPage = await fetchEventPage(url, token, cursor);
+        events.push(...page.events);
+        cursor = page.next_cursor;
+    } while (cursor);
+    return events;
+}
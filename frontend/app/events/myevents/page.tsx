@@ -3,6 +3,7 @@
 import { useState, useEffect } from "react";
 import { useAuth } from "@/app/authContext";
 import { EventDisplay } from "./components/eventDisplay";
+import { fetchAllEvents as fetchEventPages } from "../fetchEvents";
 
 function formatDate(date: number | string) {
     const value = typeof date === "number" ? date * 1000 : date;
@@ -40,13 +41,10 @@ export default function MyEvents() {
 
         const getTuteeEvents = async () => {
             try {
-                const res = await fetch("https://api.tutorl.ink/events/tutee", {
-                    headers: { Authorization: `Bearer ${token}` },
-                });
-                if (!res.ok) throw new Error("Failed to fetch tutee events");
-
-                const data = await res.json();
-                const events = data.events;
+                const events = await fetchEventPages(
+                    "https://api.tutorl.ink/events/tutee",
+                    token,
+                );
 
                 setPendingTuteeEvents(
                     events.filter(
@@ -74,13 +72,10 @@ export default function MyEvents() {
 
         const getTutorEvents = async () => {
             try {
-                const res = await fetch("https://api.tutorl.ink/events/tutor", {
-                    headers: { Authorization: `Bearer ${token}` },
-                });
-                if (!res.ok) throw new Error("Failed to fetch tutor events");
-
-                const data = await res.json();
-                const events = data.events;
+                const events = await fetchEventPages(
+                    "https://api.tutorl.ink/events/tutor",
+                    token,
+                );
 
                 setPendingTutorEvents(
                     events.filter(
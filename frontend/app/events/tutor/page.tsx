@@ -3,42 +3,60 @@
 import { useEffect, useState } from "react";
 import { useAuth } from "@/app/authContext";
 import { Event } from "./components/event";
+import { fetchEventPage } from "../fetchEvents";
 
 
 
 
 export default function TutorEvent() {
     const [subjects, setSubjects] = useState<string[]>([]);
-    const [allEvents, setAllEvents] = useState<any[]>([]);
+    const [events, setEvents] = useState<any[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [selectedSubject, setSelectedSubject] = useState<string>("All");
     const { token } = useAuth();
 
-    useEffect(() => {
-        async function getAllEvents() {
-            try {
-                const res = await fetch("https://api.tutorl.ink/events", {
-                    method: "GET",
-                    headers: {
-                        "Content-Type": "application/json",
-                        Authorization: `Bearer ${token}`,
-                    },
-                });
+    // Open events, filtered by subject on the server so every page matches
+    const eventsUrl =
+        selectedSubject === "All"
+            ? "https://api.tutorl.ink/events?accepted=false"
+            : `https://api.tutorl.ink/events?accepted=false&category=${encodeURIComponent(selectedSubject)}`;
 
-                if (!res.ok) {
-                    const errorData = await res.json();
-                    return;
-                }
+    useEffect(() => {
+        let cancelled = false;
 
-                const data = await res.json();
-                const openEvents = data.events.filter((event) => (
-                    event.userid_tutor === null
-                ))
-                setAllEvents(openEvents);
+        async function getFirstPage() {
+            try {
+                const page = await fetchEventPage(eventsUrl, token);
+                if (cancelled) return;
+                setEvents(page.events);
+                setNextCursor(page.next_cursor);
             } catch (err) {
                 console.error("Request failed:", err);
             }
         }
 
+        getFirstPage();
+        return () => {
+            cancelled = true;
+        };
+    }, [token, eventsUrl]);
+
+    async function loadMore() {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        try {
+            const page = await fetchEventPage(eventsUrl, token, nextCursor);
+            setEvents((current) => [...current, ...page.events]);
+            setNextCursor(page.next_cursor);
+        } catch (err) {
+            console.error("Request failed:", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    }
+
+    useEffect(() => {
         async function loadSubjects() {
             try {
                 const res = await fetch("https://api.tutorl.ink/subjects", {
@@ -61,14 +79,7 @@ export default function TutorEvent() {
         }
 
         loadSubjects();
-        getAllEvents();
-    }, [token]);
-
-    // Filtered events based on selected subject
-    const filteredEvents =
-        selectedSubject === "All"
-            ? allEvents
-            : allEvents.filter((event) => event.category === selectedSubject);
+    }, []);
 
     return (
         <div className="px-36 py-12 text-(--off-white)">
@@ -94,19 +105,30 @@ export default function TutorEvent() {
                 </div>
 
                 {/* Event List */}
-                {filteredEvents.length === 0 ? (
+                {events.length === 0 ? (
                     <p>No events found.</p>
                 ) : (
-                    <ul className="space-y-4 w-full">
-                        {filteredEvents.map((event) => (
-                            <li
-                                key={event.eventid}
-                                className="rounded-xl border border-(--primary-border-color) px-8 py-4"
+                    <div className="w-full">
+                        <ul className="space-y-4 w-full">
+                            {events.map((event) => (
+                                <li
+                                    key={event.eventid}
+                                    className="rounded-xl border border-(--primary-border-color) px-8 py-4"
+                                >
+                                    <Event event={event} token={token} />
+                                </li>
+                            ))}
+                        </ul>
+                        {nextCursor && (
+                            <button
+                                className="mt-4 w-full rounded border border-(--primary-border-color) p-2"
+                                onClick={loadMore}
+                                disabled={loadingMore}
                             >
-                                <Event event={event} token={token} />
-                            </li>
-                        ))}
-                    </ul>
+                                {loadingMore ? "Loading..." : "Load more"}
+                            </button>
+                        )}
+                    </div>
                 )}
             </div>
         </div>
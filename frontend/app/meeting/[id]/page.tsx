@@ -68,7 +68,11 @@ export default function MeetingPage() {
                 const token = localStorage.getItem("token");
                 if (!token || !user?.userid) return;
 
-                const response = await fetch(`https://api.tutorl.ink/events`, {
+                // Meetings are named after their event; other IDs have no event to look up
+                const eventId = parseInt(meetingId, 10);
+                if (Number.isNaN(eventId)) return;
+
+                const response = await fetch(`https://api.tutorl.ink/events?eventid=${eventId}`, {
                     headers: {
                         Authorization: `Bearer ${token}`,
                     },
@@ -78,14 +82,14 @@ export default function MeetingPage() {
                     const data = await response.json();
                     console.log(data)
                     const event = data.events?.find(
-                        (e: any) => e.eventid === parseInt(meetingId)
+                        (e: any) => e.eventid === eventId
                     );
                     console.log(event)
 
                     if (event) {
-                        console.log(event.userid_tutor.userid_tutor)
+                        console.log(event.userid_tutor?.userid_tutor)
                         // Determine if user is tutor or tutee
-                        if (event.userid_tutor.userid_tutor === user.userid) {
+                        if (event.userid_tutor?.userid_tutor === user.userid) {
                             setUserRole("tutor");
                         } else if (event.userid_tutee === user.userid) {
                             setUserRole("tutee");
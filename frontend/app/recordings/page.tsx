@@ -3,6 +3,7 @@
 import { useEffect, useState } from "react";
 import { useRouter } from "next/navigation";
 import { useAuth } from "../authContext";
+import { fetchAllEvents } from "../events/fetchEvents";
 
 interface Recording {
     filename: string;
@@ -32,27 +33,17 @@ export default function RecordingsListPage() {
             try {
                 const eventIDs: number[] = [];
 
-                const tuteeRes = await fetch(
-                    "https://api.tutorl.ink/events/tutee",
-                    {
-                        headers: { Authorization: `Bearer ${token}` },
-                    },
+                const tuteeEvents = await fetchAllEvents(
+                    "https://api.tutorl.ink/events/tutee?fields=eventid",
+                    token,
                 );
-                if (!tuteeRes.ok)
-                    throw new Error("Failed to fetch tutee events");
-                const tuteeData = await tuteeRes.json();
-                tuteeData.events.forEach((e: any) => eventIDs.push(e.eventid));
+                tuteeEvents.forEach((e: any) => eventIDs.push(e.eventid));
 
-                const tutorRes = await fetch(
-                    "https://api.tutorl.ink/events/tutor",
-                    {
-                        headers: { Authorization: `Bearer ${token}` },
-                    },
+                const tutorEvents = await fetchAllEvents(
+                    "https://api.tutorl.ink/events/tutor?fields=eventid",
+                    token,
                 );
-                if (!tutorRes.ok)
-                    throw new Error("Failed to fetch tutor events");
-                const tutorData = await tutorRes.json();
-                tutorData.events.forEach((e: any) => {
+                tutorEvents.forEach((e: any) => {
                     if (!eventIDs.includes(e.eventid)) {
                         eventIDs.push(e.eventid);
                     }